@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.core.config import settings
+from app.models.weather import HistoricalAppend
+import asyncio
+import hmac
+import os
+
+router = APIRouter()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Endpoints de administración: requieren ``X-Admin-Token`` igual a ADMIN_TOKEN.
+    Si ADMIN_TOKEN no está configurado los endpoints no existen (404).
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=120, description="Duración del muestreo"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Intervalo entre muestras"),
+    format: str = Query("collapsed", description="collapsed (flamegraph) o json (resumen de funciones)"),
+    include_idle: bool = Query(False, description="Incluir hilos en espera (select, locks, colas)")
+):
+    """
+    Perfila ESTE worker durante ``seconds`` muestreando las pilas de todos sus
+    hilos. ``collapsed`` se puede abrir en speedscope o pasar a flamegraph.pl.
+    """
+    from app.core.profiler import profile_process
+
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+
+    # El muestreo corre en un hilo: el event loop sigue atendiendo (y aparece en el perfil)
+    profiler = await asyncio.to_thread(profile_process, seconds, interval_ms / 1000, include_idle)
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+
+    if format == "json":
+        return profiler.summary()
+    return PlainTextResponse(profiler.collapsed(), headers={
+        "X-Worker-PID": str(os.getpid()),
+        "Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'
+    })
+
+@router.get("/memory", dependencies=[Depends(require_admin)])
+async def memory_usage(top: int = Query(10, ge=1, le=100, description="Número de mayores consumidores")):
+    """
+    Bytes estimados retenidos por cada ubicación del histórico en memoria,
+    los modelos y scalers cargados y los jobs, junto al RSS de ESTE worker.
+    """
+    from app.core.executor import run_cpu_bound
+    from app.core.memory import memory_report
+    from app.services.job_service import job_service
+    from app.services.weather_service import get_weather_service
+
+    # Recorrer los objetos es CPU puro: fuera del event loop
+    return await run_cpu_bound(memory_report, get_weather_service(), job_service, top)
+
+@router.post("/historical", dependencies=[Depends(require_admin)])
+async def append_historical(request: HistoricalAppend):
+    """
+    Añade registros diarios al histórico de una ubicación y aplica la política
+    de reentrenamiento: incremental (warm start) al acumular
+    MODEL_RETRAIN_THRESHOLD registros nuevos, completo si el último completo
+    tiene más de MODEL_FULL_RETRAIN_DAYS.
+    """
+    from app.data.real_weather_data import real_weather_service
+    from app.services.weather_service import get_weather_service
+
+    rows = []
+    for record in request.records:
+        row = record.model_dump()
+        row["temperature_max"] = row["temperature_max"] if row["temperature_max"] is not None else row["temperature"]
+        row["temperature_min"] = row["temperature_min"] if row["temperature_min"] is not None else row["temperature"]
+        if row["heat_index"] is None:
+            row["heat_index"] = real_weather_service.calculate_heat_index(row["temperature"], row["humidity"])
+        rows.append(row)
+
+    return await get_weather_service().append_historical_data(request.latitude, request.longitude, rows)
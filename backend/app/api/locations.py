@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from typing import List
 from app.models.location import Location
+from app.data.gazetteer import get_gazetteer
 
 router = APIRouter()
 
@@ -87,21 +88,19 @@ async def get_popular_locations():
     }
 
 @router.get("/search")
-async def search_locations(query: str):
+async def search_locations(query: str, limit: int = Query(20, ge=1, le=200)):
     """
-    Busca ubicaciones por nombre.
+    Busca ubicaciones por nombre en el gazetteer.
     
     Args:
-        query: Término de búsqueda para filtrar ubicaciones
+        query: Término de búsqueda (prefijo o parte del nombre, o país; sin
+            distinguir acentos ni mayúsculas)
+        limit: Máximo de resultados (los más poblados primero)
         
     Returns:
         Lista de ubicaciones que coinciden con la búsqueda
     """
-    query_lower = query.lower()
-    filtered_locations = [
-        location for location in POPULAR_LOCATIONS
-        if query_lower in location["name"].lower() or query_lower in location["country"].lower()
-    ]
+    filtered_locations = get_gazetteer().search(query, limit=limit)
     
     return {
         "locations": filtered_locations,
@@ -111,7 +110,8 @@ async def search_locations(query: str):
     }
 
 @router.get("/by-coordinates")
-async def get_location_by_coordinates(latitude: float, longitude: float, radius: float = 50.0):
+async def get_location_by_coordinates(latitude: float, longitude: float, radius: float = 50.0,
+                                      limit: int = Query(50, ge=1, le=1000)):
     """
     Encuentra ubicaciones cercanas a las coordenadas especificadas.
     
@@ -119,40 +119,12 @@ async def get_location_by_coordinates(latitude: float, longitude: float, radius:
         latitude: Latitud de referencia
         longitude: Longitud de referencia
         radius: Radio de búsqueda en kilómetros (por defecto 50km)
+        limit: Máximo de ubicaciones devueltas (las más cercanas)
         
     Returns:
-        Lista de ubicaciones dentro del radio especificado
+        Lista de ubicaciones dentro del radio especificado, ordenadas por distancia
     """
-    import math
-    
-    def calculate_distance(lat1, lon1, lat2, lon2):
-        """Calcula la distancia entre dos puntos usando la fórmula de Haversine"""
-        R = 6371  # Radio de la Tierra en kilómetros
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
-    
-    nearby_locations = []
-    for location in POPULAR_LOCATIONS:
-        distance = calculate_distance(
-            latitude, longitude,
-            location["latitude"], location["longitude"]
-        )
-        
-        if distance <= radius:
-            location_with_distance = location.copy()
-            location_with_distance["distance_km"] = round(distance, 2)
-            nearby_locations.append(location_with_distance)
-    
-    # Ordenar por distancia
-    nearby_locations.sort(key=lambda x: x["distance_km"])
+    nearby_locations = get_gazetteer().nearby(latitude, longitude, radius, limit=limit)
     
     return {
         "locations": nearby_locations,
@@ -162,6 +134,23 @@ async def get_location_by_coordinates(latitude: float, longitude: float, radius:
         "description": f"Ubicaciones dentro de {radius}km de ({latitude}, {longitude})"
     }
 
+@router.get("/nearest")
+async def get_nearest_locations(latitude: float, longitude: float, k: int = Query(5, ge=1, le=100)):
+    """
+    Las ``k`` ubicaciones del gazetteer más cercanas a las coordenadas, sin límite de radio.
+    
+    Returns:
+        Lista de ubicaciones ordenadas por distancia (``distance_km``)
+    """
+    nearest_locations = get_gazetteer().nearest(latitude, longitude, k=k)
+    
+    return {
+        "locations": nearest_locations,
+        "total": len(nearest_locations),
+        "reference_point": {"latitude": latitude, "longitude": longitude},
+        "description": f"{len(nearest_locations)} ubicaciones más cercanas a ({latitude}, {longitude})"
+    }
+
 @router.get("/trained-models")
 async def get_locations_with_trained_models():
     """
@@ -170,43 +159,41 @@ async def get_locations_with_trained_models():
     Returns:
         Lista de ubicaciones con modelos pre-entrenados
     """
-    import os
-    from app.core.config import settings
+    from app.data.real_weather_data import real_weather_service
+    
+    required_models = [
+        "temperature_predictor.pkl",
+        "humidity_predictor.pkl", 
+        "wind_predictor.pkl",
+        "precipitation_classifier.pkl",
+        "scalers.pkl"
+    ]
     
-    models_dir = os.path.join(settings.PROJECT_ROOT, "models")
+    # Consultar el índice de modelos (models/index.json) en lugar de recorrer directorios
+    model_index = real_weather_service.model_index
     trained_locations = []
     
-    # Verificar qué ubicaciones tienen modelos entrenados
     for location in POPULAR_LOCATIONS:
         location_key = f"{round(location['latitude'], 3)}_{round(location['longitude'], 3)}"
-        location_models_dir = os.path.join(models_dir, location_key)
+        entry = model_index.get(location_key)
+        if entry is None:
+            continue
         
-        if os.path.exists(location_models_dir):
-            # Verificar que existen los archivos de modelo necesarios
-            required_models = [
-                "temperature_predictor.pkl",
-                "humidity_predictor.pkl", 
-                "wind_predictor.pkl",
-                "precipitation_classifier.pkl",
-                "scalers.pkl"
-            ]
-            
-            available_models = []
-            for model_file in required_models:
-                model_path = os.path.join(location_models_dir, model_file)
-                if os.path.exists(model_path):
-                    available_models.append(model_file)
-            
-            if len(available_models) >= 3:  # Al menos 3 modelos disponibles
-                location_with_models = location.copy()
-                location_with_models["location_key"] = location_key
-                location_with_models["available_models"] = available_models
-                location_with_models["model_completeness"] = len(available_models) / len(required_models)
-                trained_locations.append(location_with_models)
+        available_models = [name for name in required_models if name in entry["artifacts"]]
+        if len(available_models) >= 3:  # Al menos 3 modelos disponibles
+            location_with_models = location.copy()
+            location_with_models["location_key"] = location_key
+            location_with_models["available_models"] = available_models
+            location_with_models["model_completeness"] = len(available_models) / len(required_models)
+            location_with_models["model_version"] = entry.get("model_version")
+            location_with_models["trained_at"] = entry.get("trained_at")
+            location_with_models["models_size_bytes"] = entry.get("total_bytes")
+            trained_locations.append(location_with_models)
     
     return {
         "locations": trained_locations,
         "total": len(trained_locations),
+        "total_trained_locations": len(model_index),
         "description": "Ubicaciones con modelos de Machine Learning pre-entrenados",
         "model_types": [
             "temperature_predictor",
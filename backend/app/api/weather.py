@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 from app.models.weather import (
     WeatherQuery, WeatherResponse, WeatherConditionType, 
     TemperatureUnit, CustomThresholds
 )
-from app.services.weather_service import weather_service, WeatherService
+from app.models.job import JobCreate, JobInfo
+from app.services.weather_service import get_weather_service
+from app.services.job_service import job_service
 
 router = APIRouter()
 
-@router.post("/probability", response_model=WeatherResponse)
-async def get_weather_probability(query: WeatherQuery):
+@router.post(
+    "/probability",
+    response_model=WeatherResponse,
+    responses={202: {"model": JobInfo, "description": "Ubicación en preparación - consultar el job"}}
+)
+async def get_weather_probability(
+    query: WeatherQuery,
+    wait: bool = Query(False, description="Esperar a que la ubicación esté lista en lugar de devolver 202")
+):
     """
     Obtiene las probabilidades de condiciones climáticas específicas
     para una ubicación y fecha determinada con personalización completa.
@@ -20,13 +30,74 @@ async def get_weather_probability(query: WeatherQuery):
     - Unidades de temperatura (Celsius/Fahrenheit) 
     - Umbrales personalizados
     - Predicciones futuras (hasta 2 semanas)
+    
+    Si la ubicación todavía no tiene datos ni modelos (ubicación "fría") se
+    lanza el job que la prepara. Si hay una ubicación lista a menos de
+    NEAREST_FALLBACK_RADIUS_KM y de clima similar se responde con sus datos
+    (`served_from` indica cuál y el job); si no, se devuelve 202 con el job y el
+    cliente puede seguir su progreso en `/api/weather/jobs/{job_id}/events`.
     """
+    served_from = None
+    if not wait and not get_weather_service().is_location_warm(query.latitude, query.longitude):
+        job = job_service.submit(query.latitude, query.longitude, query.date_of_year)
+        served_from = await get_weather_service().find_nearest_warm_location(query.latitude, query.longitude)
+        if served_from is None:
+            return _job_accepted_response(job)
+        served_from["job"] = job.to_info().links["self"]
+    
     try:
-        result = await weather_service.get_weather_probabilities(query)
+        result = await get_weather_service().get_weather_probabilities(query, served_from=served_from)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _job_accepted_response(job) -> JSONResponse:
+    """Respuesta 202 apuntando al job que prepara la ubicación"""
+    info = job.to_info()
+    return JSONResponse(
+        status_code=202,
+        content=info.model_dump(mode="json"),
+        headers={"Location": info.links["self"]}
+    )
+
+@router.post("/jobs", response_model=JobInfo, status_code=202)
+async def create_weather_job(request: JobCreate):
+    """
+    Crea (o reutiliza) un job que descarga el histórico y entrena los modelos
+    de una ubicación en segundo plano. Devuelve el id del job y sus enlaces.
+    """
+    job = job_service.submit(request.latitude, request.longitude, request.date_of_year)
+    return _job_accepted_response(job)
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_weather_job(job_id: str):
+    """Estado actual de un job de preparación de ubicación"""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_info()
+
+@router.get("/jobs/{job_id}/events")
+async def stream_weather_job_events(
+    job_id: str,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream de progreso del job en formato Server-Sent Events.
+    
+    Eventos: started, cache_hit, chunk_fetched, rows_parsed, model_trained,
+    models_loaded, completed, failed. Soporta reconexión con `Last-Event-ID`.
+    """
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    return StreamingResponse(
+        job_service.stream_events(job, last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/probability/{latitude}/{longitude}")
 async def get_weather_probability(
     latitude: float, 
@@ -51,7 +122,7 @@ async def get_weather_probability(
         date_of_year = today.timetuple().tm_yday
     
     try:
-        weather_service_instance = WeatherService()
+        weather_service_instance = get_weather_service()
         result = await weather_service_instance.get_weather_probability(latitude, longitude, date_of_year)
         return result
     except Exception as e:
@@ -69,7 +140,7 @@ async def post_weather_probability_simple(query: WeatherQuery):
         date_of_year = today.timetuple().tm_yday
     
     try:
-        weather_service_instance = WeatherService()
+        weather_service_instance = get_weather_service()
         result = await weather_service_instance.get_weather_probability(
             query.latitude, 
             query.longitude, 
@@ -92,22 +163,21 @@ async def get_model_metrics(latitude: float, longitude: float):
         Métricas completas de todos los modelos entrenados para esa ubicación
     """
     try:
-        from app.data.real_weather_data import RealWeatherDataService
+        from app.data.real_weather_data import real_weather_service
         
-        weather_data_service = RealWeatherDataService()
-        
-        # Cargar modelos para esta ubicación
+        # Solo el manifiesto JSON junto a los modelos: ningún pickle se carga.
+        # Los modelos anteriores al manifiesto se describen a partir de sus archivos
         location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
-        models_loaded = weather_data_service.load_trained_models(location_key)
+        manifest = (real_weather_service.load_model_manifest(location_key)
+                    or real_weather_service.legacy_model_manifest(location_key))
         
-        if not models_loaded:
+        if manifest is None:
             raise HTTPException(
                 status_code=404, 
                 detail=f"No trained models found for location {latitude}, {longitude}. Train models first by making a prediction request."
             )
         
-        # Obtener métricas
-        metrics = weather_data_service.get_model_metrics()
+        metrics = manifest.get("metrics", {})
         
         if not metrics or not any(metrics.values()):
             raise HTTPException(
@@ -129,6 +199,17 @@ async def get_model_metrics(latitude: float, longitude: float):
                 "models_available": list(metrics.keys()),
                 "all_models_trained": all(metrics.values())
             },
+            "training": {
+                "model_version": manifest.get("model_version"),
+                "trained_at": manifest.get("trained_at"),
+                "training_duration_s": manifest.get("training_duration_s"),
+                "training_samples": manifest.get("training_samples"),
+                "training_mode": manifest.get("training_mode"),
+                "updated_at": manifest.get("updated_at"),
+                "incremental_updates": manifest.get("incremental_updates", 0),
+                "data_range": manifest.get("data_range"),
+                "feature_names": manifest.get("feature_names", [])
+            },
             "metrics": metrics,
             "interpretation": {
                 "regression_models": [k for k, v in metrics.items() if v and v.get('model_type') == 'regression'],
@@ -191,7 +272,7 @@ async def get_custom_analysis(
     metrics_list = [m.strip() for m in metrics.split(",")]
     
     try:
-        weather_service_instance = WeatherService()
+        weather_service_instance = get_weather_service()
         
         # Usar fecha actual
         today = datetime.now()
@@ -261,7 +342,7 @@ async def custom_weather_analysis(
             future_days=min(future_days, 60)
         )
         
-        result = await weather_service.get_weather_probabilities(query)
+        result = await get_weather_service().get_weather_probabilities(query)
         
         # Agregar información adicional para análisis personalizado
         analysis_summary = {
@@ -291,7 +372,7 @@ async def export_weather_data(
         if format.lower() not in ["json", "csv"]:
             raise HTTPException(status_code=400, detail="Formato debe ser 'json' o 'csv'")
         
-        result = await weather_service.export_data(query, format)
+        result = await get_weather_service().export_data(query, format)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -15,6 +15,25 @@ MAX_CACHE_SIZE_MB = 500   # Tamaño máximo del cache en MB
 # Configuración de modelos ML
 MODEL_RETRAIN_THRESHOLD = 100  # Mínimo de datos nuevos para reentrenar
 MODEL_ACCURACY_THRESHOLD = 0.7  # Precisión mínima aceptable
+# Reentrenamiento incremental (warm start): árboles / etapas de boosting que se
+# añaden a cada modelo, como fracción de los que ya tiene (mínimo WARM_START_MIN_ESTIMATORS)
+WARM_START_FRACTION = 0.25
+WARM_START_MIN_ESTIMATORS = 10
+MODEL_FULL_RETRAIN_DAYS = 90  # Entrenamiento completo (GridSearch) como mucho cada N días
+# Clasificadores con CLASSIFIER_BACKEND="hist_gradient_boosting": tope de
+# iteraciones y parada temprana (validación interna) a partir de N muestras
+HGB_MAX_ITER = 500
+HGB_EARLY_STOPPING_MIN_SAMPLES = 1000
+HGB_VALIDATION_FRACTION = 0.1
+HGB_N_ITER_NO_CHANGE = 10
+# Compactación de modelos tras entrenar (MODEL_SIZE_BUDGET_KB): caída máxima de
+# R² / precisión en validación al quitar árboles o etapas, y mínimos del recorte
+COMPACTION_MAX_SCORE_DROP = 0.005
+COMPACTION_MIN_TREES = 10
+COMPACTION_MIN_DEPTH = 6
+# Peso (en años de observaciones) de la probabilidad del condition_classifier
+# al combinarla con la frecuencia empírica del día del año
+CONDITION_MODEL_PSEUDO_COUNT = 10
 
 # Configuración de APIs alternativas
 APIS_CONFIG = {
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Weather Probability API"
@@ -17,6 +17,8 @@ class Settings(BaseSettings):
     
     # Database (si necesitamos una más adelante)
     DATABASE_URL: str = "sqlite:///./weather_app.db"
+    # Backend del cache histórico: "file" (pickle por ubicación) o "sqlite" (DATABASE_URL)
+    HISTORICAL_STORE_BACKEND: str = "file"
     
     # Configuración de la aplicación
     DEBUG: bool = True
@@ -25,10 +27,65 @@ class Settings(BaseSettings):
     # APIs de datos meteorológicos
     NASA_POWER_ENABLED: bool = True
     GIOVANNI_ENABLED: bool = False
+    # URLs base (se pueden apuntar al servidor local de benchmarks/standin_server.py)
+    NASA_POWER_BASE_URL: str = "https://power.larc.nasa.gov/api/temporal/daily/point"
+    GIOVANNI_BASE_URL: str = "https://api.giovanni.earthdata.nasa.gov"
+    # Pausa (segundos) entre chunks de descarga de NASA POWER para no saturar la API
+    NASA_POWER_CHUNK_PAUSE: float = 1.0
     
     # Configuración de ML
     ML_ENABLED: bool = True
     CACHE_ENABLED: bool = True
+    # "per_location" (un juego de modelos por coordenada) o "global" (modelo
+    # multi-ubicación de train_global_model.py; los modelos por ubicación que
+    # existan siguen teniendo prioridad)
+    MODEL_MODE: str = "per_location"
+    # Clasificadores de precipitación y condiciones extremas: "gradient_boosting"
+    # (GradientBoostingClassifier exacto) o "hist_gradient_boosting"
+    # (HistGradientBoostingClassifier con parada temprana, ver benchmarks/bench_classifiers.py)
+    CLASSIFIER_BACKEND: str = "gradient_boosting"
+    # Compactar los modelos tras entrenar para que los pickles de una ubicación
+    # ocupen como mucho MODEL_SIZE_BUDGET_KB (ver app/data/model_compaction.py)
+    MODEL_COMPACTION_ENABLED: bool = True
+    MODEL_SIZE_BUDGET_KB: int = 2048
+    # Ubicación fría a menos de NEAREST_FALLBACK_RADIUS_KM de una ya entrenada:
+    # se responde con la vecina mientras se prepara la propia. Si el histórico
+    # de ambas está descargado, su clima (temperatura media en °C y
+    # precipitación media en mm/día) no puede diferir más de estos márgenes
+    NEAREST_FALLBACK_ENABLED: bool = True
+    NEAREST_FALLBACK_RADIUS_KM: float = 25.0
+    NEAREST_FALLBACK_MAX_TEMP_DIFF: float = 2.0
+    NEAREST_FALLBACK_MAX_PRECIP_DIFF: float = 1.0
+
+    # Gazetteer de /api/locations (.npz de build_gazetteer.py o TSV); sin valor
+    # se usa el incluido en app/data/world_cities.tsv
+    GAZETTEER_PATH: Optional[str] = None
+    
+    # Concurrencia: hilos para trabajo CPU (percentiles, serialización, pydantic)
+    CPU_EXECUTOR_WORKERS: int = 4
+    # Presupuesto de CPUs para entrenar, compartido por todos los procesos con
+    # lock files en TRAINING_CPU_SLOTS_DIR (0 = CPUs del equipo menos
+    # TRAINING_CPU_RESERVED, que quedan para servir la API). Cada entrenamiento
+    # usa como mucho TRAINING_MAX_CPUS_PER_JOB; los demás esperan en cola
+    TRAINING_CPU_BUDGET: int = 0
+    TRAINING_CPU_RESERVED: int = 1
+    TRAINING_MAX_CPUS_PER_JOB: int = 4
+    TRAINING_CPU_SLOTS_DIR: str = "weather_cache/cpu_slots"
+    # Intervalo (segundos) del monitor de bloqueo del event loop
+    EVENT_LOOP_MONITOR_INTERVAL: float = 0.5
+    
+    # Logging: nivel, formato ("text" o "json"), 1 de cada N mensajes repetitivos
+    # del camino de cada petición, y escritura en un hilo aparte (cola)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_SAMPLE_EVERY: int = 100
+    LOG_QUEUE: bool = True
+    
+    # Calentamiento de POPULAR_LOCATIONS al arrancar (readiness en /health/ready)
+    WARMUP_ENABLED: bool = True
+    
+    # Token para los endpoints /api/admin (profiler, memoria); sin token quedan desactivados
+    ADMIN_TOKEN: Optional[str] = None
     
     class Config:
         env_file = None  # Desactivar .env temporalmente
@@ -0,0 +1,175 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+import os
+import threading
+import time
+
+# Sin lockf (Windows) los slots solo se coordinan dentro del proceso
+_HAS_LOCKF = hasattr(os, "lockf")
+
+TRAINING_CPU_WAIT = REGISTRY.histogram(
+    "training_cpu_wait_seconds",
+    "Espera en cola de un entrenamiento hasta obtener CPUs del presupuesto"
+)
+
+def default_budget() -> int:
+    """TRAINING_CPU_BUDGET, o todas las CPUs menos TRAINING_CPU_RESERVED para la API"""
+    if settings.TRAINING_CPU_BUDGET > 0:
+        return settings.TRAINING_CPU_BUDGET
+    return max(1, (os.cpu_count() or 1) - settings.TRAINING_CPU_RESERVED)
+
+class CpuBudget:
+    """
+    Presupuesto fijo de CPUs para entrenar, compartido por todos los procesos
+    (workers de uvicorn, precompute_locations.py): ``total_slots`` archivos
+    ``slot-<i>.lock`` en ``slots_dir``, cada uno una CPU, tomados con un lock
+    POSIX no bloqueante (``lockf``: se puede consultar sin tomarlo). Un entrenamiento toma entre 1 y ``max_per_job`` slots libres,
+    usa ``n_jobs`` igual a los que tiene (y limita BLAS/OpenMP a ese número de
+    hilos) y los libera al terminar; si no hay ninguno libre espera en cola.
+
+    Los locks POSIX son del proceso (cerrar cualquier descriptor del archivo
+    los suelta): dentro del proceso los slots se coordinan con ``_held`` y todo
+    acceso a los archivos va bajo ``_lock``.
+
+    Dentro de un proceso solo entrena un job a la vez: los modelos en memoria
+    de ``RealWeatherDataService`` son compartidos (uno por proceso), así que
+    varios entrenamientos simultáneos se pisarían el estado.
+    """
+
+    def __init__(self, slots_dir: Path, total_slots: int, max_per_job: int, poll_interval: float = 0.5):
+        self.slots_dir = Path(slots_dir)
+        self.total_slots = max(1, total_slots)
+        self.max_per_job = max(1, min(max_per_job, self.total_slots))
+        self.poll_interval = poll_interval
+        # Slots de este proceso (sin lockf es la única coordinación)
+        self._held = set()
+        self._waiting = 0
+        self._lock = threading.Lock()
+        # Un entrenamiento por proceso
+        self._job_lock = threading.Lock()
+
+    def _slot_path(self, slot: int) -> Path:
+        return self.slots_dir / f"slot-{slot}.lock"
+
+    def _try_acquire(self, wanted: int) -> List[Tuple[int, Optional[object]]]:
+        acquired = []
+        with self._lock:
+            for slot in range(self.total_slots):
+                if len(acquired) == wanted:
+                    break
+                if slot in self._held:
+                    continue
+                handle = None
+                if _HAS_LOCKF:
+                    self.slots_dir.mkdir(parents=True, exist_ok=True)
+                    handle = open(self._slot_path(slot), "a+")
+                    try:
+                        os.lockf(handle.fileno(), os.F_TLOCK, 0)
+                    except OSError:
+                        handle.close()
+                        continue
+                self._held.add(slot)
+                acquired.append((slot, handle))
+        return acquired
+
+    def _release(self, acquired: List[Tuple[int, Optional[object]]]):
+        with self._lock:
+            for slot, handle in acquired:
+                if handle is not None:
+                    os.lockf(handle.fileno(), os.F_ULOCK, 0)
+                    handle.close()
+                self._held.discard(slot)
+
+    @contextmanager
+    def acquire(self, wanted: Optional[int] = None, on_wait: Optional[Callable[[], None]] = None) -> Iterator[int]:
+        """
+        Bloquea (en el hilo que entrena) hasta obtener al menos un slot y
+        devuelve el ``n_jobs`` asignado. ``on_wait`` se llama una vez si hay que esperar.
+        """
+        from threadpoolctl import threadpool_limits
+
+        wanted = max(1, min(wanted or self.max_per_job, self.max_per_job))
+        started = time.perf_counter()
+        job_acquired = self._job_lock.acquire(blocking=False)
+        acquired = self._try_acquire(wanted) if job_acquired else []
+        if not acquired:
+            if on_wait:
+                on_wait()
+            with self._lock:
+                self._waiting += 1
+            try:
+                if not job_acquired:
+                    self._job_lock.acquire()
+                    job_acquired = True
+                    acquired = self._try_acquire(wanted)
+                while not acquired:
+                    time.sleep(self.poll_interval)
+                    acquired = self._try_acquire(wanted)
+            except BaseException:
+                if job_acquired:
+                    self._job_lock.release()
+                raise
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        TRAINING_CPU_WAIT.observe(time.perf_counter() - started)
+
+        try:
+            with threadpool_limits(limits=len(acquired)):
+                yield len(acquired)
+        finally:
+            self._release(acquired)
+            self._job_lock.release()
+
+    @property
+    def waiting(self) -> int:
+        """Entrenamientos de este proceso esperando slots"""
+        return self._waiting
+
+    def busy_slots(self) -> int:
+        """
+        Slots ocupados en todos los procesos: los de este proceso más los que
+        otro tiene bloqueados (``F_TEST``, sin tomar ningún lock). Lee archivos:
+        desde el event loop, con ``asyncio.to_thread``.
+        """
+        if not _HAS_LOCKF:
+            return len(self._held)
+        with self._lock:
+            busy = len(self._held)
+            for slot in range(self.total_slots):
+                slot_path = self._slot_path(slot)
+                if slot in self._held or not slot_path.exists():
+                    continue
+                with open(slot_path, "a+") as handle:
+                    try:
+                        os.lockf(handle.fileno(), os.F_TEST, 0)
+                    except OSError:
+                        busy += 1
+            return busy
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "total_slots": self.total_slots,
+            "max_per_job": self.max_per_job,
+            "busy_slots": self.busy_slots(),
+            "held_by_this_process": len(self._held),
+            "waiting_in_this_process": self.waiting,
+        }
+
+training_budget = CpuBudget(
+    settings.TRAINING_CPU_SLOTS_DIR, default_budget(), settings.TRAINING_MAX_CPUS_PER_JOB
+)
+
+REGISTRY.gauge(
+    "training_cpu_slots",
+    "Slots del presupuesto de CPU de entrenamiento por estado",
+    ["state"],
+    callback=lambda: {
+        ("busy",): training_budget.busy_slots(),
+        ("total",): training_budget.total_slots,
+        ("waiting",): training_budget.waiting,
+    }
+)
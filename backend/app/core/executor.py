@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG
+import asyncio
+import contextvars
+import functools
+import statistics
+import time
+
+# Pool compartido para el trabajo CPU de las peticiones (se crea bajo demanda)
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Obtener el pool de hilos para trabajo CPU, de tamaño ``CPU_EXECUTOR_WORKERS``"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.CPU_EXECUTOR_WORKERS),
+            thread_name_prefix="cpu-worker"
+        )
+    return _cpu_executor
+
+async def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Ejecutar ``func`` en el pool de CPU sin bloquear el event loop.
+    Propaga las contextvars de la petición actual al hilo de trabajo.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_cpu_executor(), call)
+
+def shutdown_executors():
+    """Cerrar los pools al apagar la aplicación"""
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+
+class EventLoopLagMonitor:
+    """
+    Mide cuánto tiempo estuvo bloqueado el event loop: programa un sleep de
+    ``interval`` segundos y registra el retraso con el que realmente despierta.
+    """
+    def __init__(self, interval: float = 0.5, window: int = 1200):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.total_samples = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.record(lag)
+
+    def record(self, lag: float):
+        self.samples.append(lag)
+        self.total_samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        EVENT_LOOP_LAG.observe(lag)
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumen del retraso del loop en milisegundos (ventana reciente + acumulado)"""
+        recent = sorted(self.samples)
+        if recent:
+            p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))]
+            recent_stats = {
+                "last_ms": round(self.samples[-1] * 1000, 3),
+                "mean_ms": round(statistics.fmean(recent) * 1000, 3),
+                "p99_ms": round(p99 * 1000, 3),
+                "max_ms": round(recent[-1] * 1000, 3)
+            }
+        else:
+            recent_stats = {"last_ms": 0.0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "samples": self.total_samples,
+            "recent": recent_stats,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "total_lag_ms": round(self.total_lag * 1000, 3)
+        }
+
+# Monitor global del event loop
+event_loop_monitor = EventLoopLagMonitor(interval=settings.EVENT_LOOP_MONITOR_INTERVAL)
@@ -0,0 +1,106 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from datetime import datetime, timezone
+from app.core.config import settings
+import json
+import logging
+import queue
+import sys
+import threading
+
+# Atributos estándar de LogRecord: todo lo demás se considera campo estructurado (``extra=``)
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sampled"}
+
+def _structured_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED_ATTRS}
+
+class TextFormatter(logging.Formatter):
+    """``2025-10-05 12:00:00 INFO app.services.weather_service: mensaje key=value``"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _structured_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de ``extra=`` al primer nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(_structured_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar 1 de cada ``every`` registros marcados con ``extra={"sampled": True}``
+    (por plantilla de mensaje). Los demás registros pasan siempre.
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or self.every == 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging():
+    """
+    Configurar el logger ``app`` según settings: nivel (LOG_LEVEL), formato
+    text/json (LOG_FORMAT), muestreo de mensajes repetitivos (LOG_SAMPLE_EVERY)
+    y, con LOG_QUEUE, escritura en un hilo aparte para no bloquear el event loop.
+    """
+    global _listener
+    shutdown_logging()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter() if settings.LOG_FORMAT.lower() == "json" else TextFormatter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.propagate = False
+    for handler in list(app_logger.handlers):
+        app_logger.removeHandler(handler)
+
+    if settings.LOG_QUEUE:
+        log_queue: queue.Queue = queue.Queue(-1)
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        entry_handler: logging.Handler = QueueHandler(log_queue)
+    else:
+        entry_handler = stream_handler
+
+    # Los filtros de un logger no se aplican a sus hijos: el muestreo va en el
+    # handler de entrada, antes de formatear o encolar nada
+    entry_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_EVERY))
+    app_logger.addHandler(entry_handler)
+
+def shutdown_logging():
+    """Vaciar la cola de logs y detener el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
@@ -0,0 +1,150 @@
+from numbers import Number
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+import os
+import resource
+import sys
+
+# Objetos compartidos por todo el proceso: no se atribuyen a ninguna cache
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Estimación de los bytes retenidos por ``obj`` y todo lo que referencia.
+    Cada objeto se cuenta una vez por ``seen`` (compartir ``seen`` entre llamadas
+    evita contar dos veces lo compartido). Los arrays de numpy cuentan su buffer
+    y los objetos sin ``__dict__`` (p. ej. los árboles Cython de sklearn) se
+    recorren a través de ``__getstate__``.
+    """
+    if seen is None:
+        seen = set()
+
+    total = 0
+    stack = [obj]
+    # Los estados de __getstate__ son temporales: retenerlos para que sus id no se reutilicen
+    states = []
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+
+        if isinstance(current, np.ndarray):
+            if current.base is None:
+                total += sys.getsizeof(current)
+            elif isinstance(current.base, np.ndarray):
+                # Las vistas retienen el buffer de su base: contarlo una sola vez
+                total += current.__sizeof__()
+                stack.append(current.base)
+            else:
+                # Buffer ajeno (p. ej. los nodos de un árbol de sklearn)
+                total += current.__sizeof__() + current.nbytes
+            if current.dtype == object:
+                stack.extend(current.ravel())
+            continue
+
+        total += sys.getsizeof(current)
+        if isinstance(current, (str, bytes, bytearray, Number)):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        elif type(current).__getstate__ is not object.__getstate__:
+            try:
+                states.append(current.__getstate__())
+                stack.append(states[-1])
+            except Exception:
+                pass
+    return total
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """RSS actual (``/proc/self/statm``) y pico de RSS del proceso en bytes"""
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = peak if sys.platform == "darwin" else peak * 1024
+
+    rss = None
+    try:
+        with open("/proc/self/statm") as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return {"rss_bytes": rss, "peak_rss_bytes": peak_rss}
+
+def _historical_report(historical_data_cache: Dict[str, List[Dict]]) -> Dict:
+    locations = []
+    for location_key, rows in historical_data_cache.items():
+        size = deep_sizeof(rows)
+        numeric_fields = sum(1 for value in rows[0].values() if isinstance(value, Number)) if rows else 0
+        # Mismo contenido en columnas: float64 por campo numérico + datetime64 para la fecha
+        columnar = len(rows) * (numeric_fields + 1) * 8
+        locations.append({
+            "location_key": location_key,
+            "rows": len(rows),
+            "bytes": size,
+            "bytes_per_row": round(size / len(rows), 1) if rows else 0,
+            "columnar_estimate_bytes": columnar,
+        })
+    locations.sort(key=lambda item: item["bytes"], reverse=True)
+    return {
+        "total_bytes": sum(item["bytes"] for item in locations),
+        "total_rows": sum(item["rows"] for item in locations),
+        "columnar_estimate_bytes": sum(item["columnar_estimate_bytes"] for item in locations),
+        "locations": locations,
+    }
+
+def _models_report(real_data_service) -> Dict:
+    models = {
+        name: {"type": type(model).__name__, "bytes": deep_sizeof(model)}
+        for name, model in real_data_service.models.items() if model is not None
+    }
+    scalers = {}
+    if real_data_service.scalers.get("features") is not None:
+        scalers["features"] = deep_sizeof(real_data_service.scalers["features"])
+    for name, scaler in real_data_service.scalers.get("targets", {}).items():
+        scalers[f"targets.{name}"] = deep_sizeof(scaler)
+    return {
+        "location_key": getattr(real_data_service, "loaded_location_key", None),
+        "models": models,
+        "scalers": scalers,
+        "total_bytes": sum(item["bytes"] for item in models.values()) + sum(scalers.values()),
+    }
+
+def _jobs_report(jobs) -> Dict:
+    # Solo eventos y metadatos: el job referencia el event loop y su tarea
+    sizes = [deep_sizeof((job.events, job.error, job.location_key)) for job in jobs.values()]
+    return {"count": len(sizes), "total_bytes": sum(sizes)}
+
+def memory_report(weather_service, job_service=None, top: int = 10) -> Dict:
+    """
+    Bytes estimados por cache (histórico por ubicación, modelos y scalers
+    cargados, jobs) junto al RSS del proceso y los mayores consumidores.
+    """
+    historical = _historical_report(weather_service.historical_data_cache)
+    models = _models_report(weather_service.real_data_service)
+    jobs = _jobs_report(job_service.jobs) if job_service is not None else {"count": 0, "total_bytes": 0}
+
+    consumers = [
+        {"name": f"historical_data_cache[{item['location_key']}]", "bytes": item["bytes"]}
+        for item in historical["locations"]
+    ]
+    consumers += [{"name": f"models.{name}", "bytes": item["bytes"]} for name, item in models["models"].items()]
+    consumers += [{"name": f"scalers.{name}", "bytes": size} for name, size in models["scalers"].items()]
+    consumers.append({"name": "jobs", "bytes": jobs["total_bytes"]})
+    consumers.sort(key=lambda item: item["bytes"], reverse=True)
+
+    accounted = historical["total_bytes"] + models["total_bytes"] + jobs["total_bytes"]
+    return {
+        "pid": os.getpid(),
+        "process": process_memory(),
+        "accounted_bytes": accounted,
+        "historical_data_cache": historical,
+        "loaded_models": models,
+        "jobs": jobs,
+        "top_consumers": consumers[:top],
+    }
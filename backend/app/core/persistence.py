@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, IO, Iterator, Union
+import json
+import os
+import pickle
+import stat
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks advisory, solo escritura atómica
+    fcntl = None
+
+PathLike = Union[str, Path]
+
+# umask del proceso (leerlo exige cambiarlo: se hace una vez, al importar)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+@contextmanager
+def file_lock(path: PathLike, shared: bool = False) -> Iterator[None]:
+    """
+    Lock advisory entre procesos (varios workers de uvicorn) sobre ``<path>.lock``.
+    
+    Args:
+        path: Recurso a proteger (el lock vive en un archivo hermano)
+        shared: True para lock de lectura compartido, False para escritura exclusiva
+    """
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(lock_path, "a+") as lock_file:
+        if fcntl is None:
+            yield
+            return
+
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def atomic_write(path: PathLike, writer: Callable[[IO[bytes]], Any]):
+    """
+    Escribir un archivo de forma atómica: ``writer`` escribe en un temporal del
+    mismo directorio que después se renombra sobre el destino. Los lectores ven
+    siempre la versión anterior completa o la nueva completa, nunca un archivo a medias.
+    El archivo conserva los permisos del destino anterior o, si es nuevo, los de
+    un ``open`` normal (mkstemp crea el temporal con 0600).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            writer(tmp_file)
+            tmp_file.flush()
+            if hasattr(os, "fchmod"):
+                os.fchmod(tmp_file.fileno(), mode)
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+def atomic_write_bytes(path: PathLike, data: bytes):
+    atomic_write(path, lambda f: f.write(data))
+
+def atomic_pickle_dump(obj: Any, path: PathLike):
+    atomic_write(path, lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+def _json_default(value: Any):
+    # Escalares y arrays de numpy (métricas de sklearn) sin importar numpy aquí
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+def atomic_json_dump(obj: Any, path: PathLike):
+    data = json.dumps(obj, indent=2, default=_json_default).encode("utf-8")
+    atomic_write(path, lambda f: f.write(data))
+
+def atomic_joblib_dump(obj: Any, path: PathLike):
+    import joblib
+    atomic_write(path, lambda f: joblib.dump(obj, f))
@@ -0,0 +1,112 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+# Funciones hoja en las que un hilo está esperando (no consumiendo CPU)
+IDLE_LEAF_FUNCTIONS = {
+    "select", "poll", "epoll", "wait", "_wait_for_tstate_lock", "acquire", "get",
+    "accept", "recv", "recv_into", "sleep", "_worker", "run_forever", "_run_once"
+}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # Rutas relativas al paquete (site-packages/sklearn/... -> sklearn/...)
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        index = filename.rfind(marker)
+        if index != -1:
+            filename = filename[index + len(marker):]
+            break
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo de pilas: un hilo en segundo plano lee
+    ``sys._current_frames()`` cada ``interval`` segundos y acumula las pilas
+    de todos los hilos del proceso (salvo el suyo). Sin dependencias externas.
+    """
+    def __init__(self, interval: float = 0.01, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    def _sample(self, own_ident: int, thread_names: Dict[int, str]):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_LEAF_FUNCTIONS:
+                continue
+
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"thread-{ident}"))
+            self.stacks[tuple(reversed(stack))] += 1
+
+    def run(self, seconds: float):
+        """Muestrear durante ``seconds`` (bloqueante: llamar desde un hilo)"""
+        own_ident = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_ident, thread_names)
+            self.samples += 1
+            time.sleep(self.interval)
+        self.duration = time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """Pilas en formato "collapsed" (flamegraph.pl, speedscope, inferno)"""
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        ) + "\n"
+
+    def top_functions(self, limit: int = 25) -> List[Tuple[str, int, int]]:
+        """(función, muestras como hoja, muestras en la pila) ordenadas por tiempo propio"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(limit)]
+
+    def summary(self, limit: int = 25) -> Dict:
+        total_samples = sum(self.stacks.values())
+        return {
+            "pid": os.getpid(),
+            "duration_s": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "sampling_rounds": self.samples,
+            "stack_samples": total_samples,
+            "top_functions": [
+                {
+                    "function": label,
+                    "self_samples": own,
+                    "self_percent": round(own * 100 / total_samples, 2) if total_samples else 0,
+                    "total_samples": total,
+                }
+                for label, own, total in self.top_functions(limit)
+            ]
+        }
+
+# Un solo perfilado a la vez por proceso (el muestreo afecta al propio worker)
+_profile_lock = threading.Lock()
+
+def profile_process(seconds: float, interval: float = 0.01, include_idle: bool = False) -> Optional[SamplingProfiler]:
+    """Perfilar el proceso actual. Retorna None si ya hay un perfilado en curso"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(interval, include_idle)
+        profiler.run(seconds)
+        return profiler
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from app.core.metrics import STAGE_DURATION
+import time
+
+class Span:
+    """Tramo de una traza: nombre, duración, atributos (caches, filas...) e hijos"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return (end - self.started) * 1000
+
+    def walk(self) -> Iterator["Span"]:
+        """Recorrer los tramos descendientes en profundidad (sin incluir este)"""
+        for child in list(self.children):
+            yield child
+            yield from child.walk()
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.started if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in list(self.children)]
+        }
+
+# Tramo activo de la petición en curso (None si no se está trazando).
+# run_cpu_bound y asyncio.to_thread copian el contexto, así que los tramos
+# abiertos en hilos de trabajo cuelgan del tramo que los lanzó.
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Span]:
+    """Abrir la traza raíz de una petición"""
+    root = Span(name)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        _current_span.reset(token)
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Tramo hijo del tramo activo; no hace nada si no hay traza en curso"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+@contextmanager
+def stage(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Etapa del cálculo: alimenta el histograma de /metrics y la traza de la petición"""
+    with STAGE_DURATION.labels(stage=name).time(), span(name, **attributes) as current:
+        yield current
+
+def annotate(**attributes):
+    """Añadir atributos al tramo activo (p. ej. ``historical_cache="hit"``)"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+def server_timing_header(root: Span) -> str:
+    """Valor del header ``Server-Timing`` con cada tramo de la traza y el total"""
+    entries = [f"{current.name};dur={current.duration_ms:.1f}" for current in root.walk()]
+    entries.append(f"total;dur={root.duration_ms:.1f}")
+    return ", ".join(entries)
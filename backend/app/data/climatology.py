@@ -0,0 +1,138 @@
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.persistence import atomic_write
+import numpy as np
+
+# Columnas numéricas del histórico diario (mismas claves que los registros de NASA POWER)
+COLUMNS = [
+    "temperature", "temperature_max", "temperature_min",
+    "precipitation", "wind_speed", "humidity", "heat_index"
+]
+
+# Umbrales por percentil de predict_probabilities: (columna, percentil, por encima)
+CONDITION_PERCENTILES = {
+    "very_hot": ("temperature", 90, True),
+    "very_cold": ("temperature", 10, False),
+    "very_windy": ("wind_speed", 85, True),
+    "very_wet": ("precipitation", 80, True),
+    "very_uncomfortable": ("heat_index", 85, True),
+}
+
+# Clases de condition_classifier (_create_extreme_condition_labels) que cuentan
+# para cada condición: 0 calor húmedo, 1 calor seco, 2 frío. Las etiquetas son
+# excluyentes (calor > frío > lluvia > viento), así que las clases 3 (lluvia) y
+# 4 (viento) no incluyen los días de lluvia o viento que además son de calor o
+# frío: very_wet, very_windy y very_uncomfortable quedan solo con la frecuencia empírica
+CONDITION_MODEL_CLASSES = {
+    "very_hot": (0, 1),
+    "very_cold": (2,),
+}
+
+DAYS_IN_TABLE = 366
+
+# Días del año distintos de un histórico completo (el 29-02 puede faltar). Con
+# menos, los registros son un subconjunto (p. ej. los de un solo día del año)
+FULL_YEAR_DAYS = 365
+
+def day_index(month: int, day: int) -> int:
+    """Posición 0..365 del día del año en un calendario bisiesto (29-02 tiene la suya)"""
+    return (date(2000, month, day) - date(2000, 1, 1)).days
+
+def day_indices(dates) -> np.ndarray:
+    """``day_index`` de cada fecha (datetime o ISO)"""
+    parsed = [value if isinstance(value, (datetime, date)) else datetime.fromisoformat(str(value)) for value in dates]
+    return np.array([day_index(value.month, value.day) for value in parsed], dtype=np.int64)
+
+def _day_groups(index: np.ndarray) -> List[np.ndarray]:
+    """Posiciones de los registros de cada día del año presente en ``index``"""
+    order = np.argsort(index, kind="stable")
+    return [group for group in np.split(order, np.flatnonzero(np.diff(index[order])) + 1) if group.size]
+
+def percentile_by_day(values: np.ndarray, index: np.ndarray, percentile: float) -> np.ndarray:
+    """Percentil de ``values`` entre los registros de su mismo día del año (uno por registro)"""
+    thresholds = np.full(DAYS_IN_TABLE, np.nan)
+    for group in _day_groups(index):
+        thresholds[index[group[0]]] = np.percentile(values[group], percentile)
+    return thresholds[index]
+
+def mean_by_day(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Media de ``values`` por día del año (366 posiciones, NaN en días sin registros)"""
+    counts = np.bincount(index, minlength=DAYS_IN_TABLE)
+    sums = np.bincount(index, weights=values, minlength=DAYS_IN_TABLE)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def columnar_path(data_dir: Path, location_key: str) -> Path:
+    return Path(data_dir) / "columnar" / f"{location_key}.npz"
+
+def climatology_path(data_dir: Path, location_key: str) -> Path:
+    return Path(data_dir) / "climatology" / f"{location_key}.npz"
+
+def rows_to_columns(rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Registros diarios (un dict por día) a un array por columna, ordenados por fecha"""
+    dates = [row["date"] if isinstance(row["date"], datetime) else datetime.fromisoformat(str(row["date"])) for row in rows]
+    order = np.argsort(np.array(dates, dtype="datetime64[D]"), kind="stable")
+    columns = {"date": np.array(dates, dtype="datetime64[D]")[order]}
+    for name in COLUMNS:
+        values = np.array([row.get(name, np.nan) for row in rows], dtype=np.float64)
+        columns[name] = values[order]
+    return columns
+
+def save_npz(path: Path, arrays: Dict[str, np.ndarray]):
+    atomic_write(path, lambda f: np.savez_compressed(f, **arrays))
+
+def load_npz(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    if not Path(path).exists():
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def build_climatology(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Tabla por día del año (366 filas): muestras, medias y, para cada condición,
+    el umbral por percentil y la fracción de años que lo superan. Con los datos
+    de un solo día coincide con lo que calcula ``predict_probabilities``.
+    """
+    dates = columns["date"].astype("datetime64[D]")
+    months = dates.astype("datetime64[M]").astype(int) % 12 + 1
+    days = (dates - dates.astype("datetime64[M]")).astype(int) + 1
+    index = np.array([day_index(month, day) for month, day in zip(months, days)], dtype=np.int64)
+
+    table = {"samples": np.bincount(index, minlength=DAYS_IN_TABLE).astype(np.int32)}
+    for name in ("temperature", "precipitation", "wind_speed", "humidity"):
+        table[f"{name}_mean"] = np.full(DAYS_IN_TABLE, np.nan)
+    for condition in CONDITION_PERCENTILES:
+        table[f"{condition}_threshold"] = np.full(DAYS_IN_TABLE, np.nan)
+        table[f"{condition}_probability"] = np.full(DAYS_IN_TABLE, np.nan)
+
+    for group in _day_groups(index):
+        day = index[group[0]]
+        for name in ("temperature", "precipitation", "wind_speed", "humidity"):
+            table[f"{name}_mean"][day] = columns[name][group].mean()
+        for condition, (name, percentile, above) in CONDITION_PERCENTILES.items():
+            values = columns[name][group]
+            threshold = np.percentile(values, percentile)
+            table[f"{condition}_threshold"][day] = threshold
+            table[f"{condition}_probability"][day] = np.mean(values > threshold if above else values < threshold)
+    return table
+
+def covers_full_year(index: np.ndarray) -> bool:
+    """Los registros (``day_indices``) cubren todos los días del año"""
+    return np.unique(index).size >= FULL_YEAR_DAYS
+
+def has_model_probabilities(table: Optional[Dict[str, np.ndarray]]) -> bool:
+    """La tabla tiene probabilidades del modelo para todo el año (no solo para unos días)"""
+    return table is not None and all(
+        f"{condition}_model_probability" in table
+        and np.count_nonzero(~np.isnan(table[f"{condition}_model_probability"])) >= FULL_YEAR_DAYS
+        for condition in CONDITION_MODEL_CLASSES
+    )
+
+def blend_probability(empirical: float, model: float, samples: int, pseudo_count: float) -> float:
+    """
+    Frecuencia empírica de ``samples`` años combinada con la probabilidad del
+    modelo como si esta valiera ``pseudo_count`` años más: con pocos años pesa
+    el modelo y con muchos la frecuencia observada.
+    """
+    return float((samples * empirical + pseudo_count * model) / (samples + pseudo_count))
@@ -0,0 +1,246 @@
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.persistence import atomic_write
+from app.data.spatial_index import chord_to_km, km_to_chord, to_unit_vectors
+import csv
+import gzip
+import threading
+import unicodedata
+import numpy as np
+
+# Gazetteer incluido en el repositorio (ciudades principales); con GAZETTEER_PATH
+# se usa otro, p. ej. el .npz que genera build_gazetteer.py a partir de GeoNames
+BUNDLED_GAZETTEER = Path(__file__).resolve().parent / "world_cities.tsv"
+
+# Columnas del formato TSV propio (con cabecera)
+TSV_COLUMNS = ["id", "name", "country", "latitude", "longitude", "timezone", "population"]
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y con espacios simples: 'São Paulo' -> 'sao paulo'"""
+    if text.isascii():
+        return " ".join(text.lower().split())
+    decomposed = unicodedata.normalize("NFKD", text)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _open_text(path: Path):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+class Gazetteer:
+    """
+    Lugares en arrays (sin un dict por lugar): coordenadas float32, población,
+    códigos de país y zona horaria, y los nombres como un único bloque UTF-8
+    con offsets. Encima se construyen:
+
+    - un KD-tree sobre la esfera unidad para consultas por radio y k vecinos;
+    - un índice de nombres normalizados ordenados (búsqueda por prefijo) y
+      listas de trigramas (búsqueda por subcadena).
+    """
+
+    def __init__(self, ids, names: List[str], countries: List[str], latitudes, longitudes,
+                 timezones: List[str], populations):
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.latitudes = np.asarray(latitudes, dtype=np.float32)
+        self.longitudes = np.asarray(longitudes, dtype=np.float32)
+        self.populations = np.asarray(populations, dtype=np.int64)
+
+        encoded = [name.encode("utf-8") for name in names]
+        self.name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=self.name_offsets[1:])
+        self.name_blob = b"".join(encoded)
+
+        self.country_names, country_codes = np.unique(np.asarray(countries, dtype=object).astype(str), return_inverse=True)
+        self.country_codes = country_codes.astype(np.int16)
+        self.timezone_names, timezone_codes = np.unique(np.asarray(timezones, dtype=object).astype(str), return_inverse=True)
+        self.timezone_codes = timezone_codes.astype(np.int16)
+
+        self._build_indexes(names)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_indexes(self, names: List[str]):
+        from sklearn.neighbors import KDTree
+
+        self._tree = KDTree(to_unit_vectors(self.latitudes, self.longitudes))
+
+        # Nombres normalizados: ordenados para prefijos y por trigrama para subcadenas
+        self._normalized = [normalize(name) for name in names]
+        self._sorted_order = np.array(sorted(range(len(names)), key=self._normalized.__getitem__), dtype=np.int32)
+        self._sorted_names = [self._normalized[i] for i in self._sorted_order]
+
+        postings: Dict[str, List[int]] = {}
+        for index, name in enumerate(self._normalized):
+            for trigram in trigrams(name):
+                postings.setdefault(trigram, []).append(index)
+        self._trigrams = {trigram: np.array(indices, dtype=np.int32) for trigram, indices in postings.items()}
+
+        self._normalized_countries = [normalize(country) for country in self.country_names]
+
+    def name(self, index: int) -> str:
+        return self.name_blob[self.name_offsets[index]:self.name_offsets[index + 1]].decode("utf-8")
+
+    def record(self, index: int) -> Dict[str, Any]:
+        return {
+            "id": int(self.ids[index]),
+            "name": self.name(index),
+            "country": str(self.country_names[self.country_codes[index]]),
+            "latitude": round(float(self.latitudes[index]), 4),
+            "longitude": round(float(self.longitudes[index]), 4),
+            "timezone": str(self.timezone_names[self.timezone_codes[index]]),
+            "population": int(self.populations[index])
+        }
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lugares a menos de ``radius_km``, del más cercano al más lejano (con ``distance_km``)"""
+        indices, chords = self._tree.query_radius(
+            to_unit_vectors([latitude], [longitude]), r=km_to_chord(radius_km),
+            return_distance=True, sort_results=True
+        )
+        return self._with_distances(indices[0][:limit], chords[0][:limit])
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Dict[str, Any]]:
+        """Los ``k`` lugares más cercanos (con ``distance_km``)"""
+        chords, indices = self._tree.query(to_unit_vectors([latitude], [longitude]), k=min(k, len(self)))
+        return self._with_distances(indices[0], chords[0])
+
+    def _with_distances(self, indices, chords) -> List[Dict[str, Any]]:
+        results = []
+        for index, distance in zip(indices, chord_to_km(chords)):
+            record = self.record(index)
+            record["distance_km"] = round(float(distance), 2)
+            results.append(record)
+        return results
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Busca por nombre (prefijo o subcadena, sin distinguir acentos ni
+        mayúsculas) o por país. Orden: coincidencia exacta, prefijo, subcadena,
+        país; dentro de cada grupo, por población.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+
+        # 0 exacta, 1 prefijo, 2 subcadena, 3 país (se queda la mejor por lugar)
+        ranks: Dict[int, int] = {}
+
+        start = bisect_left(self._sorted_names, text)
+        end = bisect_left(self._sorted_names, text + "\U0010ffff", lo=start)
+        for index in self._sorted_order[start:end].tolist():
+            ranks[index] = 0 if self._normalized[index] == text else 1
+
+        if len(text) >= 3:
+            postings = sorted((self._trigrams.get(trigram) for trigram in trigrams(text)),
+                              key=lambda indices: 0 if indices is None else len(indices))
+            candidates = postings[0] if postings[0] is not None else np.empty(0, dtype=np.int32)
+            for indices in postings[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, indices, assume_unique=True)
+            for index in candidates.tolist():
+                if index not in ranks and text in self._normalized[index]:
+                    ranks[index] = 2
+
+        country_codes = [code for code, country in enumerate(self._normalized_countries) if text in country]
+        if country_codes:
+            in_country = np.flatnonzero(np.isin(self.country_codes, country_codes))
+            # Solo hacen falta los más poblados de esos países
+            if len(in_country) > limit:
+                in_country = in_country[np.argpartition(-self.populations[in_country], limit - 1)[:limit]]
+            for index in in_country.tolist():
+                ranks.setdefault(index, 3)
+
+        if not ranks:
+            return []
+        indices = np.fromiter(ranks.keys(), dtype=np.int64, count=len(ranks))
+        order = np.lexsort((-self.populations[indices], np.fromiter(ranks.values(), dtype=np.int64, count=len(ranks))))
+        return [self.record(index) for index in indices[order[:limit]]]
+
+    # --- Persistencia -----------------------------------------------------
+
+    def save_npz(self, path: Path):
+        """Formato compacto (arrays) que carga ``load_gazetteer`` sin parsear texto"""
+        arrays = {
+            "ids": self.ids, "latitudes": self.latitudes, "longitudes": self.longitudes,
+            "populations": self.populations,
+            "name_blob": np.frombuffer(self.name_blob, dtype=np.uint8), "name_offsets": self.name_offsets,
+            "country_names": self.country_names.astype(str), "country_codes": self.country_codes,
+            "timezone_names": self.timezone_names.astype(str), "timezone_codes": self.timezone_codes,
+        }
+        atomic_write(path, lambda f: np.savez_compressed(f, **arrays))
+
+    @classmethod
+    def from_npz(cls, path: Path) -> "Gazetteer":
+        with np.load(path) as data:
+            blob = data["name_blob"].tobytes()
+            offsets = data["name_offsets"]
+            names = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            return cls(
+                data["ids"], names,
+                data["country_names"][data["country_codes"]].tolist(),
+                data["latitudes"], data["longitudes"],
+                data["timezone_names"][data["timezone_codes"]].tolist(),
+                data["populations"]
+            )
+
+    @classmethod
+    def from_tsv(cls, path: Path) -> "Gazetteer":
+        """TSV con cabecera ``TSV_COLUMNS`` (como ``world_cities.tsv``)"""
+        columns = {name: [] for name in TSV_COLUMNS}
+        with _open_text(path) as tsv_file:
+            for row in csv.DictReader(tsv_file, delimiter="\t"):
+                for name in TSV_COLUMNS:
+                    columns[name].append(row[name])
+        return cls(
+            [int(value) for value in columns["id"]], columns["name"], columns["country"],
+            [float(value) for value in columns["latitude"]], [float(value) for value in columns["longitude"]],
+            columns["timezone"], [int(value or 0) for value in columns["population"]]
+        )
+
+    @classmethod
+    def from_geonames(cls, path: Path, country_names: Optional[Dict[str, str]] = None,
+                      min_population: int = 0) -> "Gazetteer":
+        """
+        Volcado de GeoNames (``cities500.txt``, ``cities15000.txt``...): TSV sin
+        cabecera; ``country_names`` traduce el código ISO de país a nombre.
+        """
+        ids, names, countries, latitudes, longitudes, timezones, populations = [], [], [], [], [], [], []
+        with _open_text(path) as geonames_file:
+            for row in csv.reader(geonames_file, delimiter="\t", quoting=csv.QUOTE_NONE):
+                population = int(row[14] or 0)
+                if population < min_population:
+                    continue
+                ids.append(int(row[0]))
+                names.append(row[1])
+                latitudes.append(float(row[4]))
+                longitudes.append(float(row[5]))
+                countries.append((country_names or {}).get(row[8], row[8]))
+                timezones.append(row[17])
+                populations.append(population)
+        return cls(ids, names, countries, latitudes, longitudes, timezones, populations)
+
+def load_gazetteer(path: Path) -> Gazetteer:
+    path = Path(path)
+    if path.suffix == ".npz":
+        return Gazetteer.from_npz(path)
+    return Gazetteer.from_tsv(path)
+
+# Se carga una vez (en el lifespan de la app o en la primera consulta)
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer(settings.GAZETTEER_PATH or BUNDLED_GAZETTEER)
+    return _gazetteer
@@ -15,8 +15,14 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, mean_squared_error
 import warnings
 import urllib.parse
+import time
+from app.core.config import settings
+from app.core.metrics import OUTBOUND_REQUEST_DURATION
+from app.core.logging import get_logger
 warnings.filterwarnings('ignore')
 
+logger = get_logger(__name__)
+
 class GiovanniNASADataService:
     def __init__(self):
         self.data_cache_dir = Path("data_cache")
@@ -25,7 +31,7 @@ class GiovanniNASADataService:
         self.models_dir.mkdir(exist_ok=True)
         
         # Giovanni NASA API configuration
-        self.giovanni_base_url = "https://api.giovanni.earthdata.nasa.gov"
+        self.giovanni_base_url = settings.GIOVANNI_BASE_URL
         
         # Variables meteorológicas disponibles en Giovanni
         self.variables = {
@@ -107,6 +113,7 @@ class GiovanniNASADataService:
         """
         Obtiene datos de Giovanni NASA API
         """
+        started = time.perf_counter()
         try:
             url = self.build_giovanni_url(
                 variable=variable,
@@ -115,7 +122,7 @@ class GiovanniNASADataService:
                 endpoint="proxy-timeseries"
             )
             
-            print(f"Fetching from Giovanni: {url}")
+            logger.debug("Fetching from Giovanni: %s", url)
             
             async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
                 headers = {
@@ -124,17 +131,19 @@ class GiovanniNASADataService:
                 }
                 
                 async with session.get(url, headers=headers) as response:
+                    OUTBOUND_REQUEST_DURATION.labels(source="giovanni", status=response.status).observe(time.perf_counter() - started)
                     if response.status == 200:
                         data = await response.json()
                         return self.process_giovanni_data(data, variable)
                     else:
-                        print(f"Error fetching Giovanni data: {response.status}")
+                        logger.warning("Error fetching Giovanni data", extra={"status": response.status})
                         error_text = await response.text()
-                        print(f"Error details: {error_text}")
+                        logger.debug("Giovanni error details: %s", error_text)
                         return None
                         
         except Exception as e:
-            print(f"Error in Giovanni API call: {e}")
+            OUTBOUND_REQUEST_DURATION.labels(source="giovanni", status="error").observe(time.perf_counter() - started)
+            logger.warning("Error in Giovanni API call: %s", e)
             return None
     
     def process_giovanni_data(self, raw_data: Dict, variable: str) -> Dict:
@@ -166,7 +175,7 @@ class GiovanniNASADataService:
             }
             
         except Exception as e:
-            print(f"Error processing Giovanni data: {e}")
+            logger.warning("Error processing Giovanni data: %s", e)
             return {'data': [], 'source': 'NASA_Giovanni', 'variable': variable, 'count': 0}
     
     async def get_multi_variable_data(self, latitude: float, longitude: float, 
@@ -177,7 +186,7 @@ class GiovanniNASADataService:
         all_data = {}
         
         for var_name, var_config in self.variables.items():
-            print(f"Fetching {var_name} data...")
+            logger.debug("Fetching Giovanni variable", extra={"variable": var_name})
             
             giovanni_data = await self.fetch_giovanni_data(
                 variable=var_config['dataset'],
@@ -189,9 +198,9 @@ class GiovanniNASADataService:
             
             if giovanni_data and giovanni_data['data']:
                 all_data[var_name] = giovanni_data['data']
-                print(f"✅ {var_name}: {len(giovanni_data['data'])} points")
+                logger.debug("Giovanni variable fetched", extra={"variable": var_name, "points": len(giovanni_data['data'])})
             else:
-                print(f"❌ No data for {var_name}")
+                logger.warning("No Giovanni data for variable", extra={"variable": var_name})
                 all_data[var_name] = []
             
             # Pausa para evitar sobrecarga del servidor
@@ -303,10 +312,10 @@ class GiovanniNASADataService:
                     if len(cached_data) > 0:
                         return self.filter_by_date_of_year(cached_data, date_of_year)
             except Exception as e:
-                print(f"Error loading cache: {e}")
+                logger.warning("Error loading cache: %s", e)
         
         # Obtener datos de Giovanni
-        print(f"Fetching Giovanni data for {latitude}, {longitude} from {start_year} to {current_year}")
+        logger.info("Fetching Giovanni data", extra={"latitude": latitude, "longitude": longitude, "start_year": start_year, "end_year": current_year})
         
         start_date = f"{start_year}-01-01"
         end_date = f"{current_year-1}-12-31"
@@ -324,9 +333,9 @@ class GiovanniNASADataService:
             try:
                 with open(cache_path, 'wb') as f:
                     pickle.dump(combined_data, f)
-                print(f"✅ Cached {len(combined_data)} records")
+                logger.info("Giovanni data cached", extra={"records": len(combined_data)})
             except Exception as e:
-                print(f"Error saving cache: {e}")
+                logger.warning("Error saving cache: %s", e)
         
         return self.filter_by_date_of_year(combined_data, date_of_year)
     
@@ -349,11 +358,11 @@ class GiovanniNASADataService:
                 if days_diff <= 3 or days_diff >= 362:  # También incluir wrap-around del año
                     filtered_data.append(item)
             
-            print(f"Filtered to {len(filtered_data)} records for date {date_of_year}")
+            logger.debug("Filtered Giovanni records by date", extra={"records": len(filtered_data), "date_of_year": date_of_year, "sampled": True})
             return filtered_data
             
         except Exception as e:
-            print(f"Error filtering data by date: {e}")
+            logger.warning("Error filtering data by date: %s", e)
             return []
     
     def train_prediction_models(self, data: List[Dict], latitude: float, longitude: float):
@@ -361,16 +370,16 @@ class GiovanniNASADataService:
         Entrena modelos de ML con los datos históricos de Giovanni
         """
         if len(data) < 5:  # Menos datos requeridos debido a calidad superior
-            print("Not enough Giovanni data to train models")
+            logger.warning("Not enough Giovanni data to train models", extra={"records": len(data)})
             return
         
-        print(f"Training models with {len(data)} Giovanni data points...")
+        logger.info("Training Giovanni models", extra={"data_points": len(data)})
         
         # Preparar features
         X = self.prepare_features(data, latitude, longitude)
         
         if X.shape[0] == 0:
-            print("No valid features for training")
+            logger.warning("No valid features for training")
             return
         
         # Entrenar modelos específicos para datos Giovanni
@@ -379,7 +388,7 @@ class GiovanniNASADataService:
         # Guardar modelos entrenados
         self.save_trained_models()
         
-        print("Giovanni-based models trained and saved successfully!")
+        logger.info("Giovanni-based models trained and saved")
     
     def prepare_features(self, data: List[Dict], latitude: float, longitude: float) -> np.ndarray:
         """
@@ -554,7 +563,7 @@ class GiovanniNASADataService:
             joblib.dump(self.scalers, scaler_path)
             
         except Exception as e:
-            print(f"Error saving Giovanni models: {e}")
+            logger.warning("Error saving Giovanni models: %s", e)
     
     def load_trained_models(self):
         """
@@ -572,7 +581,19 @@ class GiovanniNASADataService:
                 self.scalers = joblib.load(scaler_path)
                 
         except Exception as e:
-            print(f"Error loading Giovanni models: {e}")
+            logger.warning("Error loading Giovanni models: %s", e)
+
+# Instancia global (se crea bajo demanda: cargar sus modelos solo tiene sentido con GIOVANNI_ENABLED)
+_giovanni_weather_service = None
+
+def get_giovanni_weather_service() -> GiovanniNASADataService:
+    global _giovanni_weather_service
+    if _giovanni_weather_service is None:
+        _giovanni_weather_service = GiovanniNASADataService()
+    return _giovanni_weather_service
 
-# Instancia global
-giovanni_weather_service = GiovanniNASADataService()
\ No newline at end of file
+def __getattr__(name):
+    # Compatibilidad: ``from app.data.giovanni_nasa_data import giovanni_weather_service``
+    if name == "giovanni_weather_service":
+        return get_giovanni_weather_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
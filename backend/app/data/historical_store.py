@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+from datetime import date, datetime
+from app.core.config import settings
+from app.core.persistence import atomic_pickle_dump, atomic_write_bytes, file_lock
+import json
+import pickle
+
+def row_date(row: Dict[str, Any]) -> datetime:
+    """Fecha de un registro histórico (los registros guardan datetime o ISO string)"""
+    value = row['date']
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+class FileHistoricalStore:
+    """
+    Almacén en disco del cache de datos históricos, un archivo por ubicación.
+
+    Estructura:
+        weather_cache/locations/<location_key>.pkl          datos históricos
+        weather_cache/locations/<location_key>.models.json  marca de modelos entrenados
+
+    Cada escritura toca solo la ubicación modificada, usa un temporal + rename
+    atómico y se coordina entre workers con un lock advisory por ubicación.
+    Los archivos globales antiguos (historical_data_cache.pkl / models_cache.pkl)
+    se leen como base pero nunca se reescriben.
+    """
+    LEGACY_HISTORICAL_FILE = "historical_data_cache.pkl"
+    LEGACY_MODELS_FILE = "models_cache.pkl"
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.locations_dir = self.cache_dir / "locations"
+        self.locations_dir.mkdir(parents=True, exist_ok=True)
+
+    def _data_path(self, location_key: str) -> Path:
+        return self.locations_dir / f"{location_key}.pkl"
+
+    def _models_marker_path(self, location_key: str) -> Path:
+        return self.locations_dir / f"{location_key}.models.json"
+
+    def _load_legacy(self, filename: str) -> Dict[str, Any]:
+        legacy_file = self.cache_dir / filename
+        if not legacy_file.exists():
+            return {}
+        with open(legacy_file, 'rb') as f:
+            return pickle.load(f)
+
+    def keys(self) -> List[str]:
+        keys = set(self._load_legacy(self.LEGACY_HISTORICAL_FILE).keys())
+        keys.update(path.stem for path in self.locations_dir.glob("*.pkl"))
+        return sorted(keys)
+
+    def load(self, location_key: str) -> Optional[List[Dict[str, Any]]]:
+        data_path = self._data_path(location_key)
+        if data_path.exists():
+            with open(data_path, 'rb') as f:
+                return pickle.load(f)
+        return self._load_legacy(self.LEGACY_HISTORICAL_FILE).get(location_key)
+
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Cargar todas las ubicaciones (los archivos por ubicación tienen prioridad sobre el legado)"""
+        data = dict(self._load_legacy(self.LEGACY_HISTORICAL_FILE))
+        for data_path in self.locations_dir.glob("*.pkl"):
+            with open(data_path, 'rb') as f:
+                data[data_path.stem] = pickle.load(f)
+        return data
+
+    def save(self, location_key: str, rows: List[Dict[str, Any]]):
+        """Persistir (reemplazar) los datos de UNA ubicación"""
+        data_path = self._data_path(location_key)
+        with file_lock(data_path):
+            atomic_pickle_dump(rows, data_path)
+
+    def append(self, location_key: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        Añadir registros a una ubicación (los de fechas ya existentes se reemplazan).
+        Retorna el número de fechas nuevas.
+        """
+        data_path = self._data_path(location_key)
+        with file_lock(data_path):
+            existing = {row_date(row): row for row in (self.load(location_key) or [])}
+            before = len(existing)
+            for row in rows:
+                existing[row_date(row)] = row
+            atomic_pickle_dump([existing[day] for day in sorted(existing)], data_path)
+        return len(existing) - before
+
+    def query_range(self, location_key: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Registros con fecha en [start, end], ordenados por fecha"""
+        rows = [row for row in (self.load(location_key) or []) if start <= row_date(row) <= end]
+        return sorted(rows, key=row_date)
+
+    def query_day_of_year(self, location_key: str, month: int, day: int) -> List[Dict[str, Any]]:
+        """Registros de un mismo día del año (MM-DD) en todos los años disponibles"""
+        rows = []
+        for row in self.load(location_key) or []:
+            row_day = row_date(row)
+            if row_day.month == month and row_day.day == day:
+                rows.append(row)
+        return sorted(rows, key=row_date)
+
+    def delete(self, location_key: str):
+        for path in (self._data_path(location_key), self._models_marker_path(location_key)):
+            with file_lock(path):
+                path.unlink(missing_ok=True)
+
+    def trained_keys(self) -> Set[str]:
+        trained = {key for key, ready in self._load_legacy(self.LEGACY_MODELS_FILE).items() if ready}
+        trained.update(path.name[:-len(".models.json")] for path in self.locations_dir.glob("*.models.json"))
+        return trained
+
+    def mark_trained(self, location_key: str):
+        marker_path = self._models_marker_path(location_key)
+        marker = {"trained": True, "updated_at": datetime.now().isoformat()}
+        with file_lock(marker_path):
+            atomic_write_bytes(marker_path, json.dumps(marker).encode("utf-8"))
+
+def create_historical_store(cache_dir: Path):
+    """Crear el almacén histórico configurado en ``HISTORICAL_STORE_BACKEND``"""
+    backend = settings.HISTORICAL_STORE_BACKEND.lower()
+    if backend == "sqlite":
+        from app.data.sqlite_store import SQLiteHistoricalStore
+        return SQLiteHistoricalStore.from_url(settings.DATABASE_URL)
+    if backend != "file":
+        raise ValueError(f"Unknown HISTORICAL_STORE_BACKEND: {settings.HISTORICAL_STORE_BACKEND}")
+    return FileHistoricalStore(cache_dir)
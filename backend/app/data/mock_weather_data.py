@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import random
@@ -116,6 +115,8 @@ class MockWeatherDataGenerator:
     
     def calculate_probabilities(self, historical_data: List[Dict[str, Any]]) -> Dict[str, float]:
         """Calcula las probabilidades de condiciones extremas"""
+        import pandas as pd
+        
         df = pd.DataFrame(historical_data)
         
         probabilities = {}
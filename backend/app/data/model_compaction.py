@@ -0,0 +1,241 @@
+from typing import Any, Dict, List, Optional, Tuple
+import io
+import time
+import numpy as np
+
+def _r2(y: np.ndarray, predictions: np.ndarray) -> np.ndarray:
+    """R² de una o varias filas de predicciones (última dimensión = muestras)"""
+    total = float(((y - y.mean()) ** 2).sum())
+    residual = ((predictions - y) ** 2).sum(axis=-1)
+    return 1.0 - residual / total if total > 0 else np.zeros(np.shape(residual))
+
+class CompactForest:
+    """
+    Bosque de regresión (RandomForestRegressor) en arrays planos: los nodos de
+    todos los árboles concatenados, con hijos int32 (-1 en las hojas), feature
+    int16 y umbral y valor float32 (18 bytes por nodo frente a los ~72 del
+    árbol de sklearn). Predice recorriendo todos los árboles a la vez, nivel a
+    nivel, y puede recortarse (árboles, profundidad) o crecer (warm start).
+    """
+
+    def __init__(self, children_left, children_right, feature, threshold, value, roots,
+                 n_features_in: int, params: Dict[str, Any], max_depth: Optional[int] = None,
+                 feature_importances=None):
+        self.children_left = np.asarray(children_left, dtype=np.int32)
+        self.children_right = np.asarray(children_right, dtype=np.int32)
+        self.feature = np.asarray(feature, dtype=np.int16)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.n_features_in_ = n_features_in
+        # Parámetros del RandomForestRegressor original (para crecer) y profundidad del recorte
+        self.params = params
+        self.max_depth = max_depth
+        self.feature_importances_ = None if feature_importances is None else np.asarray(feature_importances, dtype=np.float32)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.children_left, self.children_right, self.feature, self.threshold, self.value, self.roots
+        ))
+
+    @classmethod
+    def from_forest(cls, forest) -> "CompactForest":
+        trees = []
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            trees.append((tree.children_left, tree.children_right, tree.feature, tree.threshold, tree.value[:, 0, 0]))
+        params = {key: value for key, value in forest.get_params().items() if np.isscalar(value) or value is None}
+        return cls._from_trees(trees, forest.n_features_in_, params, None, getattr(forest, "feature_importances_", None))
+
+    @classmethod
+    def _from_trees(cls, trees: List[Tuple], n_features_in: int, params: Dict[str, Any],
+                    max_depth: Optional[int], feature_importances=None) -> "CompactForest":
+        """Concatenar árboles con índices locales (hijos -1 en las hojas)"""
+        counts = np.array([len(left) for left, *_ in trees], dtype=np.int64)
+        roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int32)
+        lefts, rights = [], []
+        for root, (left, right, *_rest) in zip(roots, trees):
+            leaf = left < 0
+            lefts.append(np.where(leaf, -1, left + root))
+            rights.append(np.where(leaf, -1, right + root))
+        return cls(
+            np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate([np.where(tree[0] < 0, 0, tree[2]) for tree in trees]),
+            np.concatenate([tree[3] for tree in trees]),
+            np.concatenate([tree[4] for tree in trees]),
+            roots, n_features_in, params, max_depth, feature_importances
+        )
+
+    def _trees(self) -> List[Tuple]:
+        """Árboles con índices locales (inverso de ``_from_trees``)"""
+        ends = np.append(self.roots[1:], len(self.children_left))
+        trees = []
+        for root, end in zip(self.roots, ends):
+            left = self.children_left[root:end]
+            right = self.children_right[root:end]
+            leaf = left < 0
+            trees.append((
+                np.where(leaf, -1, left - root), np.where(leaf, -1, right - root),
+                self.feature[root:end], self.threshold[root:end], self.value[root:end]
+            ))
+        return trees
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Nodo hoja de cada fila en cada árbol: (árboles, filas)"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[None, :]
+        nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+        while True:
+            left = self.children_left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                return nodes
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+
+    def tree_predictions(self, X: np.ndarray) -> np.ndarray:
+        return self.value[self._leaves(X)]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.tree_predictions(X).mean(axis=0).astype(np.float64)
+
+    def score(self, X: np.ndarray, y: np.ndarray) -> float:
+        return float(_r2(np.asarray(y, dtype=np.float64), self.predict(X)))
+
+    def depth(self) -> int:
+        return int(max(self._node_depths(tree[0], tree[1]).max() for tree in self._trees()))
+
+    @staticmethod
+    def _node_depths(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        depths = np.zeros(len(left), dtype=np.int32)
+        frontier, depth = np.array([0]), 0
+        while len(frontier):
+            depths[frontier] = depth
+            internal = frontier[left[frontier] >= 0]
+            frontier = np.concatenate([left[internal], right[internal]])
+            depth += 1
+        return depths
+
+    def select(self, indices) -> "CompactForest":
+        trees = self._trees()
+        return self._from_trees([trees[i] for i in indices], self.n_features_in_, self.params,
+                                self.max_depth, self.feature_importances_)
+
+    def prune_depth(self, max_depth: int) -> "CompactForest":
+        """Los nodos a profundidad ``max_depth`` pasan a ser hojas (su valor es la media de sus muestras)"""
+        pruned = []
+        for left, right, feature, threshold, value in self._trees():
+            depths = self._node_depths(left, right)
+            keep = depths <= max_depth
+            new_index = np.cumsum(keep) - 1
+            leaf = (left < 0) | (depths == max_depth)
+            pruned.append((
+                np.where(leaf, -1, new_index[np.maximum(left, 0)])[keep],
+                np.where(leaf, -1, new_index[np.maximum(right, 0)])[keep],
+                feature[keep], threshold[keep], value[keep]
+            ))
+        return self._from_trees(pruned, self.n_features_in_, self.params, max_depth, self.feature_importances_)
+
+    def grow(self, X: np.ndarray, y: np.ndarray, n_trees: int, n_jobs: int = 1) -> "CompactForest":
+        """Warm start: ``n_trees`` árboles nuevos entrenados sobre ``X`` con los mismos parámetros"""
+        from sklearn.ensemble import RandomForestRegressor
+
+        params = {**self.params, "n_estimators": n_trees, "n_jobs": n_jobs, "warm_start": False,
+                  "random_state": (self.params.get("random_state") or 0) + self.n_estimators}
+        extra = CompactForest.from_forest(RandomForestRegressor(**params).fit(X, y))
+        if self.max_depth is not None:
+            extra = extra.prune_depth(self.max_depth)
+        return self._from_trees(self._trees() + extra._trees(), self.n_features_in_, self.params,
+                                self.max_depth, self.feature_importances_)
+
+def compact_forest(forest, X_val: np.ndarray, y_val: np.ndarray, budget_bytes: int,
+                   max_score_drop: float, min_trees: int, min_depth: int) -> Tuple[CompactForest, Dict[str, Any]]:
+    """
+    Compactar un RandomForestRegressor (o un CompactForest que ha crecido con
+    warm start) con un presupuesto de bytes:
+
+    1. quitar los árboles que apenas aportan: se ordenan por su error en
+       validación y se queda el menor prefijo cuyo R² no cae más de
+       ``max_score_drop`` respecto al bosque completo;
+    2. recortar la profundidad hasta caber en ``budget_bytes`` (sin bajar de
+       ``min_depth``);
+    3. si aún no cabe, quitar más árboles (sin bajar de ``min_trees``).
+    """
+    y_val = np.asarray(y_val, dtype=np.float64)
+    reference = float(_r2(y_val, forest.predict(X_val)))
+    compact = forest if isinstance(forest, CompactForest) else CompactForest.from_forest(forest)
+    trees_before = compact.n_estimators
+
+    predictions = compact.tree_predictions(X_val).astype(np.float64)
+    order = np.argsort(((predictions - y_val) ** 2).mean(axis=1), kind="stable")
+    prefix_means = np.cumsum(predictions[order], axis=0) / np.arange(1, len(order) + 1)[:, None]
+    acceptable = np.flatnonzero(_r2(y_val, prefix_means) >= reference - max_score_drop)
+    kept = min(len(order), max(min_trees, int(acceptable[0]) + 1 if len(acceptable) else len(order)))
+    compact = compact.select(np.sort(order[:kept]))
+
+    depth = compact.depth()
+    while compact.nbytes > budget_bytes and depth > min_depth:
+        depth -= 1
+        compact = compact.prune_depth(depth)
+
+    if compact.nbytes > budget_bytes and compact.n_estimators > min_trees:
+        # Árboles de la selección anterior, de mejor a peor
+        ranked = np.argsort(np.argsort(order[:kept]))
+        fitting = max(min_trees, int(compact.n_estimators * budget_bytes / compact.nbytes))
+        compact = compact.select(np.sort(np.argsort(ranked)[:fitting]))
+
+    score = compact.score(X_val, y_val)
+    return compact, {
+        "trees_before": trees_before,
+        "trees_after": compact.n_estimators,
+        "max_depth": compact.max_depth,
+        "score_before": round(reference, 6),
+        "score_after": round(score, 6),
+        "score_delta": round(score - reference, 6),
+    }
+
+def truncate_boosting(model, X_val: np.ndarray, y_val: np.ndarray, max_score_drop: float) -> Optional[Dict[str, Any]]:
+    """
+    Quitar las últimas etapas de un GradientBoostingClassifier: se queda el
+    menor número de etapas cuya precisión en validación no cae más de
+    ``max_score_drop`` respecto a la mejor. Sigue siendo un estimador de
+    sklearn (admite warm start). None si el modelo no es de ese tipo.
+    """
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    if not isinstance(model, GradientBoostingClassifier):
+        return None
+    stages = len(model.estimators_)
+    accuracies = np.array([np.mean(predicted == y_val) for predicted in model.staged_predict(X_val)])
+    kept = int(np.flatnonzero(accuracies >= accuracies.max() - max_score_drop)[0]) + 1
+    reference = float(accuracies[-1])
+
+    model.estimators_ = model.estimators_[:kept]
+    for attribute in ("train_score_", "oob_improvement_", "oob_scores_"):
+        if hasattr(model, attribute):
+            setattr(model, attribute, getattr(model, attribute)[:kept])
+    model.n_estimators = model.n_estimators_ = kept
+    return {
+        "trees_before": stages,
+        "trees_after": kept,
+        "score_before": round(reference, 6),
+        "score_after": round(float(accuracies[kept - 1]), 6),
+        "score_delta": round(float(accuracies[kept - 1]) - reference, 6),
+    }
+
+def artifact_stats(model) -> Dict[str, float]:
+    """Tamaño del pickle (joblib, como save_trained_models) y tiempo de carga"""
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    size = buffer.tell()
+    buffer.seek(0)
+    started = time.perf_counter()
+    joblib.load(buffer)
+    return {"bytes": size, "load_ms": round((time.perf_counter() - started) * 1000, 3)}
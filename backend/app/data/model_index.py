@@ -0,0 +1,135 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.core.persistence import atomic_json_dump, file_lock
+import json
+import os
+import threading
+
+INDEX_VERSION = 1
+
+class ModelIndex:
+    """
+    Índice de las ubicaciones con modelos entrenados: ``models/index.json``.
+
+    Cada entrada guarda coordenadas, versión del modelo, fecha de entrenamiento
+    y el tamaño de cada artefacto. Se actualiza en cada guardado de modelos
+    (lock advisory + escritura atómica) y los lectores lo tienen en memoria:
+    solo vuelven a leerlo si cambia el archivo (otro worker lo ha actualizado).
+    Si no existe se reconstruye una vez recorriendo ``models/<location_key>/``.
+    """
+    FILENAME = "index.json"
+
+    def __init__(self, models_dir: Path):
+        self.models_dir = Path(models_dir)
+        self.path = self.models_dir / self.FILENAME
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._signature: Optional[tuple] = None
+        self._lock = threading.Lock()
+        # Entradas pendientes cuando las escrituras están diferidas (carga masiva)
+        self._deferred: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        with open(self.path, encoding="utf-8") as index_file:
+            return json.load(index_file).get("locations", {})
+
+    def _write(self, entries: Dict[str, Dict[str, Any]]):
+        atomic_json_dump({"version": INDEX_VERSION, "locations": dict(sorted(entries.items()))}, self.path)
+
+    def _refresh(self):
+        if not self.path.exists():
+            self.rebuild()
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature != self._signature:
+            with self._lock:
+                self._entries = self._read()
+                self._signature = signature
+
+    def get(self, location_key: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._entries.get(location_key)
+
+    def __contains__(self, location_key: str) -> bool:
+        return self.get(location_key) is not None
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        self._refresh()
+        return list(self._entries)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        self._refresh()
+        return dict(self._entries)
+
+    def describe_location(self, location_key: str, manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Entrada del índice a partir de los archivos de ``models/<location_key>/``"""
+        location_dir = self.models_dir / location_key
+        artifacts = {
+            path.name: path.stat().st_size
+            for path in sorted(location_dir.iterdir())
+            if path.is_file() and path.suffix in (".pkl", ".json")
+        }
+        manifest = manifest or {}
+        try:
+            latitude, longitude = (float(part) for part in location_key.split("_"))
+        except ValueError:
+            latitude = longitude = None
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "model_version": manifest.get("model_version"),
+            "trained_at": manifest.get("trained_at"),
+            "models": manifest.get("models", [name[:-len(".pkl")] for name in artifacts if name.endswith(".pkl") and name != "scalers.pkl"]),
+            "artifacts": artifacts,
+            "total_bytes": sum(artifacts.values()),
+        }
+
+    def update(self, location_key: str, entry: Dict[str, Any]):
+        """Añadir o reemplazar una ubicación (lee-modifica-escribe bajo lock exclusivo)"""
+        if self._deferred is not None:
+            self._deferred[location_key] = entry
+            return
+        self.update_many({location_key: entry})
+
+    def update_many(self, new_entries: Dict[str, Dict[str, Any]]):
+        if not new_entries:
+            return
+        with file_lock(self.path):
+            entries = self._read() if self.path.exists() else self._scan()
+            entries.update(new_entries)
+            self._write(entries)
+
+    def defer_writes(self):
+        """
+        Acumular las actualizaciones en memoria en lugar de reescribir el índice
+        en cada guardado; ``take_deferred`` las entrega para un ``update_many``.
+        """
+        if self._deferred is None:
+            self._deferred = {}
+
+    def take_deferred(self) -> Dict[str, Dict[str, Any]]:
+        pending, self._deferred = self._deferred or {}, {}
+        return pending
+
+    def _scan(self) -> Dict[str, Dict[str, Any]]:
+        from app.data.real_weather_data import GLOBAL_MODEL_KEY, MODEL_MANIFEST_NAME
+
+        entries = {}
+        for location_dir in sorted(self.models_dir.iterdir()):
+            if not location_dir.is_dir() or location_dir.name == GLOBAL_MODEL_KEY or not any(location_dir.glob("*.pkl")):
+                continue
+            manifest = None
+            manifest_path = location_dir / MODEL_MANIFEST_NAME
+            if manifest_path.exists():
+                with open(manifest_path, encoding="utf-8") as manifest_file:
+                    manifest = json.load(manifest_file)
+            entries[location_dir.name] = self.describe_location(location_dir.name, manifest)
+        return entries
+
+    def rebuild(self):
+        """Regenerar el índice recorriendo los directorios de modelos"""
+        with file_lock(self.path):
+            self._write(self._scan())
@@ -1,28 +1,66 @@
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
 import asyncio
-import aiohttp
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, Optional, Callable, Tuple
 import os
 from pathlib import Path
 import pickle
-import joblib
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, mean_squared_error, r2_score, classification_report, confusion_matrix
-from sklearn.metrics import mean_absolute_error, f1_score, precision_score, recall_score
+import threading
+import time
 import warnings
+from contextlib import contextmanager
+# aiohttp, joblib y sklearn se importan bajo demanda (arranque en frío rápido):
+# solo se necesitan al descargar datos, cargar modelos o entrenar
+from app.core.config import settings
+from app.core.cpu_budget import training_budget
+from app.core.persistence import atomic_joblib_dump, atomic_json_dump, atomic_pickle_dump, file_lock
+from app.core.metrics import CACHE_REQUESTS, MODEL_TRAINING_DURATION, OUTBOUND_REQUEST_DURATION
+from app.core.tracing import annotate, span
+from app.core.logging import get_logger
+from app.data.climatology import (
+    CONDITION_MODEL_CLASSES, CONDITION_PERCENTILES, blend_probability, build_climatology, climatology_path, covers_full_year,
+    day_index, day_indices, has_model_probabilities, load_npz, mean_by_day, percentile_by_day,
+    rows_to_columns, save_npz
+)
+from app.data.model_compaction import CompactForest, artifact_stats, compact_forest, truncate_boosting
+from app.data.model_index import ModelIndex
+from app.data.historical_store import row_date
+from app.config.weather_apis import (
+    COMPACTION_MAX_SCORE_DROP, COMPACTION_MIN_DEPTH, COMPACTION_MIN_TREES, CONDITION_MODEL_PSEUDO_COUNT,
+    HGB_EARLY_STOPPING_MIN_SAMPLES, HGB_MAX_ITER, HGB_N_ITER_NO_CHANGE, HGB_VALIDATION_FRACTION,
+    WARM_START_FRACTION, WARM_START_MIN_ESTIMATORS
+)
 warnings.filterwarnings('ignore')
 
+logger = get_logger(__name__)
+
+# Versión del formato de los modelos: cambiarla si cambian las features o los algoritmos
+# 1: estimadores de sklearn
+# 2: bosques compactados (CompactForest) y clasificadores HistGradientBoosting
+# 3: etiquetas de condition_classifier con umbrales por día del año
+MODEL_VERSION = 3
+
+# Directorio (models/global) del modelo global multi-ubicación
+GLOBAL_MODEL_KEY = "global"
+
+# Manifiesto JSON junto a los pickles: métricas y datos del entrenamiento
+MODEL_MANIFEST_NAME = "manifest.json"
+
+# Columnas de la matriz que construye prepare_features (mismo orden)
+FEATURE_NAMES = [
+    "latitude", "longitude", "equator_distance", "coastal_factor",
+    "day_of_year", "month", "year", "seasonal_factor",
+    "temperature", "precipitation", "wind_speed", "humidity"
+]
+
 class RealWeatherDataService:
     def __init__(self):
         self.data_cache_dir = Path("data_cache")
         self.models_dir = Path("models")
         self.data_cache_dir.mkdir(exist_ok=True)
         self.models_dir.mkdir(exist_ok=True)
+        self.model_index = ModelIndex(self.models_dir)
         
         # APIs de datos meteorológicos reales
         self.apis = {
@@ -32,7 +70,7 @@ class RealWeatherDataService:
                 "api_key": os.getenv("OPENWEATHER_API_KEY", "demo_key")
             },
             "nasa_power": {
-                "base_url": "https://power.larc.nasa.gov/api/temporal/daily/point",
+                "base_url": settings.NASA_POWER_BASE_URL,
                 "parameters": "T2M,PRECTOTCORR,WS10M,RH2M,T2M_MAX,T2M_MIN"
             },
             "meteostat": {
@@ -40,28 +78,12 @@ class RealWeatherDataService:
             }
         }
         
-        # Modelos de ML
-        self.models = {
-            'temperature_predictor': None,
-            'precipitation_classifier': None,
-            'wind_predictor': None,
-            'humidity_predictor': None,
-            'condition_classifier': None
-        }
-        
-        # Métricas de evaluación para cada modelo
-        self.model_metrics = {
-            'temperature_predictor': {},
-            'precipitation_classifier': {},
-            'wind_predictor': {},
-            'humidity_predictor': {},
-            'condition_classifier': {}
-        }
-        
-        self.scalers = {
-            'features': StandardScaler(),
-            'targets': {}
-        }
+        # Modelos de ML, métricas de evaluación de cada modelo y scaler de
+        # features (se crea al entrenar o se carga con los modelos)
+        self._reset_models()
+        # Los modelos en memoria son de una sola ubicación y se comparten entre
+        # hilos (asyncio.to_thread): cargar, entrenar y guardar van bajo este lock
+        self._model_lock = threading.RLock()
         
         # No cargar modelos automáticamente - se cargarán por ubicación cuando sea necesario
         # self.load_trained_models()
@@ -71,6 +93,9 @@ class RealWeatherDataService:
         """
         Obtiene datos históricos de NASA POWER API
         """
+        import aiohttp
+        
+        started = time.perf_counter()
         try:
             url = f"{self.apis['nasa_power']['base_url']}"
             params = {
@@ -87,12 +112,15 @@ class RealWeatherDataService:
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
+                        OUTBOUND_REQUEST_DURATION.labels(source="nasa_power", status=response.status).observe(time.perf_counter() - started)
                         return self.process_nasa_power_data(data)
                     else:
-                        print(f"Error fetching NASA POWER data: {response.status}")
+                        OUTBOUND_REQUEST_DURATION.labels(source="nasa_power", status=response.status).observe(time.perf_counter() - started)
+                        logger.warning("Error fetching NASA POWER data", extra={"status": response.status})
                         return None
         except Exception as e:
-            print(f"Error in NASA POWER API call: {e}")
+            OUTBOUND_REQUEST_DURATION.labels(source="nasa_power", status="error").observe(time.perf_counter() - started)
+            logger.warning("Error in NASA POWER API call: %s", e)
             return None
     
     def process_nasa_power_data(self, raw_data: Dict) -> Dict:
@@ -138,7 +166,7 @@ class RealWeatherDataService:
                 }
             }
         except Exception as e:
-            print(f"Error processing NASA POWER data: {e}")
+            logger.warning("Error processing NASA POWER data: %s", e)
             return {'data': [], 'source': 'NASA_POWER', 'location': {}}
     
     def calculate_heat_index(self, temperature: float, humidity: float) -> float:
@@ -158,18 +186,27 @@ class RealWeatherDataService:
         # Conversión de vuelta a Celsius
         return (HI - 32) * 5/9
     
+    def data_cache_path(self, latitude: float, longitude: float, years: int) -> Path:
+        """Archivo de data_cache con el histórico completo descargado para la ubicación"""
+        current_year = datetime.now().year
+        return self.data_cache_dir / f"weather_data_{latitude}_{longitude}_{current_year - years}_{current_year}.pkl"
+    
     async def get_historical_data(self, latitude: float, longitude: float, 
-                                 date_of_year: str, years: int = 30) -> List[Dict[str, Any]]:
+                                 date_of_year: str, years: int = 30,
+                                 progress: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
         """
         Obtiene datos históricos reales para una ubicación y fecha específica
+
+        Args:
+            progress: Callback opcional ``progress(stage, **data)`` que recibe
+                eventos de avance (chunks descargados, registros procesados)
         """
         # Calcular rango de fechas
         current_year = datetime.now().year
         start_year = current_year - years
         
         # Cache key para evitar llamadas repetidas
-        cache_key = f"weather_data_{latitude}_{longitude}_{start_year}_{current_year}.pkl"
-        cache_path = self.data_cache_dir / cache_key
+        cache_path = self.data_cache_path(latitude, longitude, years)
         
         # Intentar cargar desde cache
         if cache_path.exists():
@@ -177,38 +214,60 @@ class RealWeatherDataService:
                 with open(cache_path, 'rb') as f:
                     cached_data = pickle.load(f)
                     if len(cached_data) > 0:
+                        CACHE_REQUESTS.labels(cache="data_cache", result="hit").inc()
+                        annotate(data_cache="hit", data_cache_rows=len(cached_data))
+                        if progress:
+                            progress("cache_hit", rows=len(cached_data))
                         return self.filter_by_date_of_year(cached_data, date_of_year)
             except Exception as e:
-                print(f"Error loading cache: {e}")
+                logger.warning("Error loading cache: %s", e)
         
         # Si no hay cache, obtener datos de NASA POWER
+        CACHE_REQUESTS.labels(cache="data_cache", result="miss").inc()
+        annotate(data_cache="miss")
         all_data = []
         
         # Obtener datos por chunks de años para evitar timeouts
         chunk_size = 5
-        for year_start in range(start_year, current_year + 1, chunk_size):
+        year_starts = list(range(start_year, current_year + 1, chunk_size))
+        for chunk_index, year_start in enumerate(year_starts, start=1):
             year_end = min(year_start + chunk_size - 1, current_year)
             
             start_date = f"{year_start}-01-01"
             end_date = f"{year_end}-12-31"
             
-            print(f"Fetching data for years {year_start}-{year_end}...")
+            logger.info("Fetching NASA POWER data", extra={"years": f"{year_start}-{year_end}", "chunk": chunk_index, "total_chunks": len(year_starts)})
             
-            nasa_data = await self.fetch_nasa_power_data(latitude, longitude, start_date, end_date)
+            with span("nasa_power_fetch", years=f"{year_start}-{year_end}") as current:
+                nasa_data = await self.fetch_nasa_power_data(latitude, longitude, start_date, end_date)
+                if current is not None:
+                    current.attributes["rows"] = len(nasa_data['data']) if nasa_data else 0
             
             if nasa_data and nasa_data['data']:
                 all_data.extend(nasa_data['data'])
             
+            if progress:
+                progress(
+                    "chunk_fetched",
+                    chunk=chunk_index,
+                    total_chunks=len(year_starts),
+                    years=f"{year_start}-{year_end}",
+                    rows=len(nasa_data['data']) if nasa_data else 0
+                )
+            
             # Pequeña pausa para no sobrecargar la API
-            await asyncio.sleep(1)
+            await asyncio.sleep(settings.NASA_POWER_CHUNK_PAUSE)
+        
+        if progress:
+            progress("rows_parsed", rows=len(all_data))
         
-        # Guardar en cache
+        # Guardar en cache (escritura atómica: otros workers pueden estar leyendo)
         if all_data:
             try:
-                with open(cache_path, 'wb') as f:
-                    pickle.dump(all_data, f)
+                with file_lock(cache_path):
+                    atomic_pickle_dump(all_data, cache_path)
             except Exception as e:
-                print(f"Error saving cache: {e}")
+                logger.warning("Error saving cache: %s", e)
         
         return self.filter_by_date_of_year(all_data, date_of_year)
     
@@ -227,7 +286,7 @@ class RealWeatherDataService:
             
             return filtered_data
         except Exception as e:
-            print(f"Error filtering data by date: {e}")
+            logger.warning("Error filtering data by date: %s", e)
             return []
     
     def prepare_features(self, data: List[Dict], latitude: float, longitude: float) -> np.ndarray:
@@ -266,97 +325,376 @@ class RealWeatherDataService:
         
         return np.array(features)
     
-    def train_prediction_models(self, data: List[Dict], latitude: float, longitude: float):
+    def train_prediction_models(self, data: List[Dict], latitude: float, longitude: float,
+                                progress: Optional[Callable[..., None]] = None):
         """
         Entrena modelos de ML con evaluación completa y métricas profesionales
+
+        Args:
+            progress: Callback opcional ``progress(stage, **data)`` invocado al
+                terminar cada modelo
         """
-        # Verificar que self.models esté inicializado
-        if not hasattr(self, 'models'):
-            print("Warning: models attribute not found, initializing...")
-            self.models = {
-                'temperature_predictor': None,
-                'precipitation_classifier': None,
-                'wind_predictor': None,
-                'humidity_predictor': None,
-                'condition_classifier': None
-            }
-            self.model_metrics = {
-                'temperature_predictor': {},
-                'precipitation_classifier': {},
-                'wind_predictor': {},
-                'humidity_predictor': {},
-                'condition_classifier': {}
-            }
-        
         # if len(data) < 50:  # Necesitamos más datos para un entrenamiento robusto
         #     print(f"Not enough data to train robust models: {len(data)} samples (minimum 50 required)")
         #     return
         
-        print(f"\n🧠 Training ML models with {len(data)} data points...")
-        print("=" * 60)
+        logger.info("Training ML models", extra={"data_points": len(data)})
         
         # Preparar features
         X = self.prepare_features(data, latitude, longitude)
         
         if X.shape[0] == 0:
-            print("❌ No valid features for training")
+            logger.warning("No valid features for training")
+            return
+        
+        # El lock antes que las CPUs: en cola no se ocupan slots del presupuesto
+        with self.model_state(on_wait=self._queued_callback(progress)):
+            with training_budget.acquire(on_wait=self._queued_callback(progress)) as n_jobs:
+                training_started = time.perf_counter()
+                self._fit_models(X, data, progress, n_jobs=n_jobs)
+        
+            # Guardar modelos entrenados por ubicación
+            location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+            self.loaded_location_key = location_key
+            self.save_trained_models(location_key, training_info={
+                "trained_at": datetime.now().isoformat(),
+                "training_duration_s": round(time.perf_counter() - training_started, 3),
+                "training_samples": len(data),
+                "training_mode": "full",
+                "n_jobs": n_jobs,
+                "data_range": self._data_range(data),
+                "latitude": latitude,
+                "longitude": longitude,
+            })
+        
+            logger.info("Models trained and saved", extra={"location_key": location_key})
+            self._print_models_summary()
+    
+    def train_global_models(self, corpus: List[Tuple[float, float, List[Dict]]],
+                            progress: Optional[Callable[..., None]] = None):
+        """
+        Entrena un único juego de modelos con registros de muchas ubicaciones
+        (``corpus``: lista de ``(latitud, longitud, registros)``). Las features
+        geográficas y estacionales permiten servirlo para cualquier coordenada.
+        """
+        corpus = [(latitude, longitude, rows) for latitude, longitude, rows in corpus if rows]
+        data = [row for _, _, rows in corpus for row in rows]
+        logger.info("Training global ML models", extra={"locations": len(corpus), "data_points": len(data)})
+        if not data:
+            logger.warning("No valid features for training")
             return
+        X = np.vstack([self.prepare_features(rows, latitude, longitude) for latitude, longitude, rows in corpus])
+        # Los umbrales de extremos son de cada ubicación: objetivos por ubicación, concatenados
+        targets_by_location = [self._model_targets(rows) for _, _, rows in corpus]
+        targets = {name: np.concatenate([item[name] for item in targets_by_location]) for name in targets_by_location[0]}
+        with self.model_state(on_wait=self._queued_callback(progress)):
+            with training_budget.acquire(on_wait=self._queued_callback(progress)) as n_jobs:
+                training_started = time.perf_counter()
+                self._fit_models(X, data, progress, n_jobs=n_jobs, targets=targets)
+        
+            self.loaded_location_key = GLOBAL_MODEL_KEY
+            self.save_trained_models(GLOBAL_MODEL_KEY, training_info={
+                "trained_at": datetime.now().isoformat(),
+                "training_duration_s": round(time.perf_counter() - training_started, 3),
+                "training_samples": len(data),
+                "training_locations": len(corpus),
+                "n_jobs": n_jobs,
+                "data_range": self._data_range(data),
+            })
+        
+            logger.info("Global models trained and saved", extra={"locations": len(corpus)})
+            self._print_models_summary()
+    
+    def update_prediction_models(self, data: List[Dict], new_data: List[Dict], latitude: float, longitude: float) -> bool:
+        """
+        Reentrenamiento incremental con warm start: a cada bosque se le añaden
+        árboles y a cada gradient boosting etapas, ajustados sobre ``data``
+        (histórico completo, incluidos los ``new_data`` recién añadidos), sin
+        rehacer la búsqueda de hiperparámetros. El scaler no cambia (los árboles
+        existentes dependen de él). Un clasificador que ve clases nuevas no
+        puede continuar: se reajusta desde cero con sus mismos hiperparámetros.
+
+        Retorna False si la ubicación no tiene modelos guardados.
+        """
+        from sklearn.base import clone
+        
+        location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+        manifest = self.load_model_manifest(location_key)
+        if manifest is None:
+            return False
+        with self.model_state():
+            # Siempre desde disco: lo que haya en memoria puede ser de otra ubicación
+            # (o de esta pero sin los últimos cambios de otro proceso)
+            if not self.load_trained_models(location_key) or self.loaded_location_key != location_key:
+                return False
+            if self.scalers.get('features') is None:
+                return False
+        
+            X_scaled = self.scalers['features'].transform(self.prepare_features(data, latitude, longitude))
+            # Las etiquetas de extremos dependen de percentiles por día del año de todo
+            # el histórico: las de los registros nuevos se toman de las calculadas sobre ``data``
+            targets = self._model_targets(data)
+            new_dates = {row_date(row) for row in new_data}
+            is_new = np.array([row_date(row) in new_dates for row in data], dtype=bool)
+            models = {name: model for name, model in self.models.items() if model is not None}
+        
+            logger.info("Updating ML models (warm start)", extra={"location_key": location_key, "data_points": len(data), "new_points": len(new_data)})
+            with training_budget.acquire() as n_jobs:
+                update_started = time.perf_counter()
+                for name, model in models.items():
+                    # Error del modelo actual con los datos nuevos (antes de verlos)
+                    score_before = float(model.score(X_scaled[is_new], targets[name][is_new])) if is_new.sum() > 1 else None
+                    refit = hasattr(model, "classes_") and not np.array_equal(np.unique(targets[name]), model.classes_)
+                    if isinstance(model, CompactForest):
+                        # Bosque compactado: árboles nuevos recortados a su misma profundidad
+                        added = max(WARM_START_MIN_ESTIMATORS, int(model.n_estimators * WARM_START_FRACTION))
+                        with MODEL_TRAINING_DURATION.labels(model=name).time():
+                            model = self.models[name] = model.grow(X_scaled, targets[name], added, n_jobs)
+                        self.model_metrics.setdefault(name, {})["incremental"] = {
+                            "new_samples": int(is_new.sum()),
+                            "score_on_new_data_before_update": score_before,
+                            "n_estimators": model.n_estimators,
+                            "refit": False,
+                        }
+                        continue
+                    if refit:
+                        logger.info("Classes changed, refitting model", extra={"location_key": location_key, "model": name})
+                        model = self.models[name] = clone(model)
+                    else:
+                        # HistGradientBoosting cuenta iteraciones (max_iter, n_iter_ tras la parada temprana)
+                        size_param = "max_iter" if "max_iter" in model.get_params() else "n_estimators"
+                        size = getattr(model, "n_iter_", model.get_params()[size_param])
+                        added = max(WARM_START_MIN_ESTIMATORS, int(size * WARM_START_FRACTION))
+                        model.set_params(warm_start=True, **{size_param: size + added})
+                    # Los bosques paralelizan con los slots obtenidos; guardados quedan en n_jobs=1
+                    parallel = "n_jobs" in model.get_params()
+                    if parallel:
+                        model.set_params(n_jobs=n_jobs)
+                    with MODEL_TRAINING_DURATION.labels(model=name).time():
+                        model.fit(X_scaled, targets[name])
+                    model.set_params(warm_start=False, **({"n_jobs": 1} if parallel else {}))
+                    self.model_metrics.setdefault(name, {})["incremental"] = {
+                        "new_samples": int(is_new.sum()),
+                        "score_on_new_data_before_update": score_before,
+                        "n_estimators": int(getattr(model, "n_iter_", None) or model.get_params().get("n_estimators")),
+                        "refit": refit,
+                    }
+                # Los árboles y etapas añadidos vuelven a pasar por el presupuesto de tamaño
+                if settings.MODEL_COMPACTION_ENABLED:
+                    self._compact_models(X_scaled, targets)
+        
+            self.save_trained_models(location_key, training_info={
+                # El último entrenamiento completo se conserva (programa el siguiente)
+                **{field: manifest[field] for field in ("trained_at", "training_duration_s", "latitude", "longitude") if field in manifest},
+                "training_samples": len(data),
+                "training_mode": "incremental",
+                "incremental_updates": manifest.get("incremental_updates", 0) + 1,
+                "updated_at": datetime.now().isoformat(),
+                "update_duration_s": round(time.perf_counter() - update_started, 3),
+                "data_range": self._data_range(data),
+            })
+            logger.info("Models updated and saved", extra={"location_key": location_key})
+            return True
+    
+    def _model_targets(self, data: List[Dict]) -> Dict[str, np.ndarray]:
+        """Variable objetivo de cada modelo"""
+        return {
+            'temperature_predictor': np.array([item['temperature'] for item in data]),
+            'precipitation_classifier': self._create_precipitation_categories(np.array([item['precipitation'] for item in data])),
+            'wind_predictor': np.array([item['wind_speed'] for item in data]),
+            'humidity_predictor': np.array([item['humidity'] for item in data]),
+            'condition_classifier': self._create_extreme_condition_labels(data),
+        }
+    
+    @staticmethod
+    def _data_range(data: List[Dict]) -> Dict[str, str]:
+        dates = [item['date'] if isinstance(item['date'], datetime) else datetime.fromisoformat(str(item['date'])) for item in data]
+        return {"start": min(dates).date().isoformat(), "end": max(dates).date().isoformat()}
+    
+    @contextmanager
+    def model_state(self, on_wait: Optional[Callable[[], None]] = None):
+        """
+        Acceso exclusivo a los modelos en memoria (``models``, ``scalers``,
+        ``model_metrics``, ``loaded_location_key``) durante un entrenamiento o
+        una carga, para que no se mezclen ubicaciones. ``on_wait`` se llama una
+        vez si hay que esperar a otro hilo.
+        """
+        if not self._model_lock.acquire(blocking=False):
+            if on_wait:
+                on_wait()
+            self._model_lock.acquire()
+        try:
+            yield
+        finally:
+            self._model_lock.release()
+    
+    def _reset_models(self):
+        """Estado de modelos vacío (ninguna ubicación cargada)"""
+        self.models = {
+            'temperature_predictor': None,
+            'precipitation_classifier': None,
+            'wind_predictor': None,
+            'humidity_predictor': None,
+            'condition_classifier': None
+        }
+        self.model_metrics = {
+            'temperature_predictor': {},
+            'precipitation_classifier': {},
+            'wind_predictor': {},
+            'humidity_predictor': {},
+            'condition_classifier': {}
+        }
+        self.scalers = {
+            'features': None,
+            'targets': {}
+        }
+        # Ubicación cuyos modelos están cargados en memoria (None si ninguna)
+        self.loaded_location_key: Optional[str] = None
+    
+    @staticmethod
+    def _queued_callback(progress: Optional[Callable[..., None]]) -> Optional[Callable[[], None]]:
+        """Aviso de progreso si el entrenamiento espera CPUs libres del presupuesto"""
+        if progress is None:
+            return None
+        return lambda: progress("training_queued")
+    
+    def _fit_models(self, X: np.ndarray, data: List[Dict], progress: Optional[Callable[..., None]] = None,
+                    n_jobs: int = 1, targets: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Ajustar el scaler y los cinco modelos con la matriz de features ``X`` de
+        ``data``. ``n_jobs`` son las CPUs asignadas por el presupuesto: solo las
+        usa la búsqueda de hiperparámetros (los estimadores internos van con
+        n_jobs=1 para no anidar paralelismo). ``targets`` sustituye a los
+        objetivos calculados sobre ``data`` (``_model_targets``).
+        """
+        # Partir de cero: los modelos y métricas de la ubicación anterior no deben
+        # acabar guardados (ni en el manifiesto) de esta ubicación
+        self._reset_models()
         
         # Normalizar features
+        from sklearn.preprocessing import StandardScaler
+        self.scalers['features'] = StandardScaler()
         X_scaled = self.scalers['features'].fit_transform(X)
+        if targets is None:
+            targets = self._model_targets(data)
         
         # 1. MODELO DE TEMPERATURA (Regresión)
-        print("\n🌡️ TRAINING TEMPERATURE PREDICTOR (RandomForestRegressor)")
-        print("-" * 50)
-        y_temp = np.array([item['temperature'] for item in data])
+        logger.debug("Training temperature_predictor (RandomForestRegressor)")
+        y_temp = targets['temperature_predictor']
         if len(set(y_temp)) > 1:
-            self._train_regression_model('temperature_predictor', X_scaled, y_temp, 'Temperature (°C)')
+            with MODEL_TRAINING_DURATION.labels(model='temperature_predictor').time():
+                self._train_regression_model('temperature_predictor', X_scaled, y_temp, 'Temperature (°C)', n_jobs)
+        if progress:
+            progress("model_trained", model='temperature_predictor', index=1, total_models=5)
         
         # 2. MODELO DE PRECIPITACIÓN (Clasificación)
-        print("\n🌧️ TRAINING PRECIPITATION CLASSIFIER (GradientBoostingClassifier)")
-        print("-" * 50)
-        y_precip = np.array([item['precipitation'] for item in data])
-        # Crear categorías más sofisticadas
-        precip_categories = self._create_precipitation_categories(y_precip)
+        logger.debug("Training precipitation_classifier (GradientBoostingClassifier)")
+        precip_categories = targets['precipitation_classifier']
         if len(set(precip_categories)) > 1:
-            self._train_classification_model('precipitation_classifier', X_scaled, precip_categories, 'Precipitation Category')
+            with MODEL_TRAINING_DURATION.labels(model='precipitation_classifier').time():
+                self._train_classification_model('precipitation_classifier', X_scaled, precip_categories, 'Precipitation Category', n_jobs)
+        if progress:
+            progress("model_trained", model='precipitation_classifier', index=2, total_models=5)
         
         # 3. MODELO DE VIENTO (Regresión)
-        print("\n💨 TRAINING WIND PREDICTOR (RandomForestRegressor)")
-        print("-" * 50)
-        y_wind = np.array([item['wind_speed'] for item in data])
+        logger.debug("Training wind_predictor (RandomForestRegressor)")
+        y_wind = targets['wind_predictor']
         if len(set(y_wind)) > 1:
-            self._train_regression_model('wind_predictor', X_scaled, y_wind, 'Wind Speed (m/s)')
+            with MODEL_TRAINING_DURATION.labels(model='wind_predictor').time():
+                self._train_regression_model('wind_predictor', X_scaled, y_wind, 'Wind Speed (m/s)', n_jobs)
+        if progress:
+            progress("model_trained", model='wind_predictor', index=3, total_models=5)
         
         # 4. MODELO DE HUMEDAD (Regresión)
-        print("\n💧 TRAINING HUMIDITY PREDICTOR (RandomForestRegressor)")
-        print("-" * 50)
-        y_humidity = np.array([item['humidity'] for item in data])
+        logger.debug("Training humidity_predictor (RandomForestRegressor)")
+        y_humidity = targets['humidity_predictor']
         if len(set(y_humidity)) > 1:
-            self._train_regression_model('humidity_predictor', X_scaled, y_humidity, 'Humidity (%)')
+            with MODEL_TRAINING_DURATION.labels(model='humidity_predictor').time():
+                self._train_regression_model('humidity_predictor', X_scaled, y_humidity, 'Humidity (%)', n_jobs)
+        if progress:
+            progress("model_trained", model='humidity_predictor', index=4, total_models=5)
         
         # 5. CLASIFICADOR DE CONDICIONES EXTREMAS
-        print("\n⚡ TRAINING EXTREME CONDITIONS CLASSIFIER")
-        print("-" * 50)
-        extreme_labels = self._create_extreme_condition_labels(data)
+        logger.debug("Training condition_classifier")
+        extreme_labels = targets['condition_classifier']
         if len(set(extreme_labels)) > 1:
-            self._train_classification_model('condition_classifier', X_scaled, extreme_labels, 'Extreme Conditions')
+            with MODEL_TRAINING_DURATION.labels(model='condition_classifier').time():
+                self._train_classification_model('condition_classifier', X_scaled, extreme_labels, 'Extreme Conditions', n_jobs)
+        if progress:
+            progress("model_trained", model='condition_classifier', index=5, total_models=5)
         
-        # Guardar modelos entrenados por ubicación
-        location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
-        self.save_trained_models(location_key)
+        if settings.MODEL_COMPACTION_ENABLED:
+            self._compact_models(X_scaled, targets)
+    
+    def _compact_models(self, X: np.ndarray, targets: Dict[str, np.ndarray]):
+        """
+        Compactación tras entrenar (o tras un warm start), con un presupuesto de MODEL_SIZE_BUDGET_KB
+        por ubicación: a los clasificadores (gradient boosting) se les quitan
+        las etapas finales que no mejoran la validación y lo que queda del
+        presupuesto se reparte entre los bosques de regresión, que pasan a
+        ``CompactForest`` (menos árboles, profundidad recortada, float32/int32).
+        Se valida con la partición de test de cada modelo; el informe (delta
+        de precisión, bytes y tiempo de carga) va a ``model_metrics[name]["compaction"]``.
+        """
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.model_selection import train_test_split
         
-        print(f"\n✅ Models trained and saved successfully for {location_key}!")
-        print("=" * 60)
-        self._print_models_summary()
+        holdout = {}
+        for name, model in self.models.items():
+            if model is None:
+                continue
+            y = targets[name]
+            # Misma partición que _train_regression_model / _train_classification_model
+            stratify = y if hasattr(model, "classes_") and np.unique(y, return_counts=True)[1].min() >= 2 else None
+            _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=stratify)
+            holdout[name] = (X_test, y_test)
+        
+        budget = settings.MODEL_SIZE_BUDGET_KB * 1024
+        forests = [name for name in holdout if isinstance(self.models[name], (RandomForestRegressor, CompactForest))]
+        remaining = budget
+        for name in holdout:
+            if name in forests:
+                continue
+            before = artifact_stats(self.models[name])
+            report = truncate_boosting(self.models[name], *holdout[name], COMPACTION_MAX_SCORE_DROP)
+            after = artifact_stats(self.models[name]) if report else before
+            remaining -= after["bytes"]
+            if report:
+                self._record_compaction(name, report, before, after)
+        
+        for name in forests:
+            before = artifact_stats(self.models[name])
+            compact, report = compact_forest(
+                self.models[name], *holdout[name], max(remaining, 0) // len(forests),
+                COMPACTION_MAX_SCORE_DROP, COMPACTION_MIN_TREES, COMPACTION_MIN_DEPTH
+            )
+            self.models[name] = compact
+            self._record_compaction(name, report, before, artifact_stats(compact))
+        
+        logger.info("Models compacted", extra={
+            "budget_kb": settings.MODEL_SIZE_BUDGET_KB,
+            "size_kb": round(sum(self.model_metrics[name].get("compaction", {}).get("bytes_after", 0) for name in holdout) / 1024, 1)
+        })
     
-    def _train_regression_model(self, model_name: str, X: np.ndarray, y: np.ndarray, target_name: str):
+    def _record_compaction(self, name: str, report: Dict[str, Any], before: Dict[str, float], after: Dict[str, float]):
+        self.model_metrics[name]["compaction"] = {
+            **report,
+            "bytes_before": before["bytes"],
+            "bytes_after": after["bytes"],
+            "load_ms_before": before["load_ms"],
+            "load_ms_after": after["load_ms"],
+        }
+    
+    def _train_regression_model(self, model_name: str, X: np.ndarray, y: np.ndarray, target_name: str, n_jobs: int = 1):
         """Entrena un modelo de regresión con evaluación completa"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
         
         # Split datos
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        print(f"   Training samples: {len(X_train)}, Test samples: {len(X_test)}")
+        logger.debug("Train/test split", extra={"model": model_name, "train_samples": len(X_train), "test_samples": len(X_test)})
         
         # Hiperparámetros optimizados según cantidad de datos
         if len(X_train) < 50:
@@ -392,26 +730,31 @@ class RealWeatherDataService:
                 }
             cv_folds = 5
         
-        model = RandomForestRegressor(random_state=42, n_jobs=-1)
+        # Un solo nivel de paralelismo: la búsqueda reparte los ``n_jobs`` entre
+        # combinaciones y cada bosque entrena en un hilo (n_jobs=-1 en ambos
+        # lanzaba CPUs x CPUs hilos)
+        model = RandomForestRegressor(random_state=42, n_jobs=1)
         
         # GridSearch con CV adaptativo
         if len(X_train) >= 10:
             try:
-                grid_search = GridSearchCV(model, param_grid, cv=cv_folds, scoring='neg_mean_squared_error', n_jobs=-1)
+                grid_search = GridSearchCV(model, param_grid, cv=cv_folds, scoring='neg_mean_squared_error', n_jobs=n_jobs)
                 grid_search.fit(X_train, y_train)
                 best_model = grid_search.best_estimator_
                 best_params = grid_search.best_params_
             except Exception as e:
-                print(f"   ⚠️ GridSearchCV failed: {e}")
-                print(f"   🔄 Using default parameters")
-                best_model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42)
+                logger.debug("GridSearchCV failed: %s", e)
+                logger.debug("Using default parameters")
+                best_model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42, n_jobs=n_jobs)
                 best_model.fit(X_train, y_train)
+                best_model.set_params(n_jobs=1)
                 best_params = "default"
         else:
             # Para muy pocos datos, usar parámetros por defecto
-            print(f"   ⚠️ Insufficient data for CV, using default parameters")
-            best_model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42)
+            logger.debug("Insufficient data for CV, using default parameters")
+            best_model = RandomForestRegressor(n_estimators=50, max_depth=10, random_state=42, n_jobs=n_jobs)
             best_model.fit(X_train, y_train)
+            best_model.set_params(n_jobs=1)
             best_params = "default"
         
         self.models[model_name] = best_model
@@ -435,13 +778,13 @@ class RealWeatherDataService:
         # Validación cruzada (adaptativa)
         if len(X) >= 10:
             try:
-                cv_scores = cross_val_score(best_model, X, y, cv=cv_folds, scoring='neg_mean_squared_error')
+                cv_scores = cross_val_score(best_model, X, y, cv=cv_folds, scoring='neg_mean_squared_error', n_jobs=n_jobs)
                 cv_rmse_scores = np.sqrt(-cv_scores)
                 cv_rmse_mean = float(cv_rmse_scores.mean())
                 cv_rmse_std = float(cv_rmse_scores.std())
                 cv_scores_list = cv_rmse_scores.tolist()
             except Exception as e:
-                print(f"   ⚠️ Cross-validation failed: {e}")
+                logger.debug("Cross-validation failed: %s", e)
                 cv_rmse_mean = test_rmse
                 cv_rmse_std = 0.0
                 cv_scores_list = [test_rmse]
@@ -479,43 +822,96 @@ class RealWeatherDataService:
             'feature_importance': best_model.feature_importances_.tolist() if hasattr(best_model, 'feature_importances_') else []
         }
         
-        # Imprimir resultados
-        print(f"📊 {target_name} Model Results:")
-        print(f"   Best Parameters: {best_params}")
-        print(f"   Training RMSE: {train_rmse:.4f}")
-        print(f"   Test RMSE: {test_rmse:.4f}")
-        print(f"   Test R² Score: {test_r2:.4f}")
-        print(f"   CV RMSE: {cv_rmse_mean:.4f} ± {cv_rmse_std:.4f}")
-        
         # Detectar overfitting
         if train_rmse < test_rmse * 0.7:
-            print(f"   ⚠️ Possible overfitting detected (train RMSE much lower than test RMSE)")
+            assessment = "possible_overfitting"
         elif test_r2 > 0.8:
-            print(f"   ✅ Excellent model performance (R² > 0.8)")
+            assessment = "excellent"
         elif test_r2 > 0.6:
-            print(f"   ✅ Good model performance (R² > 0.6)")
+            assessment = "good"
         else:
-            print(f"   ⚠️ Model performance could be improved (R² = {test_r2:.3f})")
+            assessment = "could_improve"
+        
+        logger.debug("Regression model results", extra={
+            "model": model_name, "target": target_name, "best_params": best_params,
+            "train_rmse": round(train_rmse, 4), "test_rmse": round(test_rmse, 4),
+            "test_r2": round(test_r2, 4), "cv_rmse_mean": round(cv_rmse_mean, 4),
+            "cv_rmse_std": round(cv_rmse_std, 4), "assessment": assessment
+        })
     
-    def _train_classification_model(self, model_name: str, X: np.ndarray, y: np.ndarray, target_name: str):
+    @staticmethod
+    def _classifier_candidates(train_samples: int, min_class_count: int):
+        """
+        Estimador base, rejilla de GridSearch y modelo por defecto (sin CV) del
+        backend de clasificadores configurado en ``CLASSIFIER_BACKEND``
+        """
+        backend = settings.CLASSIFIER_BACKEND.lower()
+        if backend == "hist_gradient_boosting":
+            from sklearn.ensemble import HistGradientBoostingClassifier
+            
+            # Histogramas de features (256 bins) y parada temprana: el número de
+            # iteraciones lo decide la validación interna, no la rejilla
+            early_stopping = train_samples >= HGB_EARLY_STOPPING_MIN_SAMPLES and min_class_count >= 10
+            model = HistGradientBoostingClassifier(
+                max_iter=HGB_MAX_ITER, early_stopping=early_stopping,
+                validation_fraction=HGB_VALIDATION_FRACTION, n_iter_no_change=HGB_N_ITER_NO_CHANGE,
+                random_state=42
+            )
+            if train_samples < 50:
+                param_grid = {'learning_rate': [0.1], 'max_depth': [3, 5]}
+            else:
+                param_grid = {
+                    'learning_rate': [0.05, 0.1],
+                    'max_leaf_nodes': [15, 31],
+                    'l2_regularization': [0.0, 1.0]
+                }
+            default = HistGradientBoostingClassifier(max_iter=50, max_depth=3, early_stopping=False, random_state=42)
+            return model, param_grid, default
+        if backend != "gradient_boosting":
+            raise ValueError(f"Unknown CLASSIFIER_BACKEND: {settings.CLASSIFIER_BACKEND}")
+        
+        from sklearn.ensemble import GradientBoostingClassifier
+        
+        # Hiperparámetros optimizados (simplificados para pocos datos)
+        if train_samples < 50:
+            # Para pocos datos, usar parámetros más conservadores
+            param_grid = {
+                'n_estimators': [50, 100],
+                'max_depth': [3, 5],
+                'learning_rate': [0.1],
+                'subsample': [1.0]
+            }
+        else:
+            param_grid = {
+                'n_estimators': [100, 200],
+                'max_depth': [5, 10, 15],
+                'learning_rate': [0.05, 0.1, 0.15],
+                'subsample': [0.8, 0.9, 1.0]
+            }
+        default = GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=42)
+        return GradientBoostingClassifier(random_state=42), param_grid, default
+    
+    def _train_classification_model(self, model_name: str, X: np.ndarray, y: np.ndarray, target_name: str, n_jobs: int = 1):
         """Entrena un modelo de clasificación con evaluación completa"""
+        from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+        from sklearn.metrics import accuracy_score, classification_report, f1_score, precision_score, recall_score
         
         # Verificar distribución de clases
         unique_classes, class_counts = np.unique(y, return_counts=True)
         min_class_count = np.min(class_counts)
         
-        print(f"   Class distribution: {dict(zip(unique_classes, class_counts))}")
+        logger.debug("Class distribution: %s", dict(zip(unique_classes, class_counts)))
         
         # Si hay clases con muy pocos ejemplos, usar estrategia diferente
         if min_class_count < 2:
-            print(f"   ⚠️ Insufficient samples in some classes (min: {min_class_count})")
-            print(f"   🔄 Using simple train-test split without stratification")
+            logger.debug("Insufficient samples in some classes (min: %s)", min_class_count)
+            logger.debug("Using simple train-test split without stratification")
             # Split sin estratificación
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             use_cv = False
         elif min_class_count < 5:
-            print(f"   ⚠️ Low samples in some classes (min: {min_class_count})")
-            print(f"   🔄 Using stratified split but simplified CV")
+            logger.debug("Low samples in some classes (min: %s)", min_class_count)
+            logger.debug("Using stratified split but simplified CV")
             # Split con estratificación pero CV reducido
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
             use_cv = True
@@ -526,42 +922,25 @@ class RealWeatherDataService:
             use_cv = True
             cv_folds = 5
         
-        # Hiperparámetros optimizados (simplificados para pocos datos)
-        if len(X_train) < 50:
-            # Para pocos datos, usar parámetros más conservadores
-            param_grid = {
-                'n_estimators': [50, 100],
-                'max_depth': [3, 5],
-                'learning_rate': [0.1],
-                'subsample': [1.0]
-            }
-        else:
-            param_grid = {
-                'n_estimators': [100, 200],
-                'max_depth': [5, 10, 15],
-                'learning_rate': [0.05, 0.1, 0.15],
-                'subsample': [0.8, 0.9, 1.0]
-            }
-        
-        model = GradientBoostingClassifier(random_state=42)
+        model, param_grid, default_model = self._classifier_candidates(len(X_train), min_class_count)
         
         # GridSearch con CV adaptativo
         if use_cv and len(X_train) >= 10:
-            grid_search = GridSearchCV(model, param_grid, cv=cv_folds, scoring='accuracy', n_jobs=-1)
+            grid_search = GridSearchCV(model, param_grid, cv=cv_folds, scoring='accuracy', n_jobs=n_jobs)
             try:
                 grid_search.fit(X_train, y_train)
                 best_model = grid_search.best_estimator_
                 best_params = grid_search.best_params_
             except ValueError as e:
-                print(f"   ⚠️ GridSearchCV failed: {e}")
-                print(f"   🔄 Using default parameters")
-                best_model = GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=42)
+                logger.debug("GridSearchCV failed: %s", e)
+                logger.debug("Using default parameters")
+                best_model = default_model
                 best_model.fit(X_train, y_train)
                 best_params = "default"
         else:
             # Usar parámetros por defecto sin CV
-            print(f"   ⚠️ Insufficient data for CV, using default parameters")
-            best_model = GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=42)
+            logger.debug("Insufficient data for CV, using default parameters")
+            best_model = default_model
             best_model.fit(X_train, y_train)
             best_params = "default"
         
@@ -581,7 +960,7 @@ class RealWeatherDataService:
             recall = recall_score(y_test, y_test_pred, average='weighted', zero_division=0)
             f1 = f1_score(y_test, y_test_pred, average='weighted', zero_division=0)
         except Exception as e:
-            print(f"   ⚠️ Error calculating advanced metrics: {e}")
+            logger.debug("Error calculating advanced metrics: %s", e)
             precision = test_accuracy
             recall = test_accuracy
             f1 = test_accuracy
@@ -589,12 +968,12 @@ class RealWeatherDataService:
         # Validación cruzada (solo si es posible)
         if use_cv and len(X) >= 10:
             try:
-                cv_scores = cross_val_score(best_model, X, y, cv=cv_folds, scoring='accuracy')
+                cv_scores = cross_val_score(best_model, X, y, cv=cv_folds, scoring='accuracy', n_jobs=n_jobs)
                 cv_mean = float(cv_scores.mean())
                 cv_std = float(cv_scores.std())
                 cv_scores_list = cv_scores.tolist()
             except Exception as e:
-                print(f"   ⚠️ Cross-validation failed: {e}")
+                logger.debug("Cross-validation failed: %s", e)
                 cv_mean = test_accuracy
                 cv_std = 0.0
                 cv_scores_list = [test_accuracy]
@@ -607,13 +986,17 @@ class RealWeatherDataService:
         try:
             class_report = classification_report(y_test, y_test_pred, output_dict=True, zero_division=0)
         except Exception as e:
-            print(f"   ⚠️ Classification report failed: {e}")
+            logger.debug("Classification report failed: %s", e)
             class_report = {"accuracy": test_accuracy}
         
         # Guardar métricas
+        if hasattr(best_model, 'n_iter_'):
+            # Iteraciones reales tras la parada temprana (HistGradientBoosting)
+            best_params = {**best_params, 'n_iter': int(best_model.n_iter_)} if isinstance(best_params, dict) else best_params
+        
         self.model_metrics[model_name] = {
             'model_type': 'classification',
-            'algorithm': 'GradientBoostingClassifier',
+            'algorithm': type(best_model).__name__,
             'target': target_name,
             'best_params': best_params,
             'train_samples': len(X_train),
@@ -638,24 +1021,23 @@ class RealWeatherDataService:
             'feature_importance': best_model.feature_importances_.tolist() if hasattr(best_model, 'feature_importances_') else []
         }
         
-        # Imprimir resultados
-        print(f"📊 {target_name} Model Results:")
-        print(f"   Best Parameters: {best_params}")
-        print(f"   Training Accuracy: {train_accuracy:.4f}")
-        print(f"   Test Accuracy: {test_accuracy:.4f}")
-        print(f"   Test Precision: {precision:.4f}")
-        print(f"   Test Recall: {recall:.4f}")
-        print(f"   Test F1-Score: {f1:.4f}")
-        if use_cv:
-            print(f"   CV Accuracy: {cv_mean:.4f} ± {cv_std:.4f}")
-        
         # Evaluación de rendimiento
         if f1 > 0.8:
-            print(f"   ✅ Excellent classification performance (F1 > 0.8)")
+            assessment = "excellent"
         elif f1 > 0.6:
-            print(f"   ✅ Good classification performance (F1 > 0.6)")
+            assessment = "good"
         else:
-            print(f"   ⚠️ Classification performance could be improved (F1 = {f1:.3f})")
+            assessment = "could_improve"
+        
+        logger.debug("Classification model results", extra={
+            "model": model_name, "target": target_name, "best_params": best_params,
+            "train_accuracy": round(train_accuracy, 4), "test_accuracy": round(test_accuracy, 4),
+            "test_precision": round(precision, 4), "test_recall": round(recall, 4),
+            "test_f1": round(f1, 4),
+            "cv_accuracy_mean": round(cv_mean, 4) if use_cv else None,
+            "cv_accuracy_std": round(cv_std, 4) if use_cv else None,
+            "assessment": assessment
+        })
     
     def _create_precipitation_categories(self, precip_data: np.ndarray) -> np.ndarray:
         """Crea categorías sofisticadas de precipitación"""
@@ -674,112 +1056,109 @@ class RealWeatherDataService:
         return np.array(categories)
     
     def _create_extreme_condition_labels(self, data: List[Dict]) -> np.ndarray:
-        """Crea etiquetas para condiciones extremas"""
-        labels = []
-        temps = [item['temperature'] for item in data]
-        precips = [item['precipitation'] for item in data]
-        winds = [item['wind_speed'] for item in data]
-        
-        # Percentiles para determinar extremos
-        temp_high = np.percentile(temps, 90)
-        temp_low = np.percentile(temps, 10)
-        precip_high = np.percentile(precips, 85)
-        wind_high = np.percentile(winds, 85)
-        
-        for item in data:
-            temp = item['temperature']
-            precip = item['precipitation']
-            wind = item['wind_speed']
-            
-            # Clasificación multi-clase de condiciones extremas
-            if temp > temp_high and precip > precip_high:
-                labels.append(0)  # Calor húmedo extremo
-            elif temp > temp_high:
-                labels.append(1)  # Calor seco extremo
-            elif temp < temp_low:
-                labels.append(2)  # Frío extremo
-            elif precip > precip_high:
-                labels.append(3)  # Lluvia extrema
-            elif wind > wind_high:
-                labels.append(4)  # Viento extremo
-            else:
-                labels.append(5)  # Condiciones normales
-        
-        return np.array(labels)
+        """
+        Crea etiquetas para condiciones extremas. Los umbrales son los de
+        ``predict_probabilities`` (CONDITION_PERCENTILES, por día del año), así
+        que la probabilidad del modelo y la frecuencia empírica miden lo mismo.
+        """
+        temps = np.array([item['temperature'] for item in data], dtype=np.float64)
+        precips = np.array([item['precipitation'] for item in data], dtype=np.float64)
+        winds = np.array([item['wind_speed'] for item in data], dtype=np.float64)
+        
+        # Percentiles del mismo día del año para determinar extremos
+        index = day_indices([item['date'] for item in data])
+        hot = temps > percentile_by_day(temps, index, CONDITION_PERCENTILES['very_hot'][1])
+        cold = temps < percentile_by_day(temps, index, CONDITION_PERCENTILES['very_cold'][1])
+        wet = precips > percentile_by_day(precips, index, CONDITION_PERCENTILES['very_wet'][1])
+        windy = winds > percentile_by_day(winds, index, CONDITION_PERCENTILES['very_windy'][1])
+        
+        # Clasificación multi-clase de condiciones extremas
+        return np.select(
+            [hot & wet, hot, cold, wet, windy],
+            [
+                0,  # Calor húmedo extremo
+                1,  # Calor seco extremo
+                2,  # Frío extremo
+                3,  # Lluvia extrema
+                4,  # Viento extremo
+            ],
+            default=5  # Condiciones normales
+        )
     
     def _print_models_summary(self):
-        """Imprime un resumen de todos los modelos entrenados"""
-        print("\n📈 MODELS PERFORMANCE SUMMARY")
-        print("=" * 60)
-        
+        """Registra un resumen de todos los modelos entrenados (una línea por modelo)"""
         for model_name, metrics in self.model_metrics.items():
             if metrics:
-                print(f"\n🔹 {model_name.upper().replace('_', ' ')}")
-                print(f"   Algorithm: {metrics['algorithm']}")
-                print(f"   Target: {metrics['target']}")
-                
+                summary = {"model": model_name, "algorithm": metrics['algorithm'], "target": metrics['target']}
                 if metrics['model_type'] == 'regression':
-                    print(f"   Test RMSE: {metrics['test_metrics']['rmse']:.4f}")
-                    print(f"   Test R²: {metrics['test_metrics']['r2_score']:.4f}")
-                    print(f"   CV RMSE: {metrics['cross_validation']['cv_rmse_mean']:.4f}")
+                    summary.update(
+                        test_rmse=round(metrics['test_metrics']['rmse'], 4),
+                        test_r2=round(metrics['test_metrics']['r2_score'], 4),
+                        cv_rmse=round(metrics['cross_validation']['cv_rmse_mean'], 4)
+                    )
                 else:
-                    print(f"   Test Accuracy: {metrics['test_metrics']['accuracy']:.4f}")
-                    print(f"   Test F1-Score: {metrics['test_metrics']['f1_score']:.4f}")
-                    print(f"   CV F1: {metrics['cross_validation']['cv_f1_mean']:.4f}")
+                    summary.update(
+                        test_accuracy=round(metrics['test_metrics']['accuracy'], 4),
+                        test_f1=round(metrics['test_metrics']['f1_score'], 4),
+                        cv_f1=round(metrics['cross_validation']['cv_f1_mean'], 4)
+                    )
+                logger.info("Model performance summary", extra=summary)
     
     def get_model_metrics(self) -> Dict:
         """Retorna todas las métricas de los modelos"""
         return self.model_metrics
     
     def print_detailed_metrics(self):
-        """Imprime métricas detalladas de todos los modelos"""
-        print("\n" + "="*80)
-        print("🧠 COMPREHENSIVE AI MODEL METRICS REPORT")
-        print("="*80)
+        """Registra (nivel INFO) un informe detallado de las métricas de todos los modelos"""
+        report = []
+        report.append("\n" + "="*80)
+        report.append("🧠 COMPREHENSIVE AI MODEL METRICS REPORT")
+        report.append("="*80)
         
         if not hasattr(self, 'model_metrics') or not self.model_metrics:
-            print("❌ No model metrics available. Train models first.")
+            report.append("❌ No model metrics available. Train models first.")
+            logger.info("\n".join(report))
             return
         
         total_models = sum(1 for metrics in self.model_metrics.values() if metrics)
-        print(f"📊 Total Trained Models: {total_models}")
+        report.append(f"📊 Total Trained Models: {total_models}")
         
         for model_name, metrics in self.model_metrics.items():
             if not metrics:
                 continue
                 
-            print(f"\n" + "="*60)
-            print(f"🔹 {model_name.upper().replace('_', ' ')}")
-            print("="*60)
+            report.append(f"\n" + "="*60)
+            report.append(f"🔹 {model_name.upper().replace('_', ' ')}")
+            report.append("="*60)
             
-            print(f"📋 Model Information:")
-            print(f"   • Algorithm: {metrics['algorithm']}")
-            print(f"   • Model Type: {metrics['model_type'].title()}")
-            print(f"   • Target Variable: {metrics['target']}")
-            print(f"   • Training Samples: {metrics['train_samples']}")
-            print(f"   • Test Samples: {metrics['test_samples']}")
+            report.append(f"📋 Model Information:")
+            report.append(f"   • Algorithm: {metrics['algorithm']}")
+            report.append(f"   • Model Type: {metrics['model_type'].title()}")
+            report.append(f"   • Target Variable: {metrics['target']}")
+            report.append(f"   • Training Samples: {metrics['train_samples']}")
+            report.append(f"   • Test Samples: {metrics['test_samples']}")
             
             if 'best_params' in metrics:
-                print(f"   • Best Hyperparameters: {metrics['best_params']}")
+                report.append(f"   • Best Hyperparameters: {metrics['best_params']}")
             
             if metrics['model_type'] == 'regression':
-                print(f"\n📈 Regression Metrics:")
+                report.append(f"\n📈 Regression Metrics:")
                 train_metrics = metrics['train_metrics']
                 test_metrics = metrics['test_metrics']
                 cv_metrics = metrics['cross_validation']
                 
-                print(f"   Training Performance:")
-                print(f"     - RMSE: {train_metrics['rmse']:.4f}")
-                print(f"     - MAE: {train_metrics['mae']:.4f}")
-                print(f"     - R² Score: {train_metrics['r2_score']:.4f}")
+                report.append(f"   Training Performance:")
+                report.append(f"     - RMSE: {train_metrics['rmse']:.4f}")
+                report.append(f"     - MAE: {train_metrics['mae']:.4f}")
+                report.append(f"     - R² Score: {train_metrics['r2_score']:.4f}")
                 
-                print(f"   Test Performance:")
-                print(f"     - RMSE: {test_metrics['rmse']:.4f}")
-                print(f"     - MAE: {test_metrics['mae']:.4f}")
-                print(f"     - R² Score: {test_metrics['r2_score']:.4f}")
+                report.append(f"   Test Performance:")
+                report.append(f"     - RMSE: {test_metrics['rmse']:.4f}")
+                report.append(f"     - MAE: {test_metrics['mae']:.4f}")
+                report.append(f"     - R² Score: {test_metrics['r2_score']:.4f}")
                 
-                print(f"   Cross-Validation ({cv_metrics['cv_folds']}-fold):")
-                print(f"     - CV RMSE: {cv_metrics['cv_rmse_mean']:.4f} ± {cv_metrics['cv_rmse_std']:.4f}")
+                report.append(f"   Cross-Validation ({cv_metrics['cv_folds']}-fold):")
+                report.append(f"     - CV RMSE: {cv_metrics['cv_rmse_mean']:.4f} ± {cv_metrics['cv_rmse_std']:.4f}")
                 
                 # Evaluación de calidad
                 r2_score = test_metrics['r2_score']
@@ -794,28 +1173,28 @@ class RealWeatherDataService:
                 else:
                     quality = "❌ POOR"
                 
-                print(f"   Model Quality: {quality} (R² = {r2_score:.3f})")
+                report.append(f"   Model Quality: {quality} (R² = {r2_score:.3f})")
                 
             elif metrics['model_type'] == 'classification':
-                print(f"\n🎯 Classification Metrics:")
+                report.append(f"\n🎯 Classification Metrics:")
                 train_metrics = metrics['train_metrics']
                 test_metrics = metrics['test_metrics']
                 cv_metrics = metrics['cross_validation']
                 
-                print(f"   Training Performance:")
-                print(f"     - Accuracy: {train_metrics['accuracy']:.4f}")
+                report.append(f"   Training Performance:")
+                report.append(f"     - Accuracy: {train_metrics['accuracy']:.4f}")
                 
-                print(f"   Test Performance:")
-                print(f"     - Accuracy: {test_metrics['accuracy']:.4f}")
-                print(f"     - Precision: {test_metrics['precision']:.4f}")
-                print(f"     - Recall: {test_metrics['recall']:.4f}")
-                print(f"     - F1-Score: {test_metrics['f1_score']:.4f}")
+                report.append(f"   Test Performance:")
+                report.append(f"     - Accuracy: {test_metrics['accuracy']:.4f}")
+                report.append(f"     - Precision: {test_metrics['precision']:.4f}")
+                report.append(f"     - Recall: {test_metrics['recall']:.4f}")
+                report.append(f"     - F1-Score: {test_metrics['f1_score']:.4f}")
                 
-                print(f"   Cross-Validation ({cv_metrics['cv_folds']}-fold):")
-                print(f"     - CV F1-Score: {cv_metrics['cv_f1_mean']:.4f} ± {cv_metrics['cv_f1_std']:.4f}")
+                report.append(f"   Cross-Validation ({cv_metrics['cv_folds']}-fold):")
+                report.append(f"     - CV F1-Score: {cv_metrics['cv_f1_mean']:.4f} ± {cv_metrics['cv_f1_std']:.4f}")
                 
                 if 'class_distribution' in metrics:
-                    print(f"   Class Distribution: {metrics['class_distribution']}")
+                    report.append(f"   Class Distribution: {metrics['class_distribution']}")
                 
                 # Evaluación de calidad
                 f1_score = test_metrics['f1_score']
@@ -830,11 +1209,11 @@ class RealWeatherDataService:
                 else:
                     quality = "❌ POOR"
                 
-                print(f"   Model Quality: {quality} (F1 = {f1_score:.3f})")
+                report.append(f"   Model Quality: {quality} (F1 = {f1_score:.3f})")
             
             # Feature importance
             if 'feature_importance' in metrics and metrics['feature_importance']:
-                print(f"\n🎯 Feature Importance (Top 5):")
+                report.append(f"\n🎯 Feature Importance (Top 5):")
                 feature_names = ['day_of_year', 'latitude', 'longitude', 'historical_avg', 
                                'seasonal_factor', 'coastal_factor', 'elevation_factor']
                 
@@ -842,16 +1221,24 @@ class RealWeatherDataService:
                 importance_pairs.sort(key=lambda x: x[1], reverse=True)
                 
                 for i, (feature, importance) in enumerate(importance_pairs[:5]):
-                    print(f"     {i+1}. {feature}: {importance:.4f}")
+                    report.append(f"     {i+1}. {feature}: {importance:.4f}")
         
-        print(f"\n" + "="*80)
-        print("✅ MODEL METRICS REPORT COMPLETE")
-        print("="*80)
+        report.append(f"\n" + "="*80)
+        report.append("✅ MODEL METRICS REPORT COMPLETE")
+        report.append("="*80)
+        logger.info("\n".join(report))
     
     def predict_probabilities(self, latitude: float, longitude: float, 
-                            date_of_year: str, historical_data: List[Dict]) -> Dict[str, Dict]:
+                            date_of_year: str, historical_data: List[Dict],
+                            climatology: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict]:
         """
         Predice probabilidades de condiciones extremas usando modelos entrenados
+
+        Args:
+            climatology: Tabla de climatología de la ubicación con las
+                probabilidades del condition_classifier ya calculadas por día
+                del año (``update_climatology``): se combinan con las frecuencias
+                empíricas sin inferencia en la petición
         """
         if not historical_data:
             return self.fallback_probabilities()
@@ -892,13 +1279,101 @@ class RealWeatherDataService:
             }
         }
         
-        # Si tenemos modelos entrenados, usar ML para ajustar probabilidades
-        if self.models['condition_classifier'] is not None:
-            # Aquí podríamos usar el modelo para refinar las predicciones
-            pass
+        for values in probabilities.values():
+            values['empirical_probability'] = values['probability']
+        
+        # Ajustar con el condition_classifier (precalculado para los 366 días)
+        if has_model_probabilities(climatology):
+            month, day = map(int, date_of_year.split('-'))
+            index = day_index(month, day)
+            for condition in CONDITION_MODEL_CLASSES:
+                model_probability = float(climatology[f"{condition}_model_probability"][index])
+                if np.isnan(model_probability):
+                    continue
+                values = probabilities[condition]
+                values['model_probability'] = model_probability
+                values['probability'] = blend_probability(
+                    values['probability'], model_probability, len(temps), CONDITION_MODEL_PSEUDO_COUNT
+                )
         
         return probabilities
     
+    def score_condition_days(self, rows: List[Dict], latitude: float, longitude: float,
+                             model_key: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Probabilidad de cada condición según el condition_classifier de
+        ``model_key`` (por defecto el de la ubicación) para los 366 días del año:
+        media del ``predict_proba`` de los registros reales de cada día, en un
+        solo lote. Columnas ``<condición>_model_probability`` (NaN en días sin
+        registros). Vacío si el modelo no existe o es de otra versión (sus
+        etiquetas no usarían los umbrales de ``predict_probabilities``) o si
+        ``rows`` no es el histórico completo (p. ej. los registros de un solo día).
+        """
+        import joblib
+        
+        model_key = model_key or f"{round(latitude, 3)}_{round(longitude, 3)}"
+        manifest = self.load_model_manifest(model_key) or {}
+        if 'condition_classifier' not in manifest.get("models", []) or manifest.get("model_version") != MODEL_VERSION:
+            return {}
+        if not rows:
+            return {}
+        index = day_indices([row['date'] for row in rows])
+        if not covers_full_year(index):
+            logger.warning("Condition scoring needs the full history", extra={"location_key": model_key, "rows": len(rows)})
+            return {}
+        
+        # Solo el clasificador y el scaler, leídos aparte: no toca los modelos cargados
+        location_models_dir = self.models_dir / model_key
+        try:
+            with file_lock(location_models_dir, shared=True):
+                model = joblib.load(location_models_dir / "condition_classifier.pkl")
+                scaler = joblib.load(location_models_dir / "scalers.pkl").get('features')
+        except Exception as e:
+            logger.warning("Error loading condition classifier for %s: %s", model_key, e)
+            return {}
+        if scaler is None:
+            return {}
+        
+        with span("condition_scoring", rows=len(rows)):
+            probabilities = model.predict_proba(scaler.transform(self.prepare_features(rows, latitude, longitude)))
+        
+        return {
+            f"{condition}_model_probability": mean_by_day(probabilities[:, np.isin(model.classes_, labels)].sum(axis=1), index)
+            for condition, labels in CONDITION_MODEL_CLASSES.items()
+        }
+    
+    def update_climatology(self, latitude: float, longitude: float, rows: Optional[List[Dict]] = None,
+                           years: int = 50, model_key: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Añadir a la climatología de la ubicación (data_cache/climatology/) las
+        probabilidades del condition_classifier (``score_condition_days``) para
+        el histórico completo ``rows`` o, sin él, el de data_cache. Si la tabla
+        no existe se construye con los mismos registros.
+        Retorna la tabla (None si no hay histórico completo o modelo).
+        """
+        location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+        if rows is None:
+            cache_path = self.data_cache_path(latitude, longitude, years)
+            if not cache_path.exists():
+                return None
+            with open(cache_path, 'rb') as f:
+                rows = pickle.load(f)
+        if not rows:
+            return None
+        
+        columns = self.score_condition_days(rows, latitude, longitude, model_key)
+        if not columns:
+            return None
+        path = climatology_path(self.data_cache_dir, location_key)
+        table = load_npz(path)
+        if table is None:
+            table = build_climatology(rows_to_columns(rows))
+        table.update(columns)
+        table["condition_model_version"] = np.array(MODEL_VERSION)
+        save_npz(path, table)
+        logger.info("Condition probabilities cached in climatology", extra={"location_key": location_key})
+        return table
+    
     def fallback_probabilities(self) -> Dict[str, Dict]:
         """
         Probabilidades por defecto cuando no hay datos suficientes
@@ -911,57 +1386,147 @@ class RealWeatherDataService:
             'very_uncomfortable': {'probability': 0.15, 'threshold': 32.0, 'unit': '°C'}
         }
     
-    def save_trained_models(self, location_key: str = "global"):
+    def save_trained_models(self, location_key: str = "global", training_info: Optional[Dict] = None):
         """
-        Guarda los modelos entrenados por ubicación
+        Guarda los modelos entrenados por ubicación y su manifiesto
+        (métricas, features, duración y rango de datos del entrenamiento)
         """
         try:
             # Crear directorio específico para la ubicación
             location_models_dir = self.models_dir / location_key
             location_models_dir.mkdir(exist_ok=True)
             
-            for model_name, model in self.models.items():
-                if model is not None:
-                    model_path = location_models_dir / f"{model_name}.pkl"
-                    joblib.dump(model, model_path)
-                    print(f"💾 Saved {model_name} model for {location_key}")
+            # Lock exclusivo por ubicación: otro worker puede estar entrenando/cargando la misma
+            with file_lock(location_models_dir):
+                for model_name, model in self.models.items():
+                    if model is not None:
+                        model_path = location_models_dir / f"{model_name}.pkl"
+                        atomic_joblib_dump(model, model_path)
+                        logger.debug("Saved model", extra={"model": model_name, "location_key": location_key})
+                
+                # Guardar scalers
+                scaler_path = location_models_dir / "scalers.pkl"
+                atomic_joblib_dump(self.scalers, scaler_path)
+                logger.debug("Saved scalers", extra={"location_key": location_key})
+                
+                # El manifiesto va al final: si existe, los pickles ya están completos
+                manifest = {
+                    "location_key": location_key,
+                    "model_version": MODEL_VERSION,
+                    "app_version": settings.VERSION,
+                    **(training_info or {}),
+                    "feature_names": FEATURE_NAMES,
+                    "models": [name for name, model in self.models.items() if model is not None],
+                    "metrics": self.model_metrics,
+                }
+                atomic_json_dump(manifest, location_models_dir / MODEL_MANIFEST_NAME)
+                index_entry = self.model_index.describe_location(location_key, manifest)
             
-            # Guardar scalers
-            scaler_path = location_models_dir / "scalers.pkl"
-            joblib.dump(self.scalers, scaler_path)
-            print(f"💾 Saved scalers for {location_key}")
+            # El índice lista ubicaciones: el modelo global no entra
+            if location_key != GLOBAL_MODEL_KEY:
+                self.model_index.update(location_key, index_entry)
             
         except Exception as e:
-            print(f"Error saving models for {location_key}: {e}")
+            logger.warning("Error saving models for %s: %s", location_key, e)
     
     def load_trained_models(self, location_key: str = "global"):
         """
         Carga los modelos entrenados para una ubicación específica
         """
-        try:
-            location_models_dir = self.models_dir / location_key
-            if not location_models_dir.exists():
-                print(f"📂 No models found for {location_key}")
-                return False
+        import joblib
+        
+        with self.model_state():
+            try:
+                location_models_dir = self.models_dir / location_key
+                if not location_models_dir.exists():
+                    logger.debug("No models found", extra={"location_key": location_key})
+                    return False
+                
+                manifest = self.load_model_manifest(location_key)
+                if manifest is not None and manifest.get("model_version", MODEL_VERSION) > MODEL_VERSION:
+                    # Pickles de una versión posterior (clases que este código puede no tener)
+                    logger.warning("Models newer than supported version", extra={
+                        "location_key": location_key, "model_version": manifest.get("model_version"), "supported": MODEL_VERSION
+                    })
+                    return False
+            
+                # Partir de cero: un modelo sin .pkl en esta ubicación no debe quedarse
+                # con el de la ubicación cargada antes
+                self._reset_models()
+                models_loaded = 0
+                # Lock compartido: no mezclar archivos de un guardado a medio hacer
+                with file_lock(location_models_dir, shared=True):
+                    for model_name in self.models.keys():
+                        model_path = location_models_dir / f"{model_name}.pkl"
+                        if model_path.exists():
+                            self.models[model_name] = joblib.load(model_path)
+                            models_loaded += 1
                 
-            models_loaded = 0
-            for model_name in self.models.keys():
-                model_path = location_models_dir / f"{model_name}.pkl"
-                if model_path.exists():
-                    self.models[model_name] = joblib.load(model_path)
-                    models_loaded += 1
+                    # Cargar scalers
+                    scaler_path = location_models_dir / "scalers.pkl"
+                    if scaler_path.exists():
+                        self.scalers = joblib.load(scaler_path)
             
-            # Cargar scalers
-            scaler_path = location_models_dir / "scalers.pkl"
-            if scaler_path.exists():
-                self.scalers = joblib.load(scaler_path)
+                if manifest is not None:
+                    self.model_metrics.update(manifest.get("metrics", {}))
                 
-            print(f"📂 Loaded {models_loaded} models for {location_key}")
-            return models_loaded > 0
+                if models_loaded > 0:
+                    self.loaded_location_key = location_key
+                logger.info("Loaded models", extra={"location_key": location_key, "models": models_loaded})
+                return models_loaded > 0
                 
-        except Exception as e:
-            print(f"Error loading models for {location_key}: {e}")
-            return False
+            except Exception as e:
+                logger.warning("Error loading models for %s: %s", location_key, e)
+                self._reset_models()
+                return False
+    
+    def has_global_models(self) -> bool:
+        """Hay un modelo global entrenado (models/global con su manifiesto)"""
+        return (self.models_dir / GLOBAL_MODEL_KEY / MODEL_MANIFEST_NAME).exists()
+    
+    def load_model_manifest(self, location_key: str) -> Optional[Dict]:
+        """
+        Lee el manifiesto de los modelos de una ubicación sin cargar ningún pickle.
+        Retorna None si la ubicación no tiene manifiesto (no entrenada o modelos antiguos)
+        """
+        manifest_path = self.models_dir / location_key / MODEL_MANIFEST_NAME
+        try:
+            with open(manifest_path, encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Error reading model manifest for %s: %s", location_key, e)
+            return None
+
+    def legacy_model_manifest(self, location_key: str) -> Optional[Dict]:
+        """
+        Descripción con forma de manifiesto de modelos guardados antes de que
+        existiera el manifiesto: modelos y fecha de los .pkl en disco, sin
+        cargarlos ni escribir nada. Las métricas de entrenamiento no se
+        guardaban, así que solo se indica el tipo de cada modelo.
+        Retorna None si la ubicación no tiene modelos.
+        """
+        location_models_dir = self.models_dir / location_key
+        model_paths = [location_models_dir / f"{name}.pkl" for name in self.models]
+        model_paths = [path for path in model_paths if path.exists()]
+        if not model_paths:
+            return None
+        return {
+            "location_key": location_key,
+            "model_version": None,
+            "trained_at": datetime.fromtimestamp(max(path.stat().st_mtime for path in model_paths)).isoformat(),
+            "training_mode": "legacy",
+            "models": [path.stem for path in model_paths],
+            "metrics": {
+                path.stem: {
+                    "model_type": "classification" if path.stem.endswith("_classifier") else "regression",
+                    "legacy": True,
+                    "model_size_bytes": path.stat().st_size,
+                }
+                for path in model_paths
+            },
+        }
 
 # Instancia global
 real_weather_service = RealWeatherDataService()
\ No newline at end of file
@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional, Tuple
+import threading
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+def to_unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """Coordenadas en grados a vectores (x, y, z) sobre la esfera unidad"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord):
+    """Distancia euclídea entre vectores unitarios a distancia sobre la superficie"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+def km_to_chord(distance_km: float) -> float:
+    return float(2 * np.sin(min(distance_km / EARTH_RADIUS_KM, np.pi) / 2))
+
+class SpatialIndex:
+    """
+    Índice de puntos (clave -> lat/lon) para consultas de vecino más cercano.
+
+    Usa un KD-tree sobre coordenadas en la esfera unidad: la distancia euclídea
+    (cuerda) es monótona con la distancia real, así que no hay problemas en el
+    antimeridiano ni en los polos. El árbol se reconstruye de forma perezosa
+    en la primera consulta después de añadir o quitar puntos.
+    """
+
+    def __init__(self):
+        self._points: Dict[str, Tuple[float, float]] = {}
+        self._keys: List[str] = []
+        self._tree = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._points
+
+    def get(self, key: str) -> Optional[Tuple[float, float]]:
+        return self._points.get(key)
+
+    def add(self, key: str, latitude: float, longitude: float):
+        with self._lock:
+            if self._points.get(key) != (latitude, longitude):
+                self._points[key] = (latitude, longitude)
+                self._dirty = True
+
+    def discard(self, key: str):
+        with self._lock:
+            if self._points.pop(key, None) is not None:
+                self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._points.clear()
+            self._dirty = True
+
+    def _current_tree(self):
+        with self._lock:
+            if self._dirty or (self._tree is None and self._points):
+                from sklearn.neighbors import KDTree
+
+                self._keys = list(self._points)
+                if self._keys:
+                    latitudes, longitudes = zip(*(self._points[key] for key in self._keys))
+                    self._tree = KDTree(to_unit_vectors(latitudes, longitudes))
+                else:
+                    self._tree = None
+                self._dirty = False
+            return self._tree, self._keys
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Puntos a menos de ``radius_km``, del más cercano al más lejano: ``[(clave, km)]``"""
+        tree, keys = self._current_tree()
+        if tree is None:
+            return []
+        indices, chords = tree.query_radius(
+            to_unit_vectors([latitude], [longitude]), r=km_to_chord(radius_km),
+            return_distance=True, sort_results=True
+        )
+        return [
+            (keys[index], round(float(distance), 3))
+            for index, distance in zip(indices[0], chord_to_km(chords[0]))
+            if keys[index] != exclude
+        ]
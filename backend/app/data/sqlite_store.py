@@ -0,0 +1,153 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+from app.data.historical_store import row_date
+import sqlite3
+import threading
+
+# Columnas numéricas de cada registro histórico (mismo formato que NASA POWER procesado)
+VALUE_COLUMNS = (
+    "temperature", "temperature_max", "temperature_min",
+    "precipitation", "wind_speed", "humidity", "heat_index"
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS weather_observations (
+    location_key TEXT NOT NULL,
+    date INTEGER NOT NULL,        -- YYYYMMDD
+    month_day INTEGER NOT NULL,   -- MMDD, para consultas por día del año
+    {", ".join(f"{column} REAL" for column in VALUE_COLUMNS)},
+    PRIMARY KEY (location_key, date)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_observations_location_month_day
+    ON weather_observations (location_key, month_day);
+
+CREATE TABLE IF NOT EXISTS trained_locations (
+    location_key TEXT PRIMARY KEY,
+    updated_at TEXT NOT NULL
+);
+"""
+
+class SQLiteHistoricalStore:
+    """
+    Almacén histórico sobre SQLite (modo WAL), compartible entre workers.
+
+    Misma interfaz que ``FileHistoricalStore``; las consultas por rango de
+    fechas y por día del año se resuelven en SQL usando el índice
+    (location_key, date) de la clave primaria y (location_key, month_day).
+    """
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Una conexión por hilo (las peticiones usan el pool de CPU)
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_url(cls, database_url: str) -> "SQLiteHistoricalStore":
+        """Crear el almacén a partir de una URL ``sqlite:///ruta/al/archivo.db``"""
+        prefix = "sqlite:///"
+        if not database_url.startswith(prefix):
+            raise ValueError(f"Unsupported DATABASE_URL for SQLite store: {database_url}")
+        return cls(Path(database_url[len(prefix):]))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_db_row(location_key: str, row: Dict[str, Any]) -> Tuple:
+        day = row_date(row)
+        date_int = day.year * 10000 + day.month * 100 + day.day
+        return (location_key, date_int, date_int % 10000) + tuple(row.get(column) for column in VALUE_COLUMNS)
+
+    @staticmethod
+    def _from_db_rows(db_rows: Iterable[Tuple]) -> List[Dict[str, Any]]:
+        rows = []
+        for date_int, *values in db_rows:
+            row = {'date': datetime(date_int // 10000, date_int // 100 % 100, date_int % 100)}
+            for column, value in zip(VALUE_COLUMNS, values):
+                if value is not None:
+                    row[column] = value
+            rows.append(row)
+        return rows
+
+    def _select(self, where: str, params: Tuple) -> List[Dict[str, Any]]:
+        query = f"SELECT date, {', '.join(VALUE_COLUMNS)} FROM weather_observations WHERE {where} ORDER BY date"
+        return self._from_db_rows(self._connection().execute(query, params))
+
+    def _insert(self, conn: sqlite3.Connection, location_key: str, rows: List[Dict[str, Any]]):
+        placeholders = ", ".join("?" for _ in range(3 + len(VALUE_COLUMNS)))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO weather_observations "
+            f"(location_key, date, month_day, {', '.join(VALUE_COLUMNS)}) VALUES ({placeholders})",
+            [self._to_db_row(location_key, row) for row in rows]
+        )
+
+    def keys(self) -> List[str]:
+        cursor = self._connection().execute("SELECT DISTINCT location_key FROM weather_observations ORDER BY location_key")
+        return [key for (key,) in cursor]
+
+    def load(self, location_key: str) -> Optional[List[Dict[str, Any]]]:
+        rows = self._select("location_key = ?", (location_key,))
+        return rows or None
+
+    def load_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        data: Dict[str, List[Dict[str, Any]]] = {}
+        cursor = self._connection().execute(
+            f"SELECT location_key, date, {', '.join(VALUE_COLUMNS)} FROM weather_observations ORDER BY location_key, date"
+        )
+        for location_key, *db_row in cursor:
+            data.setdefault(location_key, []).extend(self._from_db_rows([db_row]))
+        return data
+
+    def save(self, location_key: str, rows: List[Dict[str, Any]]):
+        """Reemplazar los datos de una ubicación en una sola transacción"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM weather_observations WHERE location_key = ?", (location_key,))
+            self._insert(conn, location_key, rows)
+
+    def append(self, location_key: str, rows: List[Dict[str, Any]]) -> int:
+        """Añadir registros (upsert por fecha). Retorna el número de fechas nuevas"""
+        conn = self._connection()
+        count_query = "SELECT COUNT(*) FROM weather_observations WHERE location_key = ?"
+        with conn:
+            before = conn.execute(count_query, (location_key,)).fetchone()[0]
+            self._insert(conn, location_key, rows)
+            after = conn.execute(count_query, (location_key,)).fetchone()[0]
+        return after - before
+
+    def query_range(self, location_key: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        start_int = start.year * 10000 + start.month * 100 + start.day
+        end_int = end.year * 10000 + end.month * 100 + end.day
+        return self._select("location_key = ? AND date BETWEEN ? AND ?", (location_key, start_int, end_int))
+
+    def query_day_of_year(self, location_key: str, month: int, day: int) -> List[Dict[str, Any]]:
+        return self._select("location_key = ? AND month_day = ?", (location_key, month * 100 + day))
+
+    def delete(self, location_key: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM weather_observations WHERE location_key = ?", (location_key,))
+            conn.execute("DELETE FROM trained_locations WHERE location_key = ?", (location_key,))
+
+    def trained_keys(self) -> Set[str]:
+        return {key for (key,) in self._connection().execute("SELECT location_key FROM trained_locations")}
+
+    def mark_trained(self, location_key: str):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO trained_locations (location_key, updated_at) VALUES (?, ?)",
+                (location_key, datetime.now().isoformat())
+            )
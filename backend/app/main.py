@@ -1,15 +1,48 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import weather, locations
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api import weather, locations, admin
 from app.core.config import settings
-from app.data.real_weather_data import real_weather_service
-from app.data.giovanni_nasa_data import giovanni_weather_service
+from app.core.executor import event_loop_monitor, shutdown_executors
+from app.core.cpu_budget import training_budget
+from app.core.metrics import REGISTRY, HTTP_REQUEST_DURATION
+from app.core.tracing import server_timing_header, start_trace
+from app.core.logging import configure_logging, shutdown_logging
+from app.data.gazetteer import get_gazetteer
+from app.services.weather_service import get_weather_service
+from app.services.warmup_service import warmup_service
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado: construcción de servicios, monitor del event loop y pools de trabajo"""
+    # Los servicios se construyen aquí (no al importar) para que el import sea rápido
+    await asyncio.to_thread(get_weather_service)
+    await asyncio.to_thread(get_gazetteer)
+    if settings.GIOVANNI_ENABLED:
+        from app.data.giovanni_nasa_data import get_giovanni_weather_service
+        await asyncio.to_thread(get_giovanni_weather_service)
+    
+    event_loop_monitor.start()
+    # En segundo plano: el servidor acepta peticiones mientras se calienta
+    warmup_service.start()
+    yield
+    await warmup_service.stop()
+    await event_loop_monitor.stop()
+    shutdown_executors()
+    shutdown_logging()
 
 # Crear instancia de FastAPI
 app = FastAPI(
     title="Weather Probability API with NASA Giovanni & AI",
     description="API para consultar probabilidades de condiciones climáticas usando datos reales de NASA Giovanni y modelos de Machine Learning avanzados",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -21,9 +54,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """Latencia por ruta (plantilla de la ruta, no la URL, para acotar la cardinalidad)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        ).observe(time.perf_counter() - started)
+
+@app.middleware("http")
+async def trace_weather_request(request: Request, call_next):
+    """
+    Traza por petición del router de weather: header ``Server-Timing`` con las
+    etapas y, con ``?trace=1``, la respuesta JSON envuelta como ``{data, trace}``
+    """
+    if not request.url.path.startswith("/api/weather"):
+        return await call_next(request)
+
+    with start_trace(f"{request.method} {request.url.path}") as root:
+        response = await call_next(request)
+
+    response.headers["Server-Timing"] = server_timing_header(root)
+
+    trace_requested = request.query_params.get("trace", "").lower() in ("1", "true")
+    if not trace_requested or not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {
+        name: value for name, value in response.headers.items()
+        if name.lower() not in ("content-length", "content-type")
+    }
+    return JSONResponse(
+        {"data": json.loads(body) if body else None, "trace": root.to_dict()},
+        status_code=response.status_code,
+        headers=headers
+    )
+
 # Incluir routers
 app.include_router(weather.router, prefix="/api/weather", tags=["weather"])
 app.include_router(locations.router, prefix="/api/locations", tags=["locations"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"], include_in_schema=False)
 
 @app.get("/")
 async def root():
@@ -43,19 +123,35 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "event_loop": event_loop_monitor.stats(),
+        "readiness": warmup_service.status(),
+        # Sondea los archivos de slots: fuera del event loop
+        "training_cpu": await asyncio.to_thread(training_budget.status)
+    }
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness para el orquestador: 503 hasta terminar el calentamiento de las ubicaciones populares"""
+    status = warmup_service.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    # Algunos gauges leen archivos (slots de CPU): fuera del event loop
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/model/info")
 async def model_info():
     """Información sobre los modelos de ML y estado del sistema"""
-    from app.services.weather_service import weather_service
-    
-    cache_info = weather_service.get_cache_info()
+    cache_info = get_weather_service().get_cache_info()
     
     return {
         "ml_models": {
             "temperature_prediction": "RandomForestRegressor",
-            "condition_classification": "GradientBoostingClassifier", 
+            "condition_classification": "HistGradientBoostingClassifier" if settings.CLASSIFIER_BACKEND == "hist_gradient_boosting" else "GradientBoostingClassifier",
             "training_features": ["month", "day", "historical_avg", "trend"]
         },
         "data_sources": {
@@ -74,9 +170,7 @@ async def model_info():
 @app.delete("/api/cache/clear")
 async def clear_cache(latitude: float = None, longitude: float = None):
     """Limpiar cache de datos históricos y modelos entrenados"""
-    from app.services.weather_service import weather_service
-    
-    weather_service.clear_cache(latitude, longitude)
+    get_weather_service().clear_cache(latitude, longitude)
     
     if latitude is not None and longitude is not None:
         return {"message": f"Cache cleared for location {latitude}, {longitude}"}
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobCreate(BaseModel):
+    """Solicitud para preparar (descargar datos y entrenar modelos) una ubicación"""
+    latitude: float
+    longitude: float
+    date_of_year: Optional[str] = None  # Format: "MM-DD", usa fecha actual si no se especifica
+
+class JobEvent(BaseModel):
+    """Evento de progreso emitido por un job (chunks descargados, modelos entrenados, etc.)"""
+    id: int
+    stage: str
+    timestamp: datetime
+    data: Dict[str, Any] = {}
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: JobStatus
+    location_key: str
+    latitude: float
+    longitude: float
+    date_of_year: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_event: Optional[JobEvent] = None
+    events_count: int = 0
+    error: Optional[str] = None
+    links: Dict[str, str] = {}
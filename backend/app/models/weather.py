@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime, date
 from enum import Enum
@@ -38,13 +38,36 @@ class WeatherDataPoint(BaseModel):
     humidity: float
     heat_index: Optional[float] = None
 
+class HistoricalRecord(BaseModel):
+    """Registro diario para el histórico (mismas claves que NASA POWER procesado)"""
+    date: datetime
+    temperature: float
+    temperature_max: Optional[float] = None
+    temperature_min: Optional[float] = None
+    precipitation: float = Field(ge=0)
+    wind_speed: float = Field(ge=0)
+    humidity: float = Field(ge=0, le=100)
+    heat_index: Optional[float] = None
+
+class HistoricalAppend(BaseModel):
+    latitude: float
+    longitude: float
+    records: List[HistoricalRecord] = Field(min_length=1)
+
 class WeatherProbability(BaseModel):
+    # ``model_probability`` no es un atributo de pydantic (prefijo ``model_`` permitido)
+    model_config = ConfigDict(protected_namespaces=())
+
     condition: str
     probability: float  # 0.0 to 1.0
     threshold: float
     unit: str
     description: Optional[str] = ""
     is_enabled: bool = True  # Nuevo: indica si el usuario quiere ver esta condición
+    # Componentes de ``probability``: frecuencia observada y probabilidad del
+    # condition_classifier (None si la condición no se combina con el modelo)
+    empirical_probability: Optional[float] = None
+    model_probability: Optional[float] = None
 
 class CustomThresholds(BaseModel):
     """Umbrales personalizados definidos por el usuario"""
@@ -100,4 +123,9 @@ class WeatherResponse(BaseModel):
     query_date: date
     
     # Información personalizada
-    user_preferences: dict = {}
\ No newline at end of file
+    user_preferences: dict = {}
+    
+    # Ubicación vecina usada mientras se prepara la consultada (location_key,
+    # latitude, longitude, distance_km, job): probabilidades, histórico y
+    # predicciones futuras son los suyos. None si se respondió con la propia
+    served_from: Optional[dict] = None
\ No newline at end of file
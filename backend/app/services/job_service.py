@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional, AsyncIterator
+from app.models.job import JobStatus, JobEvent, JobInfo
+from app.services.weather_service import get_weather_service
+from datetime import datetime
+import asyncio
+import contextvars
+import threading
+import json
+import uuid
+
+# Segundos entre comentarios keep-alive en el stream SSE
+SSE_KEEPALIVE_SECONDS = 15
+
+class WeatherJob:
+    """
+    Job en segundo plano que prepara una ubicación "fría": descarga el histórico
+    de NASA POWER y entrena los modelos, publicando eventos de progreso.
+    """
+    def __init__(self, latitude: float, longitude: float, date_of_year: str, location_key: str):
+        self.job_id = uuid.uuid4().hex
+        self.latitude = latitude
+        self.longitude = longitude
+        self.date_of_year = date_of_year
+        self.location_key = location_key
+        self.status = JobStatus.PENDING
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.events: List[JobEvent] = []
+        self.task: Optional[asyncio.Task] = None
+
+        # Los eventos pueden llegar desde el hilo de entrenamiento
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def emit(self, stage: str, **data):
+        """Registrar un evento de progreso (seguro desde cualquier hilo)"""
+        with self._lock:
+            event = JobEvent(id=len(self.events) + 1, stage=stage, timestamp=datetime.now(), data=data)
+            self.events.append(event)
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._wake()
+        else:
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        # Despertar a todos los suscriptores y preparar el siguiente aviso
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_info(self) -> JobInfo:
+        return JobInfo(
+            job_id=self.job_id,
+            status=self.status,
+            location_key=self.location_key,
+            latitude=self.latitude,
+            longitude=self.longitude,
+            date_of_year=self.date_of_year,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            last_event=self.events[-1] if self.events else None,
+            events_count=len(self.events),
+            error=self.error,
+            links={
+                "self": f"/api/weather/jobs/{self.job_id}",
+                "events": f"/api/weather/jobs/{self.job_id}/events"
+            }
+        )
+
+class JobService:
+    """Gestiona los jobs de preparación de ubicaciones (uno activo por ubicación)"""
+
+    def __init__(self, max_finished_jobs: int = 200):
+        self.jobs: Dict[str, WeatherJob] = {}
+        self.active_by_location: Dict[str, str] = {}
+        self.max_finished_jobs = max_finished_jobs
+
+    def submit(self, latitude: float, longitude: float, date_of_year: Optional[str] = None) -> WeatherJob:
+        """
+        Crear un job para la ubicación, o devolver el que ya está en curso.
+        Varias peticiones simultáneas a la misma ubicación fría comparten un único job.
+        """
+        location_key = get_weather_service()._get_location_key(latitude, longitude)
+
+        active_id = self.active_by_location.get(location_key)
+        if active_id and active_id in self.jobs and not self.jobs[active_id].finished:
+            return self.jobs[active_id]
+
+        if date_of_year is None:
+            today = datetime.now()
+            date_of_year = f"{today.month:02d}-{today.day:02d}"
+
+        job = WeatherJob(latitude, longitude, date_of_year, location_key)
+        self.jobs[job.job_id] = job
+        self.active_by_location[location_key] = job.job_id
+        # Contexto vacío: el job sobrevive a la petición y no debe colgar sus
+        # tramos de la traza de esta (ni mantenerla viva)
+        job.task = contextvars.Context().run(asyncio.create_task, self._run(job))
+        self._trim_finished_jobs()
+        return job
+
+    def get(self, job_id: str) -> Optional[WeatherJob]:
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: WeatherJob):
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        job.emit("started", location_key=job.location_key)
+
+        try:
+            data = await get_weather_service()._get_all_historical_data(
+                job.latitude, job.longitude, job.date_of_year, progress=job.emit
+            )
+            if not data:
+                raise RuntimeError("Could not retrieve historical data from any source")
+            # Datos ya en cache pero sin modelos: el paso anterior no entrena
+            await get_weather_service().ensure_models(job.latitude, job.longitude, data, progress=job.emit)
+
+            job.status = JobStatus.COMPLETED
+            job.finished_at = datetime.now()
+            job.emit("completed", rows=len(data))
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = datetime.now()
+            job.emit("failed", error=str(e))
+        finally:
+            if self.active_by_location.get(job.location_key) == job.job_id:
+                del self.active_by_location[job.location_key]
+
+    def _trim_finished_jobs(self):
+        """Descartar los jobs terminados más antiguos para acotar memoria"""
+        finished = [job for job in self.jobs.values() if job.finished]
+        excess = len(finished) - self.max_finished_jobs
+        if excess > 0:
+            finished.sort(key=lambda job: job.finished_at)
+            for job in finished[:excess]:
+                del self.jobs[job.job_id]
+
+    async def stream_events(self, job: WeatherJob, last_event_id: int = 0) -> AsyncIterator[str]:
+        """
+        Generador de Server-Sent Events con el progreso del job.
+        Reenvía los eventos posteriores a ``last_event_id`` y termina al finalizar el job.
+        """
+        index = last_event_id
+        while True:
+            # Tomar el aviso ANTES de leer los eventos para no perder ninguno
+            changed = job._changed
+
+            while index < len(job.events):
+                event = job.events[index]
+                index += 1
+                payload = json.dumps(event.model_dump(mode="json"))
+                yield f"id: {event.id}\nevent: {event.stage}\ndata: {payload}\n\n"
+
+            if job.finished:
+                return
+
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+# Instancia del servicio
+job_service = JobService()
@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.job_service import job_service
+from app.services.weather_service import get_weather_service
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+class WarmupService:
+    """
+    Calentamiento en segundo plano de las ubicaciones populares al arrancar.
+
+    Cada ubicación se prepara con un job normal (``job_service``), así que una
+    petición a la misma ubicación fría comparte el trabajo en lugar de repetirlo.
+    De una en una: los modelos en memoria del proceso son compartidos y varios
+    ``ensure_models`` a la vez se pisarían. Primero las más baratas (ya en cache, solo modelos en disco, solo datos) y
+    dentro de cada grupo en el orden de ``POPULAR_LOCATIONS``. El servidor
+    atiende peticiones desde el primer momento; ``status()`` alimenta la
+    readiness de ``/health``.
+    """
+    def __init__(self):
+        self.state = "pending"
+        self.locations: List[Dict[str, Any]] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _plan(self, popular_locations: List[Dict]) -> List[Dict[str, Any]]:
+        service = get_weather_service()
+        model_index = service.real_data_service.model_index
+        global_models = service._use_global_models()
+
+        plan = []
+        for priority, location in enumerate(popular_locations):
+            location_key = service._get_location_key(location["latitude"], location["longitude"])
+            has_data = location_key in service.historical_data_cache
+            has_models = location_key in service.models_cache or location_key in model_index or global_models
+            # 0: nada que hacer, 1: descargar (modelos en disco), 2: entrenar, 3: descargar y entrenar
+            cost = (0 if has_models else 2) + (0 if has_data else 1)
+            plan.append({
+                "location_key": location_key,
+                "name": location["name"],
+                "latitude": location["latitude"],
+                "longitude": location["longitude"],
+                "cost": cost,
+                "priority": priority,
+                "status": "ready" if cost == 0 else "pending",
+                "job_id": None,
+                "duration_s": None,
+                "error": None,
+            })
+        plan.sort(key=lambda item: (item["cost"], item["priority"]))
+        return plan
+
+    def start(self):
+        if not settings.WARMUP_ENABLED:
+            self.state = "disabled"
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _warm(self, item: Dict[str, Any]):
+        started = time.perf_counter()
+        item["status"] = "warming"
+        job = job_service.submit(item["latitude"], item["longitude"])
+        item["job_id"] = job.job_id
+        await job.task
+        item["duration_s"] = round(time.perf_counter() - started, 3)
+        item["status"] = "failed" if job.error else "ready"
+        item["error"] = job.error
+        logger.info("Warm-up location done", extra={
+            "location_key": item["location_key"], "status": item["status"], "duration_s": item["duration_s"]
+        })
+
+    async def _run(self):
+        from app.api.locations import POPULAR_LOCATIONS
+
+        self.state = "running"
+        self.started_at = time.time()
+        self.locations = await asyncio.to_thread(self._plan, POPULAR_LOCATIONS)
+        pending = [item for item in self.locations if item["status"] == "pending"]
+        logger.info("Warm-up started", extra={"locations": len(self.locations), "pending": len(pending)})
+
+        # Una a la vez: el entrenamiento compite por CPU con las peticiones
+        for item in pending:
+            await self._warm(item)
+
+        self.finished_at = time.time()
+        failed = [item["location_key"] for item in self.locations if item["status"] == "failed"]
+        self.state = "degraded" if failed else "ready"
+        logger.info("Warm-up finished", extra={
+            "state": self.state, "failed": failed, "duration_s": round(self.finished_at - self.started_at, 3)
+        })
+
+    @property
+    def ready(self) -> bool:
+        """Listo para recibir tráfico: calentamiento terminado (o desactivado)"""
+        return self.state in ("ready", "degraded", "disabled")
+
+    def status(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for item in self.locations:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "total": len(self.locations),
+            "warm": counts.get("ready", 0),
+            "failed": counts.get("failed", 0),
+            "pending": counts.get("pending", 0) + counts.get("warming", 0),
+            "elapsed_s": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+            "locations": [
+                {key: item[key] for key in ("location_key", "name", "status", "job_id", "duration_s", "error")}
+                for item in self.locations
+            ],
+        }
+
+# Instancia del servicio
+warmup_service = WarmupService()
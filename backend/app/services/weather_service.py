@@ -1,24 +1,30 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from app.models.weather import (
     WeatherQuery, WeatherResponse, WeatherProbability, WeatherDataPoint, 
     WeatherCondition, CustomThresholds, FuturePrediction, TemperatureUnit,
     WeatherConditionType
 )
 from app.data.mock_weather_data import mock_data_generator
-from app.data.real_weather_data import real_weather_service, RealWeatherDataService
+from app.data.real_weather_data import GLOBAL_MODEL_KEY, MODEL_VERSION, real_weather_service, RealWeatherDataService
+from app.data.climatology import climatology_path, has_model_probabilities, load_npz
+from app.data.historical_store import create_historical_store
+from app.data.spatial_index import SpatialIndex
+from app.core.config import settings
+from app.config.weather_apis import MODEL_FULL_RETRAIN_DAYS, MODEL_RETRAIN_THRESHOLD
+from app.core.executor import run_cpu_bound
+from app.core.metrics import REGISTRY, CACHE_REQUESTS
+from app.core.tracing import annotate, span, stage
+from app.core.logging import get_logger
 # from app.data.giovanni_nasa_data import giovanni_weather_service  # DESACTIVADO - Solo NASA POWER
 import statistics
 import asyncio
-import logging
 from datetime import datetime, date, timedelta
 import numpy as np
-import pickle
 import json
+import pickle
 from pathlib import Path
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 class WeatherService:
     def __init__(self):
@@ -33,10 +39,22 @@ class WeatherService:
         
         # Cache para modelos entrenados (evita re-entrenar)
         self.models_cache = {}
-        
-        # Directorios para persistencia
+        # Ubicaciones servidas por el modelo global (MODEL_MODE="global") en este proceso
+        self.global_model_locations = set()
+        
+        # Ubicaciones listas (datos + modelos) para responder por la vecina más cercana
+        self.nearest_index = SpatialIndex()
+        # (temperatura media, precipitación media) del histórico completo por ubicación
+        self._climate_signatures: Dict[str, tuple] = {}
+        # Climatología por ubicación con las probabilidades del condition_classifier
+        # (None si aún no están calculadas) y ubicaciones ya puntuadas en este proceso
+        self.climatology_cache: Dict[str, Optional[Dict[str, np.ndarray]]] = {}
+        self._climatology_scored = set()
+        
+        # Directorios para persistencia (un archivo por ubicación, escrituras atómicas)
         self.cache_dir = Path("weather_cache")
         self.cache_dir.mkdir(exist_ok=True)
+        self.store = create_historical_store(self.cache_dir)
         
         # Cargar caches desde disco al inicializar
         self._load_cache_from_disk()
@@ -45,96 +63,311 @@ class WeatherService:
         """Cargar caches desde archivos en disco"""
         try:
             # Cargar cache de datos históricos
-            historical_cache_file = self.cache_dir / "historical_data_cache.pkl"
-            if historical_cache_file.exists():
-                with open(historical_cache_file, 'rb') as f:
-                    self.historical_data_cache = pickle.load(f)
-                print(f"📂 Loaded historical data cache: {len(self.historical_data_cache)} locations")
+            self.historical_data_cache = self.store.load_all()
+            logger.info("Loaded historical data cache", extra={"locations": len(self.historical_data_cache)})
             
             # Cargar cache de modelos entrenados
-            models_cache_file = self.cache_dir / "models_cache.pkl"
-            if models_cache_file.exists():
-                with open(models_cache_file, 'rb') as f:
-                    self.models_cache = pickle.load(f)
-                print(f"🧠 Loaded models cache: {len(self.models_cache)} trained locations")
+            # (marcas del almacén + índice de modelos en disco)
+            trained_keys = self.store.trained_keys() | set(self.real_data_service.model_index.keys())
+            self.models_cache = {location_key: True for location_key in trained_keys}
+            logger.info("Loaded models cache", extra={"trained_locations": len(self.models_cache)})
+            
+            for location_key in self.historical_data_cache.keys() & self.models_cache.keys():
+                entry = self.real_data_service.model_index.get(location_key) or {}
+                latitude, longitude = map(float, location_key.split("_"))
+                self.nearest_index.add(location_key, entry.get("latitude", latitude), entry.get("longitude", longitude))
                     
         except Exception as e:
-            print(f"⚠️ Error loading cache from disk: {e}")
+            logger.warning("Error loading cache from disk: %s", e)
             self.historical_data_cache = {}
             self.models_cache = {}
 
-    def _save_cache_to_disk(self):
-        """Guardar caches en archivos en disco"""
+    def _persist_location(self, location_key: str):
+        """
+        Guardar en disco SOLO la ubicación modificada (datos y marca de modelos).
+        Serializa y hace fsync: llamarlo con ``asyncio.to_thread`` desde el event loop.
+        """
         try:
-            # Guardar cache de datos históricos
-            historical_cache_file = self.cache_dir / "historical_data_cache.pkl"
-            with open(historical_cache_file, 'wb') as f:
-                pickle.dump(self.historical_data_cache, f)
-            
-            # Guardar cache de modelos entrenados
-            models_cache_file = self.cache_dir / "models_cache.pkl"
-            with open(models_cache_file, 'wb') as f:
-                pickle.dump(self.models_cache, f)
+            if location_key in self.historical_data_cache:
+                self.store.save(location_key, self.historical_data_cache[location_key])
+            if self.models_cache.get(location_key):
+                self.store.mark_trained(location_key)
                 
-            print(f"💾 Cache saved to disk: {len(self.historical_data_cache)} locations, {len(self.models_cache)} models")
+            logger.debug("Cache saved to disk", extra={"location_key": location_key})
                 
         except Exception as e:
-            print(f"⚠️ Error saving cache to disk: {e}")
+            logger.warning("Error saving cache to disk: %s", e)
     
     def _get_location_key(self, latitude: float, longitude: float) -> str:
         """Generar clave única para la ubicación (redondeada para cache eficiente)"""
         return f"{round(latitude, 3)}_{round(longitude, 3)}"
     
-    async def _get_all_historical_data(self, latitude: float, longitude: float, date_of_year: str) -> List[Dict[str, Any]]:
+    def is_location_warm(self, latitude: float, longitude: float) -> bool:
+        """Indica si la ubicación ya tiene datos y modelos en cache (respuesta rápida)"""
+        location_key = self._get_location_key(latitude, longitude)
+        return location_key in self.historical_data_cache and location_key in self.models_cache
+    
+    def _index_if_warm(self, latitude: float, longitude: float):
+        location_key = self._get_location_key(latitude, longitude)
+        if location_key in self.historical_data_cache and location_key in self.models_cache:
+            self.nearest_index.add(location_key, latitude, longitude)
+    
+    def _climate_signature(self, latitude: float, longitude: float) -> Optional[tuple]:
+        """Temperatura y precipitación medias del histórico completo (data_cache), si está descargado"""
+        location_key = self._get_location_key(latitude, longitude)
+        if location_key not in self._climate_signatures:
+            cache_path = self.real_data_service.data_cache_path(latitude, longitude, 50)
+            if not cache_path.exists():
+                return None
+            try:
+                with open(cache_path, 'rb') as f:
+                    rows = pickle.load(f)
+            except Exception as e:
+                logger.warning("Error loading cache: %s", e)
+                return None
+            if not rows:
+                return None
+            self._climate_signatures[location_key] = (
+                float(np.mean([row.get('temperature', 0) for row in rows])),
+                float(np.mean([row.get('precipitation', 0) for row in rows]))
+            )
+        return self._climate_signatures[location_key]
+    
+    def _location_climatology(self, location_key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Tabla de data_cache/climatology con probabilidades del modelo (se lee una vez por ubicación)"""
+        if location_key not in self.climatology_cache:
+            table = load_npz(climatology_path(self.real_data_service.data_cache_dir, location_key))
+            # Probabilidades de otra versión de los modelos: etiquetas con otros umbrales
+            current = has_model_probabilities(table) and int(table.get("condition_model_version", 0)) == MODEL_VERSION
+            self.climatology_cache[location_key] = table if current else None
+        return self.climatology_cache[location_key]
+    
+    async def _score_climatology(self, latitude: float, longitude: float, force: bool = False):
+        """
+        Calcular con el condition_classifier de la ubicación (o el global) las
+        probabilidades de los 366 días a partir de su histórico completo
+        (data_cache; el cache histórico solo tiene los registros del día
+        consultado) y guardarlas en la climatología. Una vez por ubicación y
+        proceso; ``force`` tras reentrenar.
+        """
+        location_key = self._get_location_key(latitude, longitude)
+        if not force and location_key in self._climatology_scored:
+            return
+        self._climatology_scored.add(location_key)
+        if not force and await asyncio.to_thread(self._location_climatology, location_key) is not None:
+            return
+        model_key = GLOBAL_MODEL_KEY if location_key in self.global_model_locations else location_key
+        with span("climatology_scoring"):
+            table = await asyncio.to_thread(
+                self.real_data_service.update_climatology, latitude, longitude, model_key=model_key
+            )
+        if table is not None:
+            self.climatology_cache[location_key] = table
+    
+    async def find_nearest_warm_location(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """
+        Ubicación lista más cercana (dentro de NEAREST_FALLBACK_RADIUS_KM) con la
+        que responder mientras se prepara la consultada. Si el histórico de la
+        consultada ya está descargado, se descartan vecinas de clima distinto.
+        """
+        if not settings.NEAREST_FALLBACK_ENABLED:
+            return None
+        location_key = self._get_location_key(latitude, longitude)
+        # La primera consulta tras añadir ubicaciones reconstruye el KD-tree: fuera del event loop
+        candidates = await asyncio.to_thread(
+            self.nearest_index.within, latitude, longitude, settings.NEAREST_FALLBACK_RADIUS_KM, location_key
+        )
+        query_climate = await asyncio.to_thread(self._climate_signature, latitude, longitude) if candidates else None
+        
+        for neighbour_key, distance_km in candidates:
+            neighbour_latitude, neighbour_longitude = self.nearest_index.get(neighbour_key)
+            if not self.is_location_warm(neighbour_latitude, neighbour_longitude):
+                continue
+            if query_climate is not None:
+                neighbour_climate = await asyncio.to_thread(self._climate_signature, neighbour_latitude, neighbour_longitude)
+                if neighbour_climate is not None and (
+                    abs(query_climate[0] - neighbour_climate[0]) > settings.NEAREST_FALLBACK_MAX_TEMP_DIFF
+                    or abs(query_climate[1] - neighbour_climate[1]) > settings.NEAREST_FALLBACK_MAX_PRECIP_DIFF
+                ):
+                    logger.debug("Nearest location rejected by climate", extra={"location_key": location_key, "neighbour": neighbour_key})
+                    continue
+            
+            CACHE_REQUESTS.labels(cache="nearest", result="hit").inc()
+            annotate(nearest_location=neighbour_key, nearest_distance_km=distance_km)
+            logger.info("Serving from nearest trained location", extra={"location_key": location_key, "neighbour": neighbour_key, "distance_km": distance_km})
+            return {
+                "location_key": neighbour_key,
+                "latitude": neighbour_latitude,
+                "longitude": neighbour_longitude,
+                "distance_km": distance_km
+            }
+        
+        CACHE_REQUESTS.labels(cache="nearest", result="miss").inc()
+        return None
+    
+    def _use_global_models(self) -> bool:
+        return settings.MODEL_MODE == "global" and self.real_data_service.has_global_models()
+    
+    async def ensure_models(self, latitude: float, longitude: float, historical_data: List[Dict[str, Any]],
+                            progress: Optional[Callable[..., None]] = None):
+        """
+        Cargar o entrenar (una sola vez) los modelos de la ubicación.
+        No hace nada si ya están en el cache de modelos.
+        """
+        location_key = self._get_location_key(latitude, longitude)
+        if location_key not in self.models_cache:
+            CACHE_REQUESTS.labels(cache="models", result="miss").inc()
+            annotate(models_cache="miss")
+            # Intentar cargar modelos existentes para esta ubicación (en un hilo: puede
+            # esperar al lock de modelos mientras otra ubicación entrena)
+            models_loaded = await asyncio.to_thread(self.real_data_service.load_trained_models, location_key)
+
+            if not models_loaded and self._use_global_models():
+                # Modo global: servir la ubicación sin entrenar (ni marcarla como entrenada en disco)
+                if self.real_data_service.loaded_location_key != GLOBAL_MODEL_KEY:
+                    await asyncio.to_thread(self.real_data_service.load_trained_models, GLOBAL_MODEL_KEY)
+                annotate(models_cache="global")
+                self.models_cache[location_key] = True
+                self.global_model_locations.add(location_key)
+                await self._score_climatology(latitude, longitude)
+                self._index_if_warm(latitude, longitude)
+                logger.info("Using global ML models", extra={"location_key": location_key})
+                if progress:
+                    progress("models_loaded", location_key=location_key, source="global")
+                return
+
+            if not models_loaded:
+                # Si no hay modelos, entrenar nuevos (en un hilo para no bloquear el event loop)
+                logger.info("Training ML models", extra={"location_key": location_key, "data_points": len(historical_data)})
+                with span("model_training", rows=len(historical_data)):
+                    await asyncio.to_thread(
+                        self.real_data_service.train_prediction_models,
+                        historical_data, latitude, longitude, progress
+                    )
+            else:
+                logger.info("Loaded existing ML models", extra={"location_key": location_key})
+                if progress:
+                    progress("models_loaded", location_key=location_key)
+            
+            await self._score_climatology(latitude, longitude, force=not models_loaded)
+
+            self.models_cache[location_key] = True
+            await asyncio.to_thread(self._persist_location, location_key)  # 💾 Persistir cache de modelos
+            self._index_if_warm(latitude, longitude)
+            logger.info("Models ready", extra={"location_key": location_key})
+        else:
+            CACHE_REQUESTS.labels(cache="models", result="hit").inc()
+            annotate(models_cache="hit")
+            logger.debug("Using cached models", extra={"location_key": location_key})
+    
+    async def append_historical_data(self, latitude: float, longitude: float,
+                                     rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Añadir registros al histórico de la ubicación (los de fechas ya
+        existentes se reemplazan) y aplicar la política de reentrenamiento.
+        """
+        location_key = self._get_location_key(latitude, longitude)
+        rows_added = await asyncio.to_thread(self.store.append, location_key, rows)
+        self.historical_data_cache[location_key] = await asyncio.to_thread(self.store.load, location_key)
+        logger.info("Historical data appended", extra={"location_key": location_key, "rows_added": rows_added})
+        
+        retraining = await self.apply_retrain_policy(latitude, longitude, rows)
+        return {
+            "location_key": location_key,
+            "rows_added": rows_added,
+            "total_rows": len(self.historical_data_cache[location_key]),
+            **retraining
+        }
+    
+    async def apply_retrain_policy(self, latitude: float, longitude: float,
+                                   new_rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Decide cómo reentrenar la ubicación según los registros añadidos desde
+        el último entrenamiento:
+
+        - ninguno si se han añadido menos de MODEL_RETRAIN_THRESHOLD registros
+          (se acumulan para la próxima vez);
+        - completo (GridSearch) si el último completo tiene más de MODEL_FULL_RETRAIN_DAYS;
+        - incremental (warm start) en otro caso.
+        """
+        location_key = self._get_location_key(latitude, longitude)
+        data = self.historical_data_cache.get(location_key) or []
+        manifest = self.real_data_service.load_model_manifest(location_key)
+        if manifest is None or not data:
+            return {"retraining": "none", "reason": "location has no trained models"}
+        
+        rows_since_training = len(data) - manifest.get("training_samples", len(data))
+        trained_at = datetime.fromisoformat(manifest["trained_at"]) if manifest.get("trained_at") else None
+        full_due = trained_at is None or datetime.now() - trained_at > timedelta(days=MODEL_FULL_RETRAIN_DAYS)
+        
+        if rows_since_training < MODEL_RETRAIN_THRESHOLD:
+            mode = "none"
+        elif full_due:
+            mode = "full"
+        else:
+            new_data = new_rows or data[-rows_since_training:]
+            with span("model_update", rows=len(data), new_rows=len(new_data)):
+                updated = await asyncio.to_thread(
+                    self.real_data_service.update_prediction_models, data, new_data, latitude, longitude
+                )
+            mode = "incremental" if updated else "full"
+        
+        if mode == "full":
+            with span("model_training", rows=len(data)):
+                await asyncio.to_thread(self.real_data_service.train_prediction_models, data, latitude, longitude)
+        
+        if mode != "none":
+            await self._score_climatology(latitude, longitude, force=True)
+            self.models_cache[location_key] = True
+            await asyncio.to_thread(self._persist_location, location_key)
+            self._index_if_warm(latitude, longitude)
+        logger.info("Retrain policy applied", extra={"location_key": location_key, "mode": mode, "rows_since_training": rows_since_training})
+        return {"retraining": mode, "rows_since_training": rows_since_training, "retrain_threshold": MODEL_RETRAIN_THRESHOLD}
+    
+    async def _get_all_historical_data(self, latitude: float, longitude: float, date_of_year: str,
+                                       progress: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
         """
         Obtener TODOS los datos históricos disponibles para una ubicación y cachearlos.
         Solo hace la consulta una vez por ubicación.
+        
+        Args:
+            progress: Callback opcional ``progress(stage, **data)`` para reportar
+                el avance de descarga y entrenamiento (usado por los jobs asíncronos)
         """
         location_key = self._get_location_key(latitude, longitude)
         
         # Si ya tenemos los datos en cache, devolverlos
         if location_key in self.historical_data_cache:
-            print(f"✅ Using cached data for {location_key}: {len(self.historical_data_cache[location_key])} records")
+            CACHE_REQUESTS.labels(cache="historical", result="hit").inc()
+            annotate(historical_cache="hit", rows=len(self.historical_data_cache[location_key]))
+            logger.debug("Using cached historical data", extra={"location_key": location_key, "records": len(self.historical_data_cache[location_key])})
             return self.historical_data_cache[location_key]
         
-        print(f"🔄 Fetching ALL available historical data for {latitude}, {longitude}...")
+        CACHE_REQUESTS.labels(cache="historical", result="miss").inc()
+        annotate(historical_cache="miss")
+        logger.info("Fetching all available historical data", extra={"latitude": latitude, "longitude": longitude})
         
         try:
             # Intentar obtener el máximo de datos disponibles (hasta 50 años)
-            print(f"Attempting NASA POWER data for {latitude}, {longitude} (MAX YEARS)...")
             historical_data = await self.real_data_service.get_historical_data(
-                latitude, longitude, date_of_year, years=50  # Solicitar máximo disponible
+                latitude, longitude, date_of_year, years=50,  # Solicitar máximo disponible
+                progress=progress
             )
             
             if historical_data and len(historical_data) >= 3:
-                print(f"✅ NASA POWER data retrieved: {len(historical_data)} records - CACHING FOR FUTURE USE")
+                logger.info("NASA POWER data retrieved", extra={"location_key": location_key, "records": len(historical_data)})
                 
                 # Guardar en cache de memoria y disco
                 self.historical_data_cache[location_key] = historical_data
-                self._save_cache_to_disk()  # 💾 Persistir en disco
+                await asyncio.to_thread(self._persist_location, location_key)  # 💾 Persistir en disco
                 
                 # Entrenar modelo UNA SOLA VEZ con todos los datos
-                if location_key not in self.models_cache:
-                    # Intentar cargar modelos existentes para esta ubicación
-                    models_loaded = self.real_data_service.load_trained_models(location_key)
-                    
-                    if not models_loaded:
-                        # Si no hay modelos, entrenar nuevos
-                        print(f"🧠 Training ML models with {len(historical_data)} data points...")
-                        self.real_data_service.train_prediction_models(historical_data, latitude, longitude)
-                    else:
-                        print(f"📂 Loaded existing ML models for {location_key}")
-                        
-                    self.models_cache[location_key] = True
-                    self._save_cache_to_disk()  # 💾 Persistir cache de modelos
-                    print(f"✅ Models ready for location {location_key}")
-                else:
-                    print(f"✅ Using cached models for location {location_key}")
+                await self.ensure_models(latitude, longitude, historical_data, progress)
                 
                 return historical_data
                 
         except Exception as e:
-            print(f"NASA POWER data failed: {e}")
+            logger.warning("NASA POWER data failed: %s", e)
         
         # Giovanni DESACTIVADO - Solo usar NASA POWER y datos sintéticos como fallback
         # try:
@@ -162,35 +395,42 @@ class WeatherService:
         #     print(f"Giovanni data failed (authentication required): {e}")
         
         # Si NASA POWER falla, usar datos sintéticos como fallback
-        print("🔄 Using synthetic data as fallback...")
+        logger.warning("Using synthetic data as fallback", extra={"location_key": location_key})
         synthetic_data = await self.get_synthetic_historical_data(latitude, longitude, date_of_year, 30)  # 30 años por defecto
         if synthetic_data and len(synthetic_data) >= 3:
-            print(f"✅ Synthetic data generated: {len(synthetic_data)} records")
+            logger.info("Synthetic data generated", extra={"location_key": location_key, "records": len(synthetic_data)})
             
             # Guardar en cache de memoria y disco
             self.historical_data_cache[location_key] = synthetic_data
-            self._save_cache_to_disk()  # 💾 Persistir en disco
+            await asyncio.to_thread(self._persist_location, location_key)  # 💾 Persistir en disco
             
             # Entrenar modelo UNA SOLA VEZ con datos sintéticos
             if location_key not in self.models_cache:
                 # Intentar cargar modelos existentes para esta ubicación
-                models_loaded = self.real_data_service.load_trained_models(location_key)
+                models_loaded = await asyncio.to_thread(self.real_data_service.load_trained_models, location_key)
                 
                 if not models_loaded:
                     # Si no hay modelos, entrenar con datos sintéticos
-                    print(f"🧠 Training ML models with {len(synthetic_data)} synthetic data points...")
-                    self.real_data_service.train_prediction_models(synthetic_data, latitude, longitude)
+                    logger.info("Training ML models on synthetic data", extra={"location_key": location_key, "data_points": len(synthetic_data)})
+                    await asyncio.to_thread(
+                        self.real_data_service.train_prediction_models,
+                        synthetic_data, latitude, longitude, progress
+                    )
                 else:
-                    print(f"📂 Loaded existing ML models for {location_key}")
-                    
+                    logger.info("Loaded existing ML models", extra={"location_key": location_key})
+                    if progress:
+                        progress("models_loaded", location_key=location_key)
+                
+                await self._score_climatology(latitude, longitude, force=not models_loaded)
                 self.models_cache[location_key] = True
-                self._save_cache_to_disk()  # 💾 Persistir cache de modelos
-                print(f"✅ Models ready for location {location_key}")
+                await asyncio.to_thread(self._persist_location, location_key)  # 💾 Persistir cache de modelos
+                logger.info("Models ready", extra={"location_key": location_key})
+            self._index_if_warm(latitude, longitude)
             
             return synthetic_data
         
         # Si todo falla, retornar lista vacía
-        print("❌ Could not retrieve historical data from any source")
+        logger.error("Could not retrieve historical data from any source", extra={"location_key": location_key})
         return []
     
     async def get_weather_data(self, latitude: float, longitude: float, date_of_year: str, years_range: int = 30) -> Dict[str, Any]:
@@ -201,35 +441,55 @@ class WeatherService:
         location_key = self._get_location_key(latitude, longitude)
         
         # Obtener TODOS los datos históricos (usa cache si están disponibles)
-        all_historical_data = await self._get_all_historical_data(latitude, longitude, date_of_year)
+        with stage("historical_data_load"):
+            all_historical_data = await self._get_all_historical_data(latitude, longitude, date_of_year)
         
         if not all_historical_data or len(all_historical_data) < 3:
-            print("Using synthetic data as fallback...")
+            logger.warning("Using synthetic data as fallback", extra={"location_key": location_key})
             return await self._get_synthetic_weather_data(latitude, longitude, date_of_year)
         
+        # Ubicaciones con modelos desde el arranque (no pasan por ensure_models):
+        # probabilidades del condition_classifier en la primera petición
+        if location_key in self.models_cache and location_key not in self._climatology_scored:
+            await self._score_climatology(latitude, longitude)
+        
+        # Filtrado y percentiles son CPU puro: se ejecutan en el pool de CPU
+        return await run_cpu_bound(
+            self._build_weather_data,
+            location_key, latitude, longitude, date_of_year, years_range, all_historical_data
+        )
+    
+    def _build_weather_data(self, location_key: str, latitude: float, longitude: float, date_of_year: str,
+                            years_range: int, all_historical_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Filtrar por years_range y calcular probabilidades (síncrono, se ejecuta fuera del event loop)"""
         # Filtrar datos según el years_range solicitado
         current_year = datetime.now().year
         start_year = current_year - years_range
         
-        filtered_data = [
-            data_point for data_point in all_historical_data
-            if isinstance(data_point.get('date'), str) and int(data_point['date'].split('-')[0]) >= start_year
-            or isinstance(data_point.get('date'), datetime) and data_point['date'].year >= start_year
-        ]
+        with stage("date_filter", rows_scanned=len(all_historical_data)) as current:
+            filtered_data = [
+                data_point for data_point in all_historical_data
+                if isinstance(data_point.get('date'), str) and int(data_point['date'].split('-')[0]) >= start_year
+                or isinstance(data_point.get('date'), datetime) and data_point['date'].year >= start_year
+            ]
+            if current is not None:
+                current.attributes["rows_matched"] = len(filtered_data)
         
         # Si después del filtrado no hay suficientes datos, usar más años
         if len(filtered_data) < 3:
-            print(f"⚠️ Only {len(filtered_data)} records for {years_range} years, using all available {len(all_historical_data)} records")
+            logger.info("Not enough records for years_range, using all available", extra={"location_key": location_key, "records": len(filtered_data), "years_range": years_range, "available": len(all_historical_data), "sampled": True})
             filtered_data = all_historical_data
         
-        print(f"📊 Using {len(filtered_data)} records out of {len(all_historical_data)} total (requested: {years_range} years)")
+        logger.info("Filtered historical records", extra={"location_key": location_key, "records": len(filtered_data), "available": len(all_historical_data), "years_range": years_range, "sampled": True})
         
         # Obtener predicciones usando el modelo ya entrenado (no re-entrenar)
         try:
             if location_key in self.models_cache:
-                probabilities = self.real_data_service.predict_probabilities(
-                    latitude, longitude, date_of_year, filtered_data
-                )
+                with stage("probabilities"):
+                    probabilities = self.real_data_service.predict_probabilities(
+                        latitude, longitude, date_of_year, filtered_data,
+                        climatology=self._location_climatology(location_key)
+                    )
             else:
                 # Fallback si no hay modelo entrenado
                 probabilities = {}
@@ -259,11 +519,17 @@ class WeatherService:
             location_key = self._get_location_key(latitude, longitude)
             self.historical_data_cache.pop(location_key, None)
             self.models_cache.pop(location_key, None)
-            print(f"🗑️ Cache cleared for location {location_key}")
+            self.climatology_cache.pop(location_key, None)
+            self._climatology_scored.discard(location_key)
+            self.nearest_index.discard(location_key)
+            logger.info("Cache cleared", extra={"location_key": location_key})
         else:
             self.historical_data_cache.clear()
             self.models_cache.clear()
-            print("🗑️ All cache cleared")
+            self.climatology_cache.clear()
+            self._climatology_scored.clear()
+            self.nearest_index.clear()
+            logger.info("All cache cleared")
     
     def get_cache_info(self) -> Dict[str, Any]:
         """Obtener información sobre el estado del cache"""
@@ -271,11 +537,21 @@ class WeatherService:
             "cached_locations": list(self.historical_data_cache.keys()),
             "total_cached_locations": len(self.historical_data_cache),
             "total_data_points": sum(len(data) for data in self.historical_data_cache.values()),
-            "trained_models": list(self.models_cache.keys())
+            "trained_models": list(self.models_cache.keys()),
+            "model_mode": settings.MODEL_MODE,
+            "global_model_locations": sorted(self.global_model_locations),
+            "nearest_index_locations": len(self.nearest_index)
         }
     
-    async def get_weather_probabilities(self, query: WeatherQuery) -> WeatherResponse:
-        """Método principal para obtener probabilidades meteorológicas personalizadas"""
+    async def get_weather_probabilities(self, query: WeatherQuery,
+                                        served_from: Optional[Dict[str, Any]] = None) -> WeatherResponse:
+        """
+        Método principal para obtener probabilidades meteorológicas personalizadas
+
+        Args:
+            served_from: Ubicación vecina ya preparada (``find_nearest_warm_location``)
+                cuyos datos se usan en lugar de los de la consultada
+        """
         
         # Si no se especifica date_of_year, usar la fecha actual
         date_of_year = query.date_of_year
@@ -284,11 +560,37 @@ class WeatherService:
             today = datetime.now()
             date_of_year = f"{today.month:02d}-{today.day:02d}"
         
+        # Con una vecina, sus coordenadas para todo: datos, modelos y predicciones futuras
+        if served_from:
+            latitude, longitude = served_from["latitude"], served_from["longitude"]
+        else:
+            latitude, longitude = query.latitude, query.longitude
+        
         # Obtener datos meteorológicos base con el rango de años especificado
-        weather_data = await self.get_weather_data(
-            query.latitude, query.longitude, date_of_year, query.years_range or 30
-        )
+        weather_data = await self.get_weather_data(latitude, longitude, date_of_year, query.years_range or 30)
+        if served_from:
+            weather_data["data_source"] += f" - nearest trained location ({served_from['distance_km']} km)"
+            weather_data["served_from"] = served_from
+        
+        # Generar predicciones futuras si se solicitan
+        future_predictions = None
+        if query.include_future_predictions:
+            with stage("future_predictions"):
+                future_predictions = await self._generate_future_predictions(
+                    latitude, 
+                    longitude,
+                    query.selected_conditions,
+                    query.future_days,
+                    query.temperature_unit
+                )
         
+        # Conversión de unidades y construcción de modelos pydantic en el pool de CPU
+        with stage("response_build"):
+            return await run_cpu_bound(self._build_weather_response, query, weather_data, future_predictions)
+    
+    def _build_weather_response(self, query: WeatherQuery, weather_data: Dict[str, Any],
+                                future_predictions: Optional[List[FuturePrediction]]) -> WeatherResponse:
+        """Construir la respuesta final (síncrono, se ejecuta fuera del event loop)"""
         # Aplicar umbrales personalizados si se proporcionan
         if query.custom_thresholds:
             weather_data["probabilities"] = self._apply_custom_thresholds(
@@ -329,7 +631,9 @@ class WeatherService:
                 threshold=threshold,
                 unit=unit,
                 description=self._get_condition_description(condition, threshold, unit),
-                is_enabled=True
+                is_enabled=True,
+                empirical_probability=data.get("empirical_probability"),
+                model_probability=data.get("model_probability")
             ))
         
         # Convertir datos históricos con unidades apropiadas
@@ -345,17 +649,6 @@ class WeatherService:
                 heat_index=converted_point.get("heat_index", converted_point["temperature"])
             ))
         
-        # Generar predicciones futuras si se solicitan
-        future_predictions = None
-        if query.include_future_predictions:
-            future_predictions = await self._generate_future_predictions(
-                query.latitude, 
-                query.longitude,
-                query.selected_conditions,
-                query.future_days,
-                query.temperature_unit
-            )
-        
         # Preparar preferencias del usuario para la respuesta
         user_preferences = {
             "selected_conditions": [condition.value for condition in query.selected_conditions],
@@ -377,7 +670,8 @@ class WeatherService:
             future_predictions=future_predictions,
             temperature_unit=query.temperature_unit,
             query_date=date.today(),
-            user_preferences=user_preferences
+            user_preferences=user_preferences,
+            served_from=weather_data.get("served_from")
         )
     
     def _calculate_current_conditions(self, latest_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -407,7 +701,7 @@ class WeatherService:
     
     async def _get_synthetic_weather_data(self, latitude: float, longitude: float, date_of_year: str) -> Dict[str, Any]:
         """Generar datos sintéticos como último recurso"""
-        print("⚠️ Using synthetic weather data - no real data available")
+        logger.warning("Using synthetic weather data - no real data available", extra={"sampled": True})
         
         # Usar el generador de datos mock existente
         historical_data = await self.data_generator.get_historical_data(
@@ -525,15 +819,25 @@ class WeatherService:
                                          future_days: int = 14,
                                          temperature_unit: TemperatureUnit = TemperatureUnit.CELSIUS) -> List[FuturePrediction]:
         """Generar predicciones para los próximos días"""
+        return await run_cpu_bound(
+            self._build_future_predictions,
+            latitude, longitude, selected_conditions, future_days, temperature_unit
+        )
+    
+    def _build_future_predictions(self, latitude: float, longitude: float,
+                                  selected_conditions: List[WeatherConditionType],
+                                  future_days: int = 14,
+                                  temperature_unit: TemperatureUnit = TemperatureUnit.CELSIUS) -> List[FuturePrediction]:
+        """Calcular las predicciones futuras (síncrono, se ejecuta fuera del event loop)"""
         future_predictions = []
         today = date.today()
         
         # Obtener datos históricos una sola vez (usando cache)
-        location_key = f"{latitude:.3f}_{longitude:.3f}"
+        location_key = self._get_location_key(latitude, longitude)
         if location_key in self.historical_data_cache:
             historical_data = self.historical_data_cache[location_key]
         else:
-            print("⚠️ No historical data available for predictions, using basic estimates")
+            logger.warning("No historical data available for predictions, using basic estimates", extra={"sampled": True})
             historical_data = []
         
         for day_offset in range(1, future_days + 1):
@@ -602,7 +906,7 @@ class WeatherService:
                 ))
                 
             except Exception as e:
-                print(f"Error generating prediction for {prediction_date}: {e}")
+                logger.warning("Error generating prediction for %s: %s", prediction_date, e)
                 # Agregar predicción con baja confianza en caso de error
                 basic_probabilities = []
                 for condition in selected_conditions:
@@ -683,5 +987,33 @@ class WeatherService:
         }
         return units.get(condition, '°C')
 
-# Instancia del servicio
-weather_service = WeatherService()
\ No newline at end of file
+# Instancia del servicio (se construye en el lifespan de la app o en el primer uso)
+_weather_service = None
+
+def get_weather_service() -> WeatherService:
+    global _weather_service
+    if _weather_service is None:
+        _weather_service = WeatherService()
+    return _weather_service
+
+def _cache_sizes():
+    # Sin servicio construido todavía no hay nada que reportar
+    if _weather_service is None:
+        return {}
+    return {
+        ("historical",): len(_weather_service.historical_data_cache),
+        ("models",): len(_weather_service.models_cache)
+    }
+
+REGISTRY.gauge(
+    "weather_cache_locations",
+    "Ubicaciones en los caches en memoria del servicio",
+    ["cache"],
+    callback=_cache_sizes
+)
+
+def __getattr__(name):
+    # Compatibilidad: ``from app.services.weather_service import weather_service``
+    if name == "weather_service":
+        return get_weather_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los backends de clasificadores (CLASSIFIER_BACKEND)
+
+Con los históricos incluidos en data_cache/*.pkl entrena los dos clasificadores
+(precipitation_classifier y condition_classifier) con GradientBoostingClassifier
+exacto y con HistGradientBoostingClassifier (parada temprana), con las mismas
+features, etiquetas y partición estratificada 80/20 que el servicio, y compara
+tiempo de entrenamiento, tiempo de predicción, tamaño del pickle y precisión.
+
+Se usa una configuración fija de cada backend (sin GridSearch, que multiplica
+los tiempos por combinaciones x folds en ambos casos por igual).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_classifiers [--repeat 3] [--output benchmarks/results/classifiers.json]
+"""
+
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.bench_suite import load_bundled_histories
+from app.config.weather_apis import HGB_MAX_ITER, HGB_N_ITER_NO_CHANGE, HGB_VALIDATION_FRACTION
+
+CLASSIFIERS = ["precipitation_classifier", "condition_classifier"]
+
+def build_backends():
+    """Configuración de cada backend (GradientBoosting: la del centro de su rejilla)"""
+    from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+
+    return {
+        "gradient_boosting": lambda: GradientBoostingClassifier(
+            n_estimators=100, max_depth=5, learning_rate=0.1, subsample=0.9, random_state=42
+        ),
+        "hist_gradient_boosting": lambda: HistGradientBoostingClassifier(
+            max_iter=HGB_MAX_ITER, learning_rate=0.1, max_leaf_nodes=31, early_stopping=True,
+            validation_fraction=HGB_VALIDATION_FRACTION, n_iter_no_change=HGB_N_ITER_NO_CHANGE,
+            random_state=42
+        ),
+    }
+
+def artifact_bytes(model) -> int:
+    """Tamaño del pickle tal como lo guarda save_trained_models (joblib sin compresión)"""
+    import joblib
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+def bench_classifier(factory, X_train, X_test, y_train, y_test, repeat):
+    from sklearn.metrics import accuracy_score, f1_score
+
+    fit_samples = []
+    for _ in range(repeat):
+        model = factory()
+        started = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_samples.append(time.perf_counter() - started)
+
+    # Consulta típica del servicio: los 366 días del año de una ubicación
+    batch = X_test[:366]
+    predict_samples = []
+    for _ in range(max(5, repeat)):
+        started = time.perf_counter()
+        model.predict_proba(batch)
+        predict_samples.append((time.perf_counter() - started) * 1000)
+
+    y_pred = model.predict(X_test)
+    return {
+        "fit_s": round(statistics.median(fit_samples), 3),
+        "predict_366_ms": round(statistics.median(predict_samples), 3),
+        "artifact_kb": round(artifact_bytes(model) / 1024, 1),
+        "accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "f1_weighted": round(float(f1_score(y_test, y_pred, average="weighted", zero_division=0)), 4),
+        "iterations": int(getattr(model, "n_iter_", None) or model.n_estimators_),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from app.data.real_weather_data import RealWeatherDataService
+
+    histories = load_bundled_histories()
+    if not histories:
+        print("No bundled histories found in data_cache/")
+        return 1
+
+    service = RealWeatherDataService()
+    backends = build_backends()
+    report = {"timestamp": datetime.now().isoformat(), "locations": {}}
+    for location_key, (latitude, longitude, rows) in histories.items():
+        X = StandardScaler().fit_transform(service.prepare_features(rows, latitude, longitude))
+        targets = service._model_targets(rows)
+        location = report["locations"][location_key] = {"rows": len(rows)}
+        for name in CLASSIFIERS:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, targets[name], test_size=0.2, random_state=42, stratify=targets[name]
+            )
+            location[name] = {
+                backend: bench_classifier(factory, X_train, X_test, y_train, y_test, args.repeat)
+                for backend, factory in backends.items()
+            }
+            print(f"{location_key} {name}: " + ", ".join(
+                f"{backend} fit {result['fit_s']}s / {result['artifact_kb']} KB / acc {result['accuracy']}"
+                for backend, result in location[name].items()
+            ), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la compactación de modelos (app/data/model_compaction.py)
+
+Con los históricos incluidos en data_cache/*.pkl entrena los tres bosques de
+regresión (configuración del extremo alto de su rejilla) y el clasificador de
+precipitación, los compacta con el presupuesto MODEL_SIZE_BUDGET_KB y compara
+tamaño del pickle, tiempo de carga y R² / precisión en test antes y después.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_compaction [--budget-kb 2048] [--output benchmarks/results/compaction.json]
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.bench_suite import load_bundled_histories
+from app.config.weather_apis import COMPACTION_MAX_SCORE_DROP, COMPACTION_MIN_DEPTH, COMPACTION_MIN_TREES
+from app.core.config import settings
+
+FORESTS = ["temperature_predictor", "wind_predictor", "humidity_predictor"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-kb", type=int, default=settings.MODEL_SIZE_BUDGET_KB)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from app.data.model_compaction import artifact_stats, compact_forest, truncate_boosting
+    from app.data.real_weather_data import RealWeatherDataService
+
+    histories = load_bundled_histories()
+    if not histories:
+        print("No bundled histories found in data_cache/")
+        return 1
+
+    service = RealWeatherDataService()
+    report = {"timestamp": datetime.now().isoformat(), "budget_kb": args.budget_kb, "locations": {}}
+    for location_key, (latitude, longitude, rows) in histories.items():
+        X = StandardScaler().fit_transform(service.prepare_features(rows, latitude, longitude))
+        targets = service._model_targets(rows)
+        location = report["locations"][location_key] = {"rows": len(rows)}
+
+        y = targets["precipitation_classifier"]
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        classifier = GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=42).fit(X_train, y_train)
+        before = artifact_stats(classifier)
+        result = truncate_boosting(classifier, X_test, y_test, COMPACTION_MAX_SCORE_DROP)
+        after = artifact_stats(classifier)
+        location["precipitation_classifier"] = {**result, "kb_before": round(before["bytes"] / 1024, 1),
+                                                "kb_after": round(after["bytes"] / 1024, 1),
+                                                "load_ms_before": before["load_ms"], "load_ms_after": after["load_ms"]}
+
+        forest_budget = max(args.budget_kb * 1024 - after["bytes"], 0) // len(FORESTS)
+        for name in FORESTS:
+            X_train, X_test, y_train, y_test = train_test_split(X, targets[name], test_size=0.2, random_state=42)
+            forest = RandomForestRegressor(n_estimators=150, max_depth=15, random_state=42).fit(X_train, y_train)
+            before = artifact_stats(forest)
+            compact, result = compact_forest(forest, X_test, y_test, forest_budget, COMPACTION_MAX_SCORE_DROP,
+                                             COMPACTION_MIN_TREES, COMPACTION_MIN_DEPTH)
+            after = artifact_stats(compact)
+            location[name] = {**result, "kb_before": round(before["bytes"] / 1024, 1),
+                              "kb_after": round(after["bytes"] / 1024, 1),
+                              "load_ms_before": before["load_ms"], "load_ms_after": after["load_ms"]}
+
+        for name, result in location.items():
+            if name != "rows":
+                print(f"{location_key} {name}: {result['kb_before']} -> {result['kb_after']} KB, "
+                      f"load {result['load_ms_before']} -> {result['load_ms_after']} ms, "
+                      f"score delta {result['score_delta']}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los backends del cache histórico (archivo por ubicación vs SQLite)
+
+Usa los históricos incluidos en data_cache/*.pkl y mide guardado, carga,
+append, consultas por rango de fechas y por día del año en ambos backends.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_historical_store [--repeat 5] [--output resultados.json]
+"""
+
+import argparse
+import json
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.data.historical_store import FileHistoricalStore, row_date
+from app.data.sqlite_store import SQLiteHistoricalStore
+
+DATA_CACHE_DIR = Path(__file__).resolve().parent.parent / "data_cache"
+
+def load_bundled_histories():
+    """Históricos completos incluidos en el repositorio, indexados por location_key"""
+    histories = {}
+    for cache_file in sorted(DATA_CACHE_DIR.glob("weather_data_*.pkl")):
+        _, _, lat, lon, *_ = cache_file.stem.split("_")
+        with open(cache_file, 'rb') as f:
+            histories[f"{round(float(lat), 3)}_{round(float(lon), 3)}"] = pickle.load(f)
+    return histories
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+def bench_store(store, histories, repeat):
+    location_key, rows = next(iter(histories.items()))
+    last_day = max(row_date(row) for row in rows)
+    head, tail = rows[:-365], rows[-365:]
+    range_start = last_day - timedelta(days=365 * 5)
+
+    results = {
+        "save": timed(lambda: [store.save(key, data) for key, data in histories.items()], repeat),
+        "load": timed(lambda: store.load(location_key), repeat),
+        "load_all": timed(store.load_all, repeat),
+        "query_range_5y": timed(lambda: store.query_range(location_key, range_start, last_day), repeat),
+        "query_day_of_year": timed(lambda: store.query_day_of_year(location_key, 7, 15), repeat),
+    }
+    store.save(location_key, head)
+    results["append_1y"] = timed(lambda: store.append(location_key, tail), 1)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    histories = load_bundled_histories()
+    if not histories:
+        print(f"No bundled histories found in {DATA_CACHE_DIR}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stores = {
+            "file": FileHistoricalStore(Path(tmp_dir) / "file_store"),
+            "sqlite": SQLiteHistoricalStore(Path(tmp_dir) / "weather_app.db"),
+        }
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "locations": len(histories),
+            "rows": sum(len(rows) for rows in histories.values()),
+            "backends": {name: bench_store(store, histories, args.repeat) for name, store in stores.items()},
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks offline del camino de cálculo de probabilidades
+
+Usa los históricos incluidos en data_cache/*.pkl y un generador sintético
+determinista (sin red) y mide: carga del cache, filter_by_date_of_year,
+predict_probabilities, _generate_future_predictions, get_weather_probabilities
+completo, serialización JSON de la respuesta, train_prediction_models y las
+consultas del gazetteer (100k lugares sintéticos).
+
+Todo se ejecuta en un directorio temporal: no toca weather_cache/ ni models/.
+
+La suite completa se repite ``--rounds`` veces (intercaladas, para repartir el
+ruido de la máquina) y cada benchmark guarda la mediana de las medianas de
+cada ronda y su dispersión relativa (``spread``). Al comparar, un benchmark
+ruidoso tolera más: su umbral es el mayor entre ``--threshold`` y
+NOISE_FACTOR veces su dispersión (la del baseline o la actual).
+
+``--only`` acepta nombres exactos o prefijos terminados en punto
+(``filter_by_date_of_year.`` son todos los de ese grupo).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_suite --output benchmarks/results/suite_baseline.json
+    python -m benchmarks.bench_suite --compare benchmarks/results/suite_baseline.json [--threshold 0.25]
+    python -m benchmarks.bench_suite --only filter_by_date_of_year. --only predict_probabilities
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_CACHE_DIR = BACKEND_DIR / "data_cache"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.data.synthetic import synthetic_gazetteer, synthetic_history
+
+# Día del año usado en todas las consultas (el cache histórico guarda ese día)
+DATE_OF_YEAR = "07-15"
+
+# Umbral de regresión de un benchmark: al menos NOISE_FACTOR veces su dispersión entre rondas
+NOISE_FACTOR = 2.0
+
+def load_bundled_histories():
+    """Históricos completos incluidos en el repositorio: {location_key: (lat, lon, rows)}"""
+    histories = {}
+    for cache_file in sorted(DATA_CACHE_DIR.glob("weather_data_*.pkl")):
+        _, _, lat, lon, *_ = cache_file.stem.split("_")
+        with open(cache_file, 'rb') as f:
+            histories[f"{round(float(lat), 3)}_{round(float(lon), 3)}"] = (float(lat), float(lon), pickle.load(f))
+    return histories
+
+def timed(func, repeat: int, warmup: int = 1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "runs": repeat,
+    }
+
+def aggregate(rounds):
+    """Resultado de un benchmark a partir de los ``timed`` de cada ronda"""
+    medians = [result["median_ms"] for result in rounds]
+    median = statistics.median(medians)
+    return {
+        "median_ms": round(median, 3),
+        "p95_ms": max(result["p95_ms"] for result in rounds),
+        "min_ms": min(result["min_ms"] for result in rounds),
+        "runs": sum(result["runs"] for result in rounds),
+        "round_medians_ms": medians,
+        "spread": round((max(medians) - min(medians)) / median, 3) if median else 0.0,
+    }
+
+def selected(name: str, patterns) -> bool:
+    """``--only``: nombre exacto o prefijo terminado en punto"""
+    return not patterns or any(
+        name == pattern or (pattern.endswith(".") and name.startswith(pattern)) for pattern in patterns
+    )
+
+def build_benchmarks(repeat: int, train_repeat: int):
+    """Lista de (nombre, función, repeticiones, warmup). Importa la app ya dentro del directorio temporal"""
+    from fastapi.encoders import jsonable_encoder
+    from app.data.historical_store import FileHistoricalStore
+    from app.models.weather import WeatherQuery, TemperatureUnit
+    from app.services.weather_service import WeatherService
+
+    histories = load_bundled_histories()
+    synthetic = synthetic_history(40.0, 50)
+    histories["40.0_-3.7"] = (40.0, -3.7, synthetic)
+
+    service = WeatherService()
+    rws = service.real_data_service
+    loop = asyncio.new_event_loop()
+
+    # Cache en memoria como tras una primera petición: filas del día consultado
+    filtered = {}
+    for key, (lat, lon, rows) in histories.items():
+        filtered[key] = rws.filter_by_date_of_year(rows, DATE_OF_YEAR)
+        service.historical_data_cache[key] = filtered[key]
+        service.models_cache[key] = True
+
+    store = FileHistoricalStore(Path("bench_store"))
+    for key, rows in filtered.items():
+        store.save(key, rows)
+
+    hot_key = next(iter(histories))
+    hot_lat, hot_lon, hot_rows = histories[hot_key]
+    query = WeatherQuery(latitude=hot_lat, longitude=hot_lon, date_of_year=DATE_OF_YEAR, future_days=14)
+    query_60d_f = WeatherQuery(latitude=hot_lat, longitude=hot_lon, date_of_year=DATE_OF_YEAR,
+                               future_days=60, temperature_unit=TemperatureUnit.FAHRENHEIT)
+    response = loop.run_until_complete(service.get_weather_probabilities(query))
+
+    gazetteer_started = time.perf_counter()
+    gazetteer = synthetic_gazetteer(100_000)
+    gazetteer_build_ms = (time.perf_counter() - gazetteer_started) * 1000
+    print(f"gazetteer: {len(gazetteer)} places built in {gazetteer_build_ms:.0f} ms", file=sys.stderr)
+    
+    def load_bundled_pickles():
+        for cache_file in DATA_CACHE_DIR.glob("weather_data_*.pkl"):
+            with open(cache_file, 'rb') as f:
+                pickle.load(f)
+
+    benchmarks = [
+        ("cache_load.bundled_pickles", load_bundled_pickles, repeat, 1),
+        ("cache_load.store_load_all", store.load_all, repeat, 1),
+        ("filter_by_date_of_year.bundled", lambda: rws.filter_by_date_of_year(hot_rows, DATE_OF_YEAR), repeat, 1),
+        ("filter_by_date_of_year.synthetic_50y", lambda: rws.filter_by_date_of_year(synthetic, DATE_OF_YEAR), repeat, 1),
+        ("predict_probabilities", lambda: rws.predict_probabilities(hot_lat, hot_lon, DATE_OF_YEAR, filtered[hot_key]), repeat, 1),
+        ("future_predictions.14d", lambda: loop.run_until_complete(
+            service._generate_future_predictions(hot_lat, hot_lon, query.selected_conditions, 14)), repeat, 1),
+        ("future_predictions.60d", lambda: loop.run_until_complete(
+            service._generate_future_predictions(hot_lat, hot_lon, query.selected_conditions, 60)), repeat, 1),
+        ("get_weather_probabilities.14d", lambda: loop.run_until_complete(service.get_weather_probabilities(query)), repeat, 1),
+        ("get_weather_probabilities.60d_fahrenheit", lambda: loop.run_until_complete(
+            service.get_weather_probabilities(query_60d_f)), repeat, 1),
+        ("serialization.model_dump_json", response.model_dump_json, repeat, 1),
+        ("gazetteer_100k.nearby_50km", lambda: gazetteer.nearby(40.4, -3.7, 50.0, limit=50), repeat, 1),
+        ("gazetteer_100k.nearby_500km", lambda: gazetteer.nearby(40.4, -3.7, 500.0, limit=50), repeat, 1),
+        ("gazetteer_100k.nearest_10", lambda: gazetteer.nearest(40.4, -3.7, k=10), repeat, 1),
+        ("gazetteer_100k.search_prefix", lambda: gazetteer.search("santa", limit=20), repeat, 1),
+        ("gazetteer_100k.search_substring", lambda: gazetteer.search("berca", limit=20), repeat, 1),
+        ("gazetteer_100k.search_short", lambda: gazetteer.search("ma", limit=20), repeat, 1),
+        ("gazetteer_100k.search_country", lambda: gazetteer.search("país 17", limit=20), repeat, 1),
+        ("serialization.jsonable_encoder_dumps", lambda: json.dumps(jsonable_encoder(response)), repeat, 1),
+        ("train_prediction_models.bundled_day", lambda: rws.train_prediction_models(
+            filtered[hot_key], hot_lat, hot_lon), train_repeat, 0),
+        ("train_prediction_models.synthetic_day_50y", lambda: rws.train_prediction_models(
+            filtered["40.0_-3.7"], 40.0, -3.7), train_repeat, 0),
+    ]
+    return benchmarks, loop
+
+def compare(report, baseline, threshold: float):
+    """
+    Comparar medianas contra un resultado previo; marca regresión si crece más
+    de ``threshold`` o, si el benchmark es ruidoso, de NOISE_FACTOR veces su dispersión
+    """
+    comparison, regressions = {}, []
+    for name, current in report["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        allowed = max(threshold, NOISE_FACTOR * max(previous.get("spread", 0.0), current.get("spread", 0.0)))
+        ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else None
+        regressed = ratio is not None and ratio > 1 + allowed
+        comparison[name] = {
+            "baseline_ms": previous["median_ms"],
+            "current_ms": current["median_ms"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "threshold": round(allowed, 3),
+            "regression": regressed,
+        }
+        if regressed:
+            regressions.append(name)
+    return comparison, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--train-repeat", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3, help="Repeticiones de la suite completa (se guarda la mediana)")
+    parser.add_argument("--only", action="append", default=[],
+                        help="Ejecutar solo este benchmark (nombre exacto) o grupo (prefijo terminado en punto)")
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="Resultado previo (baseline) para comparar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Aumento relativo de la mediana considerado regresión")
+    args = parser.parse_args()
+
+    output = args.output.resolve() if args.output else None
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    # Sin ruido de logs en las mediciones (el entrenamiento registra cada modelo)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_QUEUE", "false")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        from app.core.logging import configure_logging
+        from app.core.executor import shutdown_executors
+        configure_logging()
+
+        benchmarks, loop = build_benchmarks(args.repeat, args.train_repeat)
+        benchmarks = [benchmark for benchmark in benchmarks if selected(benchmark[0], args.only)]
+        rounds = {name: [] for name, *_ in benchmarks}
+        for round_number in range(1, max(1, args.rounds) + 1):
+            for name, func, repeat, warmup in benchmarks:
+                rounds[name].append(timed(func, repeat, warmup))
+                print(f"[{round_number}] {name:45s} median {rounds[name][-1]['median_ms']:>10.3f} ms  "
+                      f"p95 {rounds[name][-1]['p95_ms']:>10.3f} ms", file=sys.stderr)
+        results = {name: aggregate(samples) for name, samples in rounds.items()}
+        loop.close()
+        shutdown_executors()
+        os.chdir(BACKEND_DIR)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "rounds": max(1, args.rounds),
+        "benchmarks": results,
+    }
+    if args.label:
+        report["label"] = args.label
+
+    regressions = []
+    if baseline:
+        report["compared_to"], regressions = compare(report, baseline, args.threshold)
+        report["regressions"] = regressions
+
+    print(json.dumps(report, indent=2))
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
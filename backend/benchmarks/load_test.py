@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de la API: throughput, latencias de cola, errores y lag del event loop
+
+Por defecto arranca el servidor de datos sustituto (benchmarks/standin_server.py)
+y una instancia local de uvicorn apuntando a él, en un directorio temporal con
+una copia de weather_cache/, data_cache/ y models/ (las ubicaciones cacheadas son
+las "calientes"). Después reproduce una mezcla realista de consultas con la
+concurrencia indicada y muestrea /health para el lag del event loop.
+
+Uso (desde backend/):
+    python -m benchmarks.load_test --concurrency 16 --duration 30 --workers 2
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --duration 60 --output carga.json
+    python -m benchmarks.load_test --mix hot=1,export=1 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import ClientSession, ClientTimeout
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Peso relativo de cada tipo de consulta
+DEFAULT_MIX = {
+    "hot": 50,                 # ubicación cacheada, parámetros por defecto
+    "custom_thresholds": 10,
+    "fahrenheit": 10,
+    "future_60d": 10,
+    "export": 10,
+    "cold": 5,                 # ubicación nueva: 202 + job en segundo plano
+    "conditions": 5,           # endpoint estático, referencia de overhead
+}
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, weight = item.split("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}; available: {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def build_request(scenario: str, hot_locations: List[tuple], rng: random.Random):
+    """(método, ruta, cuerpo JSON) de una consulta del escenario indicado"""
+    latitude, longitude = rng.choice(hot_locations)
+    date_of_year = f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    body = {"latitude": latitude, "longitude": longitude, "date_of_year": date_of_year}
+
+    if scenario == "custom_thresholds":
+        body["custom_thresholds"] = {"very_hot_threshold": rng.uniform(28, 36), "very_windy_threshold": rng.uniform(8, 15)}
+    elif scenario == "fahrenheit":
+        body["temperature_unit"] = "fahrenheit"
+    elif scenario == "future_60d":
+        body["future_days"] = 60
+    elif scenario == "export":
+        return "POST", "/api/weather/export?format=" + rng.choice(("json", "csv")), body
+    elif scenario == "cold":
+        body["latitude"] = round(rng.uniform(-60, 70), 3)
+        body["longitude"] = round(rng.uniform(-180, 180), 3)
+    elif scenario == "conditions":
+        return "GET", "/api/weather/conditions", None
+    return "POST", "/api/weather/probability", body
+
+class LoadResults:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, scenario: str, status: str, latency_ms: float, ok: bool):
+        self.latencies.setdefault(scenario, []).append(latency_ms)
+        counts = self.statuses.setdefault(scenario, {})
+        counts[status] = counts.get(status, 0) + 1
+        if not ok:
+            self.errors[scenario] = self.errors.get(scenario, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict:
+        def describe(values: List[float], errors: int) -> Dict:
+            ordered = sorted(values)
+            return {
+                "requests": len(ordered),
+                "rps": round(len(ordered) / elapsed, 2) if elapsed else 0,
+                "error_rate": round(errors / len(ordered), 4) if ordered else 0,
+                "p50_ms": round(percentile(ordered, 0.50), 2),
+                "p95_ms": round(percentile(ordered, 0.95), 2),
+                "p99_ms": round(percentile(ordered, 0.99), 2),
+                "max_ms": round(ordered[-1], 2) if ordered else 0,
+                "mean_ms": round(statistics.fmean(ordered), 2) if ordered else 0,
+            }
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        scenarios = {
+            name: dict(describe(values, self.errors.get(name, 0)), statuses=self.statuses.get(name, {}))
+            for name, values in sorted(self.latencies.items())
+        }
+        return {"total": describe(all_latencies, sum(self.errors.values())), "scenarios": scenarios}
+
+async def discover_hot_locations(session: ClientSession, base_url: str) -> List[tuple]:
+    """Ubicaciones con datos y modelos en cache según /api/model/info"""
+    async with session.get(f"{base_url}/api/model/info") as response:
+        info = await response.json()
+    trained = info.get("cache_status", {}).get("trained_models", [])
+    return [tuple(float(part) for part in key.split("_")) for key in trained]
+
+async def sample_event_loop(session: ClientSession, base_url: str, samples: List[Dict], stop: asyncio.Event):
+    """Muestrear /health cada segundo (estadísticas del monitor de lag del servidor)"""
+    while not stop.is_set():
+        try:
+            async with session.get(f"{base_url}/health") as response:
+                samples.append((await response.json()).get("event_loop", {}))
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_load(base_url: str, mix: Dict[str, float], concurrency: int, duration: float,
+                   max_requests: Optional[int], seed: int, timeout: float) -> Dict:
+    results = LoadResults()
+    lag_samples: List[Dict] = []
+    rng = random.Random(seed)
+    scenarios, weights = zip(*mix.items())
+    issued = 0
+
+    async with ClientSession(timeout=ClientTimeout(total=timeout)) as session:
+        hot_locations = await discover_hot_locations(session, base_url)
+        if not hot_locations:
+            raise RuntimeError("No hot (cached) locations reported by /api/model/info")
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_event_loop(session, base_url, lag_samples, stop))
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal issued
+            while time.perf_counter() < deadline and (max_requests is None or issued < max_requests):
+                issued += 1
+                scenario = rng.choices(scenarios, weights)[0]
+                method, path, body = build_request(scenario, hot_locations, rng)
+                started = time.perf_counter()
+                try:
+                    async with session.request(method, base_url + path, json=body) as response:
+                        await response.read()
+                        status, ok = str(response.status), response.status < 400
+                except Exception as e:
+                    status, ok = type(e).__name__, False
+                results.record(scenario, status, (time.perf_counter() - started) * 1000, ok)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    report = results.summary(elapsed)
+    report["elapsed_s"] = round(elapsed, 2)
+    report["hot_locations"] = len(hot_locations)
+    if lag_samples:
+        recent_p99 = [sample.get("recent", {}).get("p99_ms", 0) for sample in lag_samples]
+        report["event_loop_lag"] = {
+            "samples": len(lag_samples),
+            "max_ms": max(sample.get("max_lag_ms", 0) for sample in lag_samples),
+            "worst_recent_p99_ms": max(recent_p99),
+            "median_recent_p99_ms": round(statistics.median(recent_p99), 3),
+        }
+    return report
+
+async def wait_until_ready(url: str, timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    async with ClientSession(timeout=ClientTimeout(total=5)) as session:
+        while time.perf_counter() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status < 400:
+                        return
+            except Exception:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+def spawn_servers(workdir: Path, api_port: int, standin_port: int, workers: int, standin_args: List[str]):
+    """Arrancar el servidor sustituto y uvicorn (procesos aparte, logs en workdir)"""
+    for name in ("weather_cache", "data_cache", "models"):
+        if (BACKEND_DIR / name).exists():
+            shutil.copytree(BACKEND_DIR / name, workdir / name)
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(BACKEND_DIR),
+        NASA_POWER_BASE_URL=f"http://127.0.0.1:{standin_port}/api/temporal/daily/point",
+        GIOVANNI_BASE_URL=f"http://127.0.0.1:{standin_port}",
+        NASA_POWER_CHUNK_PAUSE="0",
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+    )
+    standin = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.standin_server", "--port", str(standin_port), *standin_args],
+        cwd=BACKEND_DIR, env=env,
+        stdout=open(workdir / "standin.log", "w"), stderr=subprocess.STDOUT
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+         "--workers", str(workers), "--no-access-log"],
+        cwd=workdir, env=env,
+        stdout=open(workdir / "api.log", "w"), stderr=subprocess.STDOUT
+    )
+    return [standin, api]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=None, help="URL de una API ya en marcha (no arranca servidores)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--requests", type=int, default=None, help="Máximo de peticiones (opcional)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="p. ej. hot=60,cold=5,export=10")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn al arrancar la API")
+    parser.add_argument("--api-port", type=int, default=8090)
+    parser.add_argument("--standin-port", type=int, default=8765)
+    parser.add_argument("--standin-latency-ms", type=float, default=150.0)
+    parser.add_argument("--standin-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por petición (s)")
+    parser.add_argument("--ready-timeout", type=float, default=600.0, help="Espera máxima al calentamiento (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    processes = []
+    workdir = None
+    base_url = args.target.rstrip("/") if args.target else f"http://127.0.0.1:{args.api_port}"
+    try:
+        if not args.target:
+            workdir = Path(tempfile.mkdtemp(prefix="weather_load_"))
+            processes = spawn_servers(
+                workdir, args.api_port, args.standin_port, args.workers,
+                ["--latency-ms", str(args.standin_latency_ms), "--error-rate", str(args.standin_error_rate)]
+            )
+            # /health/ready: esperar al calentamiento de las ubicaciones populares
+            asyncio.run(wait_until_ready(f"{base_url}/health/ready", timeout=args.ready_timeout))
+
+        report = asyncio.run(run_load(
+            base_url, args.mix, args.concurrency, args.duration, args.requests, args.seed, args.timeout
+        ))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "target": args.target or "spawned",
+        "concurrency": args.concurrency,
+        "workers": args.workers if not args.target else None,
+        "mix": args.mix,
+        **report,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
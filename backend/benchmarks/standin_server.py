@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Servidor local que sustituye a NASA POWER y Giovanni para pruebas de carga offline
+
+Sirve el JSON diario por punto de NASA POWER (``/api/temporal/daily/point``) y
+las series de Giovanni (``/proxy-timeseries`` y ``/timeseries``) en tres modos:
+
+    synthetic  datos deterministas generados a partir de (lat, lon, fecha)
+    replay     respuestas grabadas previamente en --recordings
+    record     reenvía a la API real y graba cada respuesta en --recordings
+
+Permite simular latencia (--latency-ms, --jitter-ms), errores (--error-rate)
+y límite de peticiones por segundo (--rate-limit, responde 429).
+
+Uso (desde backend/):
+    python -m benchmarks.standin_server --port 8765 --latency-ms 200 --error-rate 0.02
+    NASA_POWER_BASE_URL=http://127.0.0.1:8765/api/temporal/daily/point \\
+    GIOVANNI_BASE_URL=http://127.0.0.1:8765 NASA_POWER_CHUNK_PAUSE=0 \\
+        uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from aiohttp import ClientSession, web
+
+NASA_POWER_PATH = "/api/temporal/daily/point"
+NASA_POWER_UPSTREAM = "https://power.larc.nasa.gov"
+GIOVANNI_UPSTREAM = "https://api.giovanni.earthdata.nasa.gov"
+
+@dataclass
+class StandInConfig:
+    mode: str = "synthetic"
+    recordings_dir: Path = Path("benchmarks/recordings")
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float = 0.0   # peticiones/segundo, 0 = sin límite
+    seed: int = 0
+
+@dataclass
+class StandInStats:
+    requests: int = 0
+    errors_injected: int = 0
+    rate_limited: int = 0
+    replay_misses: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+class TokenBucket:
+    """Límite de peticiones por segundo con ráfaga de un segundo"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+def _location_seed(latitude: float, longitude: float, seed: int) -> int:
+    return zlib.crc32(f"{round(latitude, 3)}_{round(longitude, 3)}_{seed}".encode())
+
+def _daily_series(latitude: float, longitude: float, start: datetime, end: datetime, seed: int) -> Dict[str, np.ndarray]:
+    """
+    Series diarias deterministas: cada año usa su propia semilla, así que el
+    mismo día devuelve siempre el mismo valor sea cual sea el rango pedido.
+    """
+    columns = {name: [] for name in ("T2M", "T2M_MAX", "T2M_MIN", "PRECTOTCORR", "WS10M", "RH2M")}
+    dates = []
+    base = 25 - abs(latitude) * 0.4
+    hemisphere = 1 if latitude >= 0 else -1
+
+    for year in range(start.year, end.year + 1):
+        rng = np.random.RandomState((_location_seed(latitude, longitude, seed) + year) % 2**32)
+        year_start = datetime(year, 1, 1)
+        days = (datetime(year + 1, 1, 1) - year_start).days
+        day_of_year = np.arange(1, days + 1)
+        seasonal = np.cos(2 * np.pi * (day_of_year - 200) / 365.25) * hemisphere
+        temperature = base + 10 * seasonal + rng.normal(0, 3, days)
+        spread = np.abs(rng.normal(5, 1.5, days))
+        precipitation = np.where(rng.rand(days) < 0.3, rng.gamma(1.5, 6, days), 0.0)
+        wind_speed = np.abs(rng.normal(4, 2, days))
+        humidity = np.clip(rng.normal(65, 15, days), 5, 100)
+
+        first = max(0, (start - year_start).days)
+        last = min(days, (end - year_start).days + 1)
+        for index in range(first, last):
+            dates.append((year_start + timedelta(days=index)).strftime("%Y%m%d"))
+        columns["T2M"].extend(np.round(temperature[first:last], 2))
+        columns["T2M_MAX"].extend(np.round(temperature[first:last] + spread[first:last], 2))
+        columns["T2M_MIN"].extend(np.round(temperature[first:last] - spread[first:last], 2))
+        columns["PRECTOTCORR"].extend(np.round(precipitation[first:last], 2))
+        columns["WS10M"].extend(np.round(wind_speed[first:last], 2))
+        columns["RH2M"].extend(np.round(humidity[first:last], 2))
+
+    return {"dates": dates, **columns}
+
+def synthetic_nasa_power(query) -> dict:
+    latitude, longitude = float(query["latitude"]), float(query["longitude"])
+    start = datetime.strptime(query["start"], "%Y%m%d")
+    end = min(datetime.strptime(query["end"], "%Y%m%d"), datetime.now() - timedelta(days=2))
+    requested = [name.strip() for name in query.get("parameters", "T2M").split(",")]
+    series = _daily_series(latitude, longitude, start, end, int(query.get("_seed", 0)))
+
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [longitude, latitude, 0.0]},
+        "properties": {
+            "parameter": {
+                name: dict(zip(series["dates"], map(float, series[name])))
+                for name in requested if name in series
+            }
+        },
+        "header": {"title": "NASA/POWER stand-in (synthetic)", "fill_value": -999.0}
+    }
+
+def synthetic_giovanni(query) -> dict:
+    latitude, longitude = json.loads(query["location"].replace("%2C", ",").replace("%5B", "[").replace("%5D", "]"))
+    time_range = query["time"].replace("%3A", ":").replace("%2F", "/")
+    start_str, end_str = time_range.split("/")
+    start = datetime.fromisoformat(start_str[:10])
+    end = datetime.fromisoformat(end_str[:10])
+    series = _daily_series(latitude, longitude, start, end, int(query.get("_seed", 0)))
+
+    variable = query.get("data", "")
+    column = next((name for name in ("PRECTOTCORR", "T2M", "RH2M") if name in variable), "WS10M")
+    values = series[column]
+    if column == "T2M":
+        values = [value + 273.15 for value in values]  # Giovanni/MERRA-2 devuelve Kelvin
+    return {
+        "data": [
+            {"time": f"{day[:4]}-{day[4:6]}-{day[6:]}T00:00:00Z", "value": float(value)}
+            for day, value in zip(series["dates"], values)
+        ]
+    }
+
+def recording_path(recordings_dir: Path, path: str, query) -> Path:
+    """Archivo de grabación: hash estable de la ruta y los parámetros (ordenados)"""
+    canonical = path + "?" + "&".join(f"{key}={query[key]}" for key in sorted(query) if not key.startswith("_"))
+    digest = hashlib.sha1(canonical.encode()).hexdigest()[:20]
+    return recordings_dir / path.strip("/").replace("/", "_") / f"{digest}.json"
+
+def create_app(config: StandInConfig) -> web.Application:
+    stats = StandInStats()
+    bucket = TokenBucket(config.rate_limit) if config.rate_limit > 0 else None
+    rng = random.Random(config.seed)
+
+    async def respond(request: web.Request, synthesize, upstream: str) -> web.Response:
+        stats.requests += 1
+        stats.by_path[request.path] = stats.by_path.get(request.path, 0) + 1
+
+        if bucket is not None and not bucket.take():
+            stats.rate_limited += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+
+        delay = config.latency_ms + (rng.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if config.error_rate and rng.random() < config.error_rate:
+            stats.errors_injected += 1
+            return web.json_response({"error": "injected failure"}, status=503)
+
+        query = dict(request.query)
+        query["_seed"] = str(config.seed)
+        path = recording_path(config.recordings_dir, request.path, query)
+
+        if config.mode == "replay":
+            if not path.exists():
+                stats.replay_misses += 1
+                return web.json_response({"error": "no recording for this request"}, status=404)
+            return web.Response(body=path.read_bytes(), content_type="application/json")
+
+        if config.mode == "record":
+            async with ClientSession() as session:
+                async with session.get(upstream + request.path, params=request.query) as response:
+                    body = await response.read()
+                    if response.status == 200:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        path.write_bytes(body)
+                    return web.Response(body=body, status=response.status, content_type="application/json")
+
+        # Generar el JSON fuera del event loop (50 años de series son varios MB)
+        payload = await asyncio.to_thread(lambda: json.dumps(synthesize(query)))
+        return web.Response(text=payload, content_type="application/json")
+
+    async def nasa_power(request: web.Request) -> web.Response:
+        return await respond(request, synthetic_nasa_power, NASA_POWER_UPSTREAM)
+
+    async def giovanni(request: web.Request) -> web.Response:
+        return await respond(request, synthetic_giovanni, GIOVANNI_UPSTREAM)
+
+    async def stats_handler(request: web.Request) -> web.Response:
+        return web.json_response(vars(stats))
+
+    app = web.Application()
+    app["config"] = config
+    app["stats"] = stats
+    app.router.add_get(NASA_POWER_PATH, nasa_power)
+    app.router.add_get("/proxy-timeseries", giovanni)
+    app.router.add_get("/timeseries", giovanni)
+    app.router.add_get("/__stats", stats_handler)
+    return app
+
+async def start_server(config: StandInConfig, host: str = "127.0.0.1", port: int = 8765) -> web.AppRunner:
+    """Arrancar el servidor en el loop actual (usado por el harness de carga)"""
+    runner = web.AppRunner(create_app(config))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=("synthetic", "replay", "record"), default="synthetic")
+    parser.add_argument("--recordings", type=Path, default=StandInConfig.recordings_dir)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Peticiones por segundo (0 = sin límite)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        mode=args.mode, recordings_dir=args.recordings, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed
+    )
+    print(f"Stand-in {config.mode} server on http://{args.host}:{args.port}", file=sys.stderr)
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
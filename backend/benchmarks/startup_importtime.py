@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío basado en ``python -X importtime``
+
+Importa ``app.main`` en un proceso limpio, analiza el informe de importtime
+y mide además el tiempo de pared del import y del lifespan de la aplicación.
+
+Uso (desde backend/):
+    python -m benchmarks.startup_importtime --label after --output benchmarks/results/startup_after.json
+    python -m benchmarks.startup_importtime --compare benchmarks/results/startup_before.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Importar la app y ejecutar su lifespan (arranque completo sin servir peticiones)
+STARTUP_SNIPPET = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def run_lifespan():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(run_lifespan())
+print(json.dumps({"import_s": imported - started, "startup_s": ready - started}))
+"""
+
+def parse_importtime(stderr: str):
+    """Convertir el informe de importtime en {módulo: (self_us, cumulative_us, nivel)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules[module] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return modules
+
+def measure_once():
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=env, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+def run(repeat: int, top: int):
+    runs = [measure_once() for _ in range(repeat)]
+    modules = runs[-1][1]
+    app_main = modules.get("app.main", (0, 0, 0))
+    # Paquetes de primer nivel (pandas, sklearn, fastapi...) sin contar la propia app
+    top_level = sorted(
+        ((name, cumulative) for name, (_, cumulative, _) in modules.items()
+         if "." not in name and name != "app"),
+        key=lambda item: item[1], reverse=True
+    )
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "import_app_main_ms": round(statistics.median(t["import_s"] for t, _ in runs) * 1000, 1),
+        "startup_with_lifespan_ms": round(statistics.median(t["startup_s"] for t, _ in runs) * 1000, 1),
+        "importtime_app_main_cumulative_ms": round(app_main[1] / 1000, 1),
+        "modules_imported": len(modules),
+        "heavy_modules_loaded": sorted(
+            name for name in ("pandas", "sklearn", "aiohttp", "requests", "joblib", "app.data.giovanni_nasa_data")
+            if name in modules
+        ),
+        "top_packages_ms": {name: round(cumulative / 1000, 1) for name, cumulative in top_level[:top]},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="Resultado previo para comparar")
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.top)
+    if args.label:
+        report["label"] = args.label
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        report["compared_to"] = {
+            key: {"baseline": baseline[key], "current": report[key],
+                  "speedup": round(baseline[key] / report[key], 2) if report[key] else None}
+            for key in ("import_app_main_ms", "startup_with_lifespan_ms", "importtime_app_main_cumulative_ms")
+        }
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Genera el gazetteer compacto (.npz) de /api/locations a partir de GeoNames
+
+Descargar de https://download.geonames.org/export/dump/ un volcado de ciudades
+(cities500.zip ≈ 200k lugares, cities15000.zip ≈ 30k) y countryInfo.txt, y
+apuntar GAZETTEER_PATH al archivo generado.
+
+Uso (desde backend/):
+    python build_gazetteer.py cities500.txt --country-info countryInfo.txt --output data_cache/gazetteer.npz
+    GAZETTEER_PATH=data_cache/gazetteer.npz python start_server.py
+"""
+
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+from app.data.gazetteer import Gazetteer
+
+def load_country_names(path: Path) -> dict:
+    """countryInfo.txt de GeoNames: código ISO (columna 0) -> nombre (columna 4)"""
+    names = {}
+    with open(path, encoding="utf-8", newline="") as info_file:
+        for row in csv.reader(info_file, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith("#") and len(row) > 4:
+                names[row[0]] = row[4]
+    return names
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("geonames", type=Path, help="Volcado de ciudades de GeoNames (.txt o .txt.gz)")
+    parser.add_argument("--country-info", type=Path, default=None, help="countryInfo.txt (nombres de país)")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("data_cache/gazetteer.npz"))
+    args = parser.parse_args()
+
+    country_names = load_country_names(args.country_info) if args.country_info else None
+    started = time.perf_counter()
+    gazetteer = Gazetteer.from_geonames(args.geonames, country_names, min_population=args.min_population)
+    if not len(gazetteer):
+        print(f"❌ No places read from {args.geonames}", file=sys.stderr)
+        return 1
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    gazetteer.save_npz(args.output)
+    print(f"✅ {len(gazetteer)} places, {len(gazetteer.country_names)} countries -> {args.output} "
+          f"({args.output.stat().st_size / 1e6:.1f} MB, {time.perf_counter() - started:.1f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
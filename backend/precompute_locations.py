@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Precálculo masivo de ubicaciones: histórico, climatología y modelos
+
+Para cada ubicación descarga el histórico completo de NASA POWER (con límite de
+peticiones por minuto y reintentos), guarda los mismos archivos que genera el
+servidor (data_cache/, weather_cache/, models/ con manifiesto e índice) más el
+histórico en columnas (data_cache/columnar/) y la tabla de climatología por día
+del año (data_cache/climatology/), y entrena los modelos en un pool de procesos.
+
+Se puede interrumpir y relanzar: las ubicaciones con todos sus artefactos se
+saltan, y las descargas ya guardadas en data_cache/ no se repiten.
+
+Uso (desde backend/):
+    python precompute_locations.py --points 40.714,-74.006 51.508,-0.128
+    python precompute_locations.py --csv ciudades.csv --processes 4 --rate 30
+    python precompute_locations.py --bbox 36,-10,44,4 --step 0.5 --output precompute.json
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config.weather_apis import APIS_CONFIG
+from app.core.persistence import atomic_pickle_dump, file_lock
+from app.data.climatology import build_climatology, climatology_path, columnar_path, rows_to_columns, save_npz
+from app.data.historical_store import create_historical_store
+from app.data.real_weather_data import MODEL_VERSION, RealWeatherDataService
+
+def parse_point(value: str) -> Tuple[float, float]:
+    latitude, longitude = (float(part) for part in value.split(","))
+    return latitude, longitude
+
+def read_csv_points(path: Path) -> List[Tuple[float, float]]:
+    """CSV con columnas latitude/longitude (o lat/lon); sin cabecera, las dos primeras columnas"""
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        sample = csv_file.read(2048)
+        csv_file.seek(0)
+        if csv.Sniffer().has_header(sample):
+            points = []
+            for row in csv.DictReader(csv_file):
+                row = {key.strip().lower(): value for key, value in row.items() if key}
+                points.append((float(row.get("latitude", row.get("lat"))), float(row.get("longitude", row.get("lon")))))
+            return points
+        return [(float(row[0]), float(row[1])) for row in csv.reader(csv_file) if row]
+
+def grid_points(bbox: str, step: float) -> List[Tuple[float, float]]:
+    """Rejilla ``min_lat,min_lon,max_lat,max_lon`` con paso ``step`` grados (bordes incluidos)"""
+    min_lat, min_lon, max_lat, max_lon = (float(part) for part in bbox.split(","))
+    latitudes = np.arange(min_lat, max_lat + step / 2, step)
+    longitudes = np.arange(min_lon, max_lon + step / 2, step)
+    return [(round(float(lat), 3), round(float(lon), 3)) for lat in latitudes for lon in longitudes]
+
+class RateLimiter:
+    """Límite de peticiones por minuto compartido por todas las descargas (token bucket)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def _init_worker(cpus_per_worker: int):
+    # Los procesos comparten el presupuesto de CPU de entrenamiento (lock files
+    # en TRAINING_CPU_SLOTS_DIR, también con el servidor si está arrancado);
+    # cada uno pide como mucho su parte
+    from app.core.cpu_budget import training_budget
+    training_budget.max_per_job = max(1, min(cpus_per_worker, training_budget.max_per_job))
+
+def _train_location(latitude: float, longitude: float, rows: List[Dict], years: int) -> Dict:
+    """
+    Entrenar en un proceso del pool con ``rows`` (registros del día consultado);
+    devuelve la entrada del índice de modelos
+    """
+    from app.data.real_weather_data import real_weather_service
+
+    # El proceso padre escribe el índice por lotes
+    real_weather_service.model_index.defer_writes()
+    started = time.perf_counter()
+    real_weather_service.train_prediction_models(rows, latitude, longitude)
+    # Probabilidades del condition_classifier para los 366 días, en la climatología ya
+    # escrita: con el histórico completo de data_cache, no con los registros de un día
+    real_weather_service.update_climatology(latitude, longitude, years=years)
+    return {"index": real_weather_service.model_index.take_deferred(), "train_s": time.perf_counter() - started}
+
+class Precompute:
+    def __init__(self, args):
+        self.args = args
+        self.service = RealWeatherDataService()
+        self.store = create_historical_store(Path("weather_cache"))
+        self.limiter = RateLimiter(args.rate)
+        self.stats = {
+            "done": 0, "skipped": 0, "failed": 0, "requests": 0, "retries": 0,
+            "rows_fetched": 0, "fetch_s": 0.0, "train_s": 0.0
+        }
+        self.failures: Dict[str, str] = {}
+        self.pending_index: Dict[str, Dict] = {}
+        self.stored_keys = set(self.store.keys())
+        self.trained_keys = self.store.trained_keys()
+
+    def is_complete(self, location_key: str) -> bool:
+        entry = self.service.model_index.get(location_key)
+        data_dir = self.service.data_cache_dir
+        return (
+            location_key in self.stored_keys and location_key in self.trained_keys
+            and entry is not None and entry.get("model_version") == MODEL_VERSION
+            and columnar_path(data_dir, location_key).exists()
+            and climatology_path(data_dir, location_key).exists()
+        )
+
+    async def fetch_history(self, latitude: float, longitude: float) -> List[Dict]:
+        """Histórico completo por bloques de años, con límite de peticiones y reintentos"""
+        current_year = datetime.now().year
+        rows = []
+        for year_start in range(current_year - self.args.years, current_year + 1, self.args.chunk_years):
+            year_end = min(year_start + self.args.chunk_years - 1, current_year)
+            for attempt in range(self.args.retries + 1):
+                await self.limiter.acquire()
+                self.stats["requests"] += 1
+                data = await self.service.fetch_nasa_power_data(latitude, longitude, f"{year_start}-01-01", f"{year_end}-12-31")
+                if data is not None:
+                    rows.extend(data["data"])
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(min(60, 2 ** attempt))
+            else:
+                raise RuntimeError(f"NASA POWER failed for {year_start}-{year_end}")
+        return rows
+
+    async def load_or_fetch(self, latitude: float, longitude: float) -> List[Dict]:
+        cache_path = self.service.data_cache_path(latitude, longitude, self.args.years)
+        if cache_path.exists():
+            with open(cache_path, "rb") as cache_file:
+                return pickle.load(cache_file)
+
+        started = time.perf_counter()
+        rows = await self.fetch_history(latitude, longitude)
+        self.stats["fetch_s"] += time.perf_counter() - started
+        self.stats["rows_fetched"] += len(rows)
+        with file_lock(cache_path):
+            atomic_pickle_dump(rows, cache_path)
+        return rows
+
+    def write_tables(self, location_key: str, rows: List[Dict]) -> List[Dict]:
+        """Columnas, climatología y cache histórico del servidor (síncrono, en un hilo)"""
+        columns = rows_to_columns(rows)
+        data_dir = self.service.data_cache_dir
+        save_npz(columnar_path(data_dir, location_key), columns)
+        save_npz(climatology_path(data_dir, location_key), build_climatology(columns))
+
+        # El servidor guarda y entrena con los registros del día consultado
+        day_rows = self.service.filter_by_date_of_year(rows, self.args.date_of_year)
+        self.store.save(location_key, day_rows)
+        return day_rows
+
+    def flush_index(self, force: bool = False):
+        if self.pending_index and (force or len(self.pending_index) >= self.args.index_batch):
+            self.service.model_index.update_many(self.pending_index)
+            self.pending_index = {}
+
+    async def process(self, latitude: float, longitude: float, pool, fetch_slots: asyncio.Semaphore):
+        location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+        if not self.args.force and self.is_complete(location_key):
+            self.stats["skipped"] += 1
+            return
+
+        try:
+            async with fetch_slots:
+                rows = await self.load_or_fetch(latitude, longitude)
+            if len(rows) < 3:
+                raise RuntimeError(f"only {len(rows)} rows available")
+
+            day_rows = await asyncio.to_thread(self.write_tables, location_key, rows)
+            result = await asyncio.get_running_loop().run_in_executor(
+                pool, _train_location, latitude, longitude, day_rows, self.args.years
+            )
+            if location_key not in result["index"]:
+                raise RuntimeError("models were not saved")
+
+            self.stats["train_s"] += result["train_s"]
+            self.pending_index.update(result["index"])
+            self.flush_index()
+            self.store.mark_trained(location_key)
+            self.stats["done"] += 1
+            print(f"✅ {location_key} ({len(rows)} rows, train {result['train_s']:.1f}s)", file=sys.stderr)
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.failures[location_key] = str(e)
+            print(f"❌ {location_key}: {e}", file=sys.stderr)
+
+    async def run(self, points: List[Tuple[float, float]]) -> Dict:
+        cpus = os.cpu_count() or 1
+        context = multiprocessing.get_context("spawn")
+        started = time.perf_counter()
+        # Ubicaciones en curso acotadas: descargas + entrenamientos en cola
+        in_flight = asyncio.Semaphore(self.args.fetch_concurrency + self.args.processes * 2)
+        fetch_slots = asyncio.Semaphore(self.args.fetch_concurrency)
+
+        async def bounded(latitude, longitude):
+            async with in_flight:
+                await self.process(latitude, longitude, pool, fetch_slots)
+
+        with ProcessPoolExecutor(
+            max_workers=self.args.processes, mp_context=context,
+            initializer=_init_worker, initargs=(max(1, cpus // self.args.processes),)
+        ) as pool:
+            try:
+                await asyncio.gather(*(bounded(latitude, longitude) for latitude, longitude in points))
+            finally:
+                self.flush_index(force=True)
+
+        elapsed = time.perf_counter() - started
+        processed = self.stats["done"]
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "locations": len(points),
+            **{key: round(value, 2) if isinstance(value, float) else value for key, value in self.stats.items()},
+            "elapsed_s": round(elapsed, 2),
+            "locations_per_min": round(processed * 60 / elapsed, 2) if elapsed else 0,
+            "requests_per_min": round(self.stats["requests"] * 60 / elapsed, 2) if elapsed else 0,
+            "failures": self.failures,
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", nargs="*", type=parse_point, default=[], help="lat,lon ...")
+    parser.add_argument("--csv", type=Path, default=None, help="CSV con latitude,longitude")
+    parser.add_argument("--bbox", default=None, help="min_lat,min_lon,max_lat,max_lon")
+    parser.add_argument("--step", type=float, default=1.0, help="Paso de la rejilla en grados")
+    parser.add_argument("--years", type=int, default=50, help="Años de histórico (como el servidor)")
+    parser.add_argument("--chunk-years", type=int, default=5, help="Años por petición a NASA POWER")
+    parser.add_argument("--date-of-year", default=None, help="MM-DD con el que se cachea y entrena (default: hoy)")
+    parser.add_argument("--rate", type=float, default=APIS_CONFIG["nasa_power"]["rate_limit"], help="Peticiones por minuto")
+    parser.add_argument("--retries", type=int, default=APIS_CONFIG["nasa_power"]["retry_attempts"])
+    parser.add_argument("--fetch-concurrency", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 1) // 2), help="Procesos de entrenamiento")
+    parser.add_argument("--index-batch", type=int, default=50, help="Ubicaciones por escritura del índice de modelos")
+    parser.add_argument("--force", action="store_true", help="Rehacer ubicaciones ya completas")
+    parser.add_argument("--output", type=Path, default=None, help="Guardar el resumen en JSON")
+    args = parser.parse_args()
+
+    if args.date_of_year is None:
+        today = datetime.now()
+        args.date_of_year = f"{today.month:02d}-{today.day:02d}"
+
+    points = list(args.points)
+    if args.csv:
+        points += read_csv_points(args.csv)
+    if args.bbox:
+        points += grid_points(args.bbox, args.step)
+    # Sin duplicados (misma clave de ubicación), en el orden dado
+    points = list({f"{round(lat, 3)}_{round(lon, 3)}": (lat, lon) for lat, lon in points}.values())
+    if not points:
+        parser.error("no locations given (use --points, --csv or --bbox)")
+
+    summary = asyncio.run(Precompute(args).run(points))
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import pytest
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Directorio de trabajo temporal: los servicios crean models/, data_cache/ y weather_cache/ relativos"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def quick_train(service, latitude: float, longitude: float, rows, skip=(), n_estimators: int = 5,
+                max_depth: int = 4):
+    """
+    Modelos pequeños ajustados a mano y guardados con save_trained_models
+    (train_prediction_models con su GridSearch tarda minutos)
+    """
+    from datetime import datetime
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    X = service.prepare_features(rows, latitude, longitude)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    targets = service._model_targets(rows)
+    location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+    with service.model_state():
+        service._reset_models()
+        for name in service.models:
+            if name in skip:
+                continue
+            if name.endswith("_classifier"):
+                model = GradientBoostingClassifier(n_estimators=n_estimators, max_depth=2, random_state=0)
+            else:
+                model = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=0)
+            service.models[name] = model.fit(X_scaled, targets[name])
+        service.scalers = {'features': scaler, 'targets': {}}
+        service.loaded_location_key = location_key
+        service.save_trained_models(location_key, training_info={
+            "trained_at": datetime.now().isoformat(),
+            "training_samples": len(rows),
+            "training_mode": "full",
+            "latitude": latitude,
+            "longitude": longitude,
+        })
+    return location_key
+
+@pytest.fixture
+def weather_data_service(workdir):
+    from app.data.real_weather_data import RealWeatherDataService
+    return RealWeatherDataService()
+
+@pytest.fixture
+def weather_service(weather_data_service):
+    """WeatherService sobre el directorio temporal, con su propio RealWeatherDataService"""
+    from app.services.weather_service import WeatherService
+    service = WeatherService()
+    service.real_data_service = weather_data_service
+    return service
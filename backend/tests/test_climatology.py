@@ -0,0 +1,185 @@
+import asyncio
+import json
+import pickle
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.config.weather_apis import CONDITION_MODEL_PSEUDO_COUNT
+from app.data.climatology import (
+    CONDITION_MODEL_CLASSES, DAYS_IN_TABLE, blend_probability, build_climatology, climatology_path,
+    day_index, day_indices, has_model_probabilities, load_npz, mean_by_day, rows_to_columns, save_npz
+)
+from app.data.real_weather_data import MODEL_MANIFEST_NAME, MODEL_VERSION
+from app.data.synthetic import synthetic_history
+from tests.conftest import quick_train
+
+NYC = (40.7128, -74.0060)
+NYC_KEY = "40.713_-74.006"
+
+@pytest.fixture(scope="module")
+def rows():
+    return synthetic_history(NYC[0], years=8, start_year=2000)
+
+def test_blend_probability_weights_years_against_pseudo_count():
+    assert blend_probability(0.3, 0.1, 0, 10) == pytest.approx(0.1)
+    assert blend_probability(0.3, 0.1, 10, 0) == pytest.approx(0.3)
+    assert blend_probability(0.3, 0.1, 10, 10) == pytest.approx(0.2)
+    # Con muchos años domina la frecuencia observada
+    assert abs(blend_probability(0.3, 0.1, 1000, 10) - 0.3) < abs(blend_probability(0.3, 0.1, 5, 10) - 0.3)
+
+def test_day_helpers_use_a_leap_year_calendar():
+    assert day_index(1, 1) == 0
+    assert day_index(2, 29) == 59
+    assert day_index(3, 1) == 60
+    assert day_index(12, 31) == DAYS_IN_TABLE - 1
+    np.testing.assert_array_equal(day_indices([datetime(2001, 3, 1), "2004-03-01"]), [60, 60])
+
+    means = mean_by_day(np.array([1.0, 3.0, 5.0]), np.array([0, 0, 2]))
+    assert means.shape == (DAYS_IN_TABLE,)
+    assert means[0] == 2.0 and means[2] == 5.0
+    assert np.isnan(means[1])
+
+def test_condition_labels_use_the_empirical_thresholds(weather_data_service, rows):
+    labels = weather_data_service._create_extreme_condition_labels(rows)
+    table = build_climatology(rows_to_columns(rows))
+    index = day_indices([row["date"] for row in rows])
+
+    for condition, classes in CONDITION_MODEL_CLASSES.items():
+        label_rate = mean_by_day(np.isin(labels, classes).astype(float), index)
+        np.testing.assert_allclose(label_rate, table[f"{condition}_probability"], equal_nan=True)
+
+def test_score_condition_days_averages_real_rows(weather_data_service, rows):
+    quick_train(weather_data_service, *NYC, rows)
+    # Sin 29 de febrero: ese día queda sin probabilidad
+    scored_rows = [row for row in rows if (row["date"].month, row["date"].day) != (2, 29)]
+
+    columns = weather_data_service.score_condition_days(scored_rows, *NYC)
+    assert set(columns) == {f"{condition}_model_probability" for condition in CONDITION_MODEL_CLASSES}
+    for values in columns.values():
+        assert values.shape == (DAYS_IN_TABLE,)
+        assert np.isnan(values[day_index(2, 29)])
+        valid = values[~np.isnan(values)]
+        assert len(valid) == DAYS_IN_TABLE - 1
+        assert ((valid >= 0) & (valid <= 1)).all()
+
+    # Las probabilidades de very_hot siguen la estación
+    hot = columns["very_hot_model_probability"]
+    assert np.nanmean(hot[day_index(7, 1):day_index(8, 1)]) > np.nanmean(hot[day_index(1, 1):day_index(2, 1)])
+
+def test_score_condition_days_requires_current_condition_classifier(weather_data_service, rows):
+    quick_train(weather_data_service, *NYC, rows, skip=("condition_classifier",))
+    assert weather_data_service.score_condition_days(rows, *NYC) == {}
+
+    quick_train(weather_data_service, *NYC, rows)
+    manifest_path = weather_data_service.models_dir / NYC_KEY / MODEL_MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "model_version": MODEL_VERSION - 1}))
+    assert weather_data_service.score_condition_days(rows, *NYC) == {}
+
+def test_predict_probabilities_blends_model_for_hot_and_cold(weather_data_service, rows):
+    day_rows = weather_data_service.filter_by_date_of_year(rows, "07-15")
+    empirical = weather_data_service.predict_probabilities(*NYC, "07-15", day_rows)
+    for values in empirical.values():
+        assert values["probability"] == values["empirical_probability"]
+        assert "model_probability" not in values
+
+    table = build_climatology(rows_to_columns(rows))
+    for condition in CONDITION_MODEL_CLASSES:
+        table[f"{condition}_model_probability"] = np.full(DAYS_IN_TABLE, 0.5)
+    table["very_cold_model_probability"][day_index(7, 15)] = np.nan
+
+    blended = weather_data_service.predict_probabilities(*NYC, "07-15", day_rows, climatology=table)
+    hot = blended["very_hot"]
+    assert hot["empirical_probability"] == empirical["very_hot"]["probability"]
+    assert hot["model_probability"] == 0.5
+    assert hot["probability"] == pytest.approx(
+        blend_probability(hot["empirical_probability"], 0.5, len(day_rows), CONDITION_MODEL_PSEUDO_COUNT)
+    )
+    # Sin probabilidad del modelo para el día, o condición sin clases del modelo: solo la empírica
+    for condition in ("very_cold", "very_wet", "very_windy", "very_uncomfortable"):
+        assert blended[condition] == empirical[condition]
+
+def test_update_climatology_stores_model_version(weather_data_service, rows):
+    assert weather_data_service.update_climatology(*NYC, rows) is None
+    quick_train(weather_data_service, *NYC, rows)
+
+    table = weather_data_service.update_climatology(*NYC, rows)
+    stored = load_npz(climatology_path(weather_data_service.data_cache_dir, NYC_KEY))
+    assert int(stored["condition_model_version"]) == MODEL_VERSION
+    np.testing.assert_array_equal(stored["very_hot_model_probability"], table["very_hot_model_probability"])
+    np.testing.assert_array_equal(stored["samples"], build_climatology(rows_to_columns(rows))["samples"])
+
+def write_full_history(service, rows):
+    """Histórico completo en data_cache, como lo deja get_historical_data"""
+    path = service.data_cache_path(*NYC, 50)
+    with open(path, "wb") as f:
+        pickle.dump(rows, f)
+
+def test_update_climatology_refuses_a_single_day_of_history(weather_data_service, rows):
+    quick_train(weather_data_service, *NYC, rows)
+    day_rows = weather_data_service.filter_by_date_of_year(rows, "07-15")
+
+    assert weather_data_service.score_condition_days(day_rows, *NYC) == {}
+    assert weather_data_service.update_climatology(*NYC, day_rows) is None
+    assert not climatology_path(weather_data_service.data_cache_dir, NYC_KEY).exists()
+
+    # Sin registros usa el histórico completo de data_cache
+    write_full_history(weather_data_service, rows)
+    assert has_model_probabilities(weather_data_service.update_climatology(*NYC))
+
+def test_first_request_scores_every_day_of_the_year(weather_service, rows):
+    real = weather_service.real_data_service
+    quick_train(real, *NYC, rows)
+    write_full_history(real, rows)
+    # Modelos desde el arranque: se puntúa en la primera petición
+    weather_service.models_cache[NYC_KEY] = True
+
+    data = asyncio.run(weather_service.get_weather_data(*NYC, "07-15"))
+    assert "model_probability" in data["probabilities"]["very_hot"]
+    # El cache histórico solo tiene el día consultado; la climatología, todo el año
+    assert len(weather_service.historical_data_cache[NYC_KEY]) == 8
+
+    table = load_npz(climatology_path(real.data_cache_dir, NYC_KEY))
+    assert has_model_probabilities(table)
+    january_rows = real.filter_by_date_of_year(rows, "01-15")
+    january = real.predict_probabilities(*NYC, "01-15", january_rows, climatology=table)
+    assert "model_probability" in january["very_cold"]
+    assert not np.isnan(table["very_cold_model_probability"][day_index(1, 15)])
+
+def test_weather_service_rescores_stale_and_partial_tables(weather_service, rows):
+    real = weather_service.real_data_service
+    quick_train(real, *NYC, rows)
+    write_full_history(real, rows)
+    path = climatology_path(real.data_cache_dir, NYC_KEY)
+
+    # Tabla de una versión anterior de los modelos: no se usa y se vuelve a puntuar
+    stale = build_climatology(rows_to_columns(rows))
+    for condition in CONDITION_MODEL_CLASSES:
+        stale[f"{condition}_model_probability"] = np.zeros(DAYS_IN_TABLE)
+    stale["condition_model_version"] = np.array(MODEL_VERSION - 1)
+    save_npz(path, stale)
+    assert weather_service._location_climatology(NYC_KEY) is None
+
+    # Tabla de la versión actual pero con un solo día puntuado: tampoco
+    partial = dict(stale)
+    for condition in CONDITION_MODEL_CLASSES:
+        partial[f"{condition}_model_probability"] = np.full(DAYS_IN_TABLE, np.nan)
+        partial[f"{condition}_model_probability"][day_index(7, 15)] = 0.2
+    partial["condition_model_version"] = np.array(MODEL_VERSION)
+    save_npz(path, partial)
+    weather_service.climatology_cache.clear()
+    assert weather_service._location_climatology(NYC_KEY) is None
+
+    asyncio.run(weather_service._score_climatology(*NYC))
+    table = weather_service.climatology_cache[NYC_KEY]
+    assert int(table["condition_model_version"]) == MODEL_VERSION
+    assert has_model_probabilities(table)
+
+    # Una vez por proceso; ``force`` tras reentrenar
+    path.unlink()
+    asyncio.run(weather_service._score_climatology(*NYC))
+    assert not path.exists()
+    asyncio.run(weather_service._score_climatology(*NYC, force=True))
+    assert path.exists()
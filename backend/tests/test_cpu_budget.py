@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import threading
+import time
+
+from app.core.cpu_budget import CpuBudget
+
+HOLD_SLOT = """
+import os, sys, time
+with open(sys.argv[1], "a+") as handle:
+    os.lockf(handle.fileno(), os.F_TLOCK, 0)
+    print("locked", flush=True)
+    sys.stdin.readline()
+"""
+
+TEST_SLOT = """
+import os, sys
+with open(sys.argv[1], "a+") as handle:
+    try:
+        os.lockf(handle.fileno(), os.F_TEST, 0)
+        print("free")
+    except OSError:
+        print("locked")
+"""
+
+def slot_state(path) -> str:
+    return subprocess.run([sys.executable, "-c", TEST_SLOT, str(path)], capture_output=True, text=True).stdout.strip()
+
+def test_busy_slots_counts_other_processes_without_taking_slots(tmp_path):
+    budget = CpuBudget(tmp_path, total_slots=3, max_per_job=3, poll_interval=0.01)
+    assert budget.busy_slots() == 0
+
+    budget.slots_dir.mkdir(exist_ok=True)
+    holder = subprocess.Popen([sys.executable, "-c", HOLD_SLOT, str(budget._slot_path(1))],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        assert budget.busy_slots() == 1
+
+        with budget.acquire() as n_jobs:
+            assert n_jobs == 2
+            assert budget.busy_slots() == 3
+            # El sondeo no suelta los slots de este proceso
+            assert slot_state(budget._slot_path(0)) == "locked"
+            assert slot_state(budget._slot_path(2)) == "locked"
+        assert budget.busy_slots() == 1
+        assert slot_state(budget._slot_path(0)) == "free"
+    finally:
+        holder.communicate("\n")
+
+def test_probing_does_not_make_a_trainer_wait(tmp_path):
+    budget = CpuBudget(tmp_path, total_slots=1, max_per_job=1, poll_interval=5)
+    stop = threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            budget.busy_slots()
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    try:
+        for _ in range(20):
+            started = time.perf_counter()
+            with budget.acquire() as n_jobs:
+                assert n_jobs == 1
+            # Nunca cae en la espera de poll_interval
+            assert time.perf_counter() - started < 1
+    finally:
+        stop.set()
+        prober.join()
+
+def test_waiting_counts_queued_trainings(tmp_path):
+    budget = CpuBudget(tmp_path, total_slots=1, max_per_job=1, poll_interval=0.01)
+    queued = threading.Event()
+
+    def second():
+        with budget.acquire(on_wait=queued.set):
+            pass
+
+    with budget.acquire():
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert queued.wait(2)
+        assert budget.waiting == 1
+        assert budget.status()["waiting_in_this_process"] == 1
+    thread.join()
+    assert budget.waiting == 0
@@ -0,0 +1,49 @@
+import statistics
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.data import gazetteer as gazetteer_module
+from app.data.gazetteer import get_gazetteer
+from app.data.synthetic import synthetic_gazetteer
+
+PLACES = 100_000
+# Objetivo de /api/locations: cada consulta en menos de 5 ms
+TARGET_MS = 5.0
+
+@pytest.fixture(scope="module")
+def large_gazetteer(tmp_path_factory):
+    """100k lugares servidos como en producción: .npz de GAZETTEER_PATH cargado por get_gazetteer"""
+    path = tmp_path_factory.mktemp("gazetteer") / "gazetteer.npz"
+    synthetic_gazetteer(PLACES).save_npz(path)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "GAZETTEER_PATH", str(path))
+        monkeypatch.setattr(gazetteer_module, "_gazetteer", None)
+        yield get_gazetteer()
+
+def median_ms(query, repeat: int = 30) -> float:
+    query()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def test_large_gazetteer_round_trips_through_npz(large_gazetteer):
+    assert len(large_gazetteer) == PLACES
+    assert large_gazetteer.record(0)["name"] == synthetic_gazetteer(1).record(0)["name"]
+
+@pytest.mark.parametrize("query", [
+    lambda g: g.nearby(40.4, -3.7, 50.0, limit=50),
+    lambda g: g.nearby(40.4, -3.7, 500.0, limit=50),
+    lambda g: g.nearest(40.4, -3.7, k=10),
+    lambda g: g.search("santa", limit=20),
+    lambda g: g.search("berca", limit=20),
+    lambda g: g.search("ma", limit=20),
+    lambda g: g.search("país 17", limit=20),
+], ids=["nearby_50km", "nearby_500km", "nearest_10", "search_prefix", "search_substring", "search_short", "search_country"])
+def test_large_gazetteer_queries_stay_under_target(large_gazetteer, query):
+    assert query(large_gazetteer)
+    assert median_ms(lambda: query(large_gazetteer)) < TARGET_MS
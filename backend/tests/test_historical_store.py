@@ -0,0 +1,177 @@
+import pickle
+import stat
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from app.core.persistence import atomic_pickle_dump, atomic_write, atomic_write_bytes, file_lock
+from app.core import persistence
+from app.core.config import settings
+from app.data.historical_store import FileHistoricalStore, create_historical_store
+from app.data.sqlite_store import SQLiteHistoricalStore
+from app.data.synthetic import synthetic_history
+
+NYC = "40.713_-74.006"
+LA = "34.052_-118.244"
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteHistoricalStore(tmp_path / "weather.db")
+    return FileHistoricalStore(tmp_path / "weather_cache")
+
+def test_atomic_write_keeps_previous_version_on_error(tmp_path):
+    path = tmp_path / "data.bin"
+    atomic_write_bytes(path, b"v1")
+
+    def failing_writer(f):
+        f.write(b"partial")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, failing_writer)
+    assert path.read_bytes() == b"v1"
+    # Sin temporales huérfanos
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data.bin"]
+
+def test_atomic_write_keeps_file_permissions(tmp_path):
+    new_file = tmp_path / "new.json"
+    atomic_write_bytes(new_file, b"{}")
+    # Los de un open() normal con el umask del proceso, no los 0600 del temporal
+    assert stat.S_IMODE(new_file.stat().st_mode) == 0o666 & ~persistence._UMASK
+
+    shared = tmp_path / "index.json"
+    shared.write_bytes(b"{}")
+    shared.chmod(0o664)
+    atomic_write_bytes(shared, b"[]")
+    assert stat.S_IMODE(shared.stat().st_mode) == 0o664
+
+def test_readers_never_see_a_partial_pickle(tmp_path):
+    path = tmp_path / "rows.pkl"
+    versions = [list(range(n, n + 20000)) for n in range(10)]
+    atomic_pickle_dump(versions[0], path)
+    errors = []
+
+    def writer():
+        for rows in versions * 3:
+            atomic_pickle_dump(rows, path)
+
+    def reader():
+        for _ in range(200):
+            try:
+                with open(path, "rb") as f:
+                    rows = pickle.load(f)
+                assert rows in versions
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def test_exclusive_file_lock_waits_for_holder(tmp_path):
+    path = tmp_path / "resource"
+    order = []
+
+    def contender():
+        with file_lock(path):
+            order.append("contender")
+
+    with file_lock(path):
+        thread = threading.Thread(target=contender)
+        thread.start()
+        time.sleep(0.1)
+        order.append("holder")
+    thread.join()
+    assert order == ["holder", "contender"]
+
+def test_save_load_and_keys(store):
+    rows = synthetic_history(40.7, years=2)
+    store.save(NYC, rows)
+    store.save(LA, rows[:10])
+
+    assert store.keys() == sorted([NYC, LA])
+    loaded = store.load(NYC)
+    assert len(loaded) == len(rows)
+    assert loaded[0]["date"] == rows[0]["date"]
+    assert loaded[0]["temperature"] == pytest.approx(rows[0]["temperature"])
+    assert store.load("0.0_0.0") is None
+    assert {key: len(value) for key, value in store.load_all().items()} == {NYC: len(rows), LA: 10}
+
+def test_append_replaces_existing_dates(store):
+    rows = synthetic_history(40.7, years=1)
+    store.save(NYC, rows[:100])
+
+    changed = {**rows[50], "temperature": 99.0}
+    assert store.append(NYC, [changed] + rows[100:150]) == 50
+    loaded = store.load(NYC)
+    assert len(loaded) == 150
+    assert [row["date"] for row in loaded] == [row["date"] for row in rows[:150]]
+    assert loaded[50]["temperature"] == 99.0
+
+def test_queries_by_range_and_day_of_year(store):
+    rows = synthetic_history(40.7, years=3, start_year=2000)
+    store.save(NYC, rows)
+
+    in_range = store.query_range(NYC, datetime(2001, 3, 1), datetime(2001, 3, 31))
+    assert [row["date"].day for row in in_range] == list(range(1, 32))
+
+    same_day = store.query_day_of_year(NYC, 7, 15)
+    assert [(row["date"].year, row["date"].month, row["date"].day) for row in same_day] == [
+        (year, 7, 15) for year in (2000, 2001, 2002)
+    ]
+
+def test_trained_marks_and_delete(store):
+    store.save(NYC, synthetic_history(40.7, years=1)[:10])
+    store.mark_trained(NYC)
+    assert store.trained_keys() == {NYC}
+
+    store.delete(NYC)
+    assert store.load(NYC) is None
+    assert store.trained_keys() == set()
+
+def test_file_store_reads_legacy_cache_without_rewriting_it(tmp_path):
+    cache_dir = tmp_path / "weather_cache"
+    cache_dir.mkdir()
+    legacy = {NYC: synthetic_history(40.7, years=1)[:5], LA: synthetic_history(34.0, years=1)[:5]}
+    with open(cache_dir / FileHistoricalStore.LEGACY_HISTORICAL_FILE, "wb") as f:
+        pickle.dump(legacy, f)
+    legacy_bytes = (cache_dir / FileHistoricalStore.LEGACY_HISTORICAL_FILE).read_bytes()
+
+    store = FileHistoricalStore(cache_dir)
+    store.save(NYC, synthetic_history(40.7, years=1)[:7])
+    assert store.keys() == sorted([NYC, LA])
+    assert len(store.load(NYC)) == 7
+    assert len(store.load(LA)) == 5
+    assert (cache_dir / FileHistoricalStore.LEGACY_HISTORICAL_FILE).read_bytes() == legacy_bytes
+
+def test_sqlite_store_shared_between_threads_and_instances(tmp_path):
+    db_path = tmp_path / "weather.db"
+    rows = synthetic_history(40.7, years=1)
+    writer = SQLiteHistoricalStore(db_path)
+    # Cada hilo usa su propia conexión
+    threads = [threading.Thread(target=writer.append, args=(NYC, rows[i::4])) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reader = SQLiteHistoricalStore(db_path)
+    assert len(reader.load(NYC)) == len(rows)
+
+def test_create_historical_store_from_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HISTORICAL_STORE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'weather.db'}")
+    assert isinstance(create_historical_store(tmp_path / "weather_cache"), SQLiteHistoricalStore)
+
+    monkeypatch.setattr(settings, "HISTORICAL_STORE_BACKEND", "file")
+    assert isinstance(create_historical_store(tmp_path / "weather_cache"), FileHistoricalStore)
+
+    monkeypatch.setattr(settings, "HISTORICAL_STORE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_historical_store(tmp_path / "weather_cache")
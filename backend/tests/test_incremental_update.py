@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+
+from app.config.weather_apis import (
+    COMPACTION_MIN_TREES, MODEL_FULL_RETRAIN_DAYS, MODEL_RETRAIN_THRESHOLD, WARM_START_MIN_ESTIMATORS,
+)
+from app.core.config import settings
+from app.data.model_compaction import CompactForest
+from app.data.real_weather_data import MODEL_MANIFEST_NAME, RealWeatherDataService
+from app.data.synthetic import synthetic_history
+from tests.conftest import quick_train
+
+NYC = (40.7128, -74.0060)
+BUENOS_AIRES = (-34.6037, -58.3816)
+TRAINED_DAYS = 3 * 365
+
+def load_model(service, location_key, name):
+    return joblib.load(service.models_dir / location_key / f"{name}.pkl")
+
+def test_update_grows_only_the_updated_location(weather_data_service, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_COMPACTION_ENABLED", False)
+    rows = synthetic_history(NYC[0], years=4)
+    nyc = quick_train(weather_data_service, *NYC, rows[:TRAINED_DAYS])
+    buenos_aires = quick_train(weather_data_service, *BUENOS_AIRES, synthetic_history(BUENOS_AIRES[0], years=3, seed=7))
+    trained_at = weather_data_service.load_model_manifest(nyc)["trained_at"]
+    scaler_mean = joblib.load(weather_data_service.models_dir / nyc / "scalers.pkl")["features"].mean_
+
+    # En memoria quedan los modelos de Buenos Aires: la actualización parte de los de NYC en disco
+    assert weather_data_service.loaded_location_key == buenos_aires
+    assert weather_data_service.update_prediction_models(rows, rows[TRAINED_DAYS:], *NYC)
+    assert weather_data_service.loaded_location_key == nyc
+
+    assert load_model(weather_data_service, nyc, "temperature_predictor").n_estimators == 5 + WARM_START_MIN_ESTIMATORS
+    assert load_model(weather_data_service, nyc, "precipitation_classifier").n_estimators_ == 5 + WARM_START_MIN_ESTIMATORS
+    assert load_model(weather_data_service, buenos_aires, "temperature_predictor").n_estimators == 5
+    # El scaler no cambia (los árboles existentes dependen de él)
+    np.testing.assert_array_equal(
+        joblib.load(weather_data_service.models_dir / nyc / "scalers.pkl")["features"].mean_, scaler_mean
+    )
+
+    manifest = weather_data_service.load_model_manifest(nyc)
+    assert manifest["training_mode"] == "incremental"
+    assert manifest["incremental_updates"] == 1
+    assert manifest["training_samples"] == len(rows)
+    assert manifest["trained_at"] == trained_at
+    incremental = manifest["metrics"]["temperature_predictor"]["incremental"]
+    assert incremental["new_samples"] == len(rows) - TRAINED_DAYS
+    assert incremental["refit"] is False
+
+def test_update_without_saved_models_is_refused(weather_data_service):
+    rows = synthetic_history(NYC[0], years=4)
+    assert not weather_data_service.update_prediction_models(rows, rows[TRAINED_DAYS:], *NYC)
+
+def test_update_grows_a_compacted_forest_at_its_depth(weather_data_service, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_COMPACTION_ENABLED", False)
+    rows = synthetic_history(NYC[0], years=4)
+    nyc = quick_train(weather_data_service, *NYC, rows[:TRAINED_DAYS])
+    with weather_data_service.model_state():
+        forest = weather_data_service.models["temperature_predictor"]
+        weather_data_service.models["temperature_predictor"] = CompactForest.from_forest(forest).prune_depth(3)
+        weather_data_service.save_trained_models(nyc, weather_data_service.load_model_manifest(nyc))
+
+    assert RealWeatherDataService().update_prediction_models(rows, rows[TRAINED_DAYS:], *NYC)
+    grown = load_model(weather_data_service, nyc, "temperature_predictor")
+    assert isinstance(grown, CompactForest)
+    assert grown.n_estimators == 5 + WARM_START_MIN_ESTIMATORS
+    assert grown.depth() <= 3
+
+def test_update_compacts_the_grown_models_again(weather_data_service, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_COMPACTION_ENABLED", True)
+    monkeypatch.setattr(settings, "MODEL_SIZE_BUDGET_KB", 64)
+    rows = synthetic_history(NYC[0], years=4)
+    nyc = quick_train(weather_data_service, *NYC, rows[:TRAINED_DAYS], n_estimators=30, max_depth=20)
+
+    assert weather_data_service.update_prediction_models(rows, rows[TRAINED_DAYS:], *NYC)
+    report = weather_data_service.load_model_manifest(nyc)["metrics"]["temperature_predictor"]["compaction"]
+    assert report["trees_before"] == 30 + WARM_START_MIN_ESTIMATORS
+    grown = load_model(weather_data_service, nyc, "temperature_predictor")
+    assert isinstance(grown, CompactForest)
+    assert COMPACTION_MIN_TREES <= grown.n_estimators == report["trees_after"] < report["trees_before"]
+    assert report["bytes_after"] < report["bytes_before"]
+
+def set_trained_at(service, location_key, trained_at):
+    manifest_path = service.models_dir / location_key / MODEL_MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["trained_at"] = trained_at.isoformat()
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+def test_stale_models_wait_for_the_retrain_threshold(weather_service, monkeypatch):
+    rows = synthetic_history(NYC[0], years=4)
+    nyc = quick_train(weather_service.real_data_service, *NYC, rows[:TRAINED_DAYS])
+    weather_service.store.save(nyc, rows[:TRAINED_DAYS])
+    weather_service.historical_data_cache[nyc] = rows[:TRAINED_DAYS]
+    set_trained_at(weather_service.real_data_service, nyc, datetime.now() - timedelta(days=MODEL_FULL_RETRAIN_DAYS + 1))
+    full_trainings = []
+    monkeypatch.setattr(weather_service.real_data_service, "train_prediction_models",
+                        lambda *args: full_trainings.append(args))
+
+    # Un solo registro nuevo no dispara el GridSearch aunque el entrenamiento sea antiguo
+    result = asyncio.run(weather_service.append_historical_data(*NYC, rows[TRAINED_DAYS:TRAINED_DAYS + 1]))
+    assert result["retraining"] == "none"
+    assert not full_trainings
+    assert weather_service.real_data_service.load_model_manifest(nyc)["training_samples"] == TRAINED_DAYS
+
+    result = asyncio.run(weather_service.append_historical_data(*NYC, rows[TRAINED_DAYS + 1:TRAINED_DAYS + MODEL_RETRAIN_THRESHOLD]))
+    assert result["retraining"] == "full"
+    assert len(full_trainings) == 1
+
+def test_append_applies_retrain_policy(weather_service):
+    rows = synthetic_history(NYC[0], years=4)
+    nyc = quick_train(weather_service.real_data_service, *NYC, rows[:TRAINED_DAYS])
+    weather_service.store.save(nyc, rows[:TRAINED_DAYS])
+    weather_service.historical_data_cache[nyc] = rows[:TRAINED_DAYS]
+    few = rows[TRAINED_DAYS:TRAINED_DAYS + MODEL_RETRAIN_THRESHOLD - 1]
+    more = rows[TRAINED_DAYS + MODEL_RETRAIN_THRESHOLD - 1:]
+
+    # Por debajo del umbral los registros se acumulan
+    result = asyncio.run(weather_service.append_historical_data(*NYC, few))
+    assert result["rows_added"] == len(few)
+    assert result["retraining"] == "none"
+    assert weather_service.real_data_service.load_model_manifest(nyc)["training_samples"] == TRAINED_DAYS
+
+    # Contando los acumulados se alcanza el umbral: warm start
+    result = asyncio.run(weather_service.append_historical_data(*NYC, more))
+    assert result["retraining"] == "incremental"
+    assert result["total_rows"] == len(rows)
+    manifest = weather_service.real_data_service.load_model_manifest(nyc)
+    assert manifest["training_samples"] == len(rows)
+    assert manifest["incremental_updates"] == 1
+    assert len(weather_service.store.load(nyc)) == len(rows)
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+
+from app.api import weather as weather_api
+from app.core.tracing import span, start_trace
+from app.models.job import JobStatus
+from app.services import job_service as job_module
+from app.services.job_service import JobService
+
+class FakeWeatherService:
+    """Prepara la ubicación cuando se abre ``release`` (emite un evento por chunk)"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.downloads = 0
+
+    def _get_location_key(self, latitude, longitude):
+        return f"{round(latitude, 3)}_{round(longitude, 3)}"
+
+    async def _get_all_historical_data(self, latitude, longitude, date_of_year, progress=None):
+        self.downloads += 1
+        with span("nasa_power_fetch"):
+            for chunk in range(3):
+                progress("chunk_fetched", chunk=chunk)
+            await self.release.wait()
+        return [{"temperature": 20.0}] * 10
+
+    async def ensure_models(self, latitude, longitude, data, progress=None):
+        progress("models_loaded")
+
+def parse_sse(body: str):
+    """(id, evento) de cada mensaje SSE, sin keep-alives"""
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_submit_deduplicates_active_job_per_location(monkeypatch):
+    async def scenario():
+        fake = FakeWeatherService()
+        monkeypatch.setattr(job_module, "get_weather_service", lambda: fake)
+        service = JobService()
+
+        first = service.submit(40.7128, -74.0060, "07-15")
+        second = service.submit(40.71281, -74.00604, "07-15")
+        other = service.submit(34.0522, -118.2437, "07-15")
+        assert second is first
+        assert other is not first
+
+        fake.release.set()
+        await asyncio.gather(first.task, other.task)
+        assert first.status == JobStatus.COMPLETED
+        assert fake.downloads == 2
+
+        # Terminado el job, una nueva petición lanza otro
+        third = service.submit(40.7128, -74.0060, "07-15")
+        assert third is not first
+        await third.task
+
+    asyncio.run(scenario())
+
+def test_job_spans_stay_out_of_the_request_trace(monkeypatch):
+    async def scenario():
+        fake = FakeWeatherService()
+        monkeypatch.setattr(job_module, "get_weather_service", lambda: fake)
+        service = JobService()
+
+        with start_trace("POST /api/weather/probability") as root:
+            with span("job_submit"):
+                job = service.submit(40.7128, -74.0060, "07-15")
+        fake.release.set()
+        await job.task
+        assert job.status == JobStatus.COMPLETED
+        assert [child.name for child in root.walk()] == ["job_submit"]
+
+    asyncio.run(scenario())
+
+def test_failed_job_releases_location(monkeypatch):
+    async def scenario():
+        fake = FakeWeatherService()
+
+        async def no_data(*args, **kwargs):
+            return []
+
+        fake._get_all_historical_data = no_data
+        monkeypatch.setattr(job_module, "get_weather_service", lambda: fake)
+        service = JobService()
+
+        job = service.submit(40.7128, -74.0060, "07-15")
+        await job.task
+        assert job.status == JobStatus.FAILED
+        assert job.events[-1].stage == "failed"
+        assert job.location_key not in service.active_by_location
+
+    asyncio.run(scenario())
+
+def test_stream_resumes_after_last_event_id(monkeypatch):
+    async def scenario():
+        fake = FakeWeatherService()
+        monkeypatch.setattr(job_module, "get_weather_service", lambda: fake)
+        service = JobService()
+        job = service.submit(40.7128, -74.0060, "07-15")
+
+        async def read(last_event_id):
+            return parse_sse("".join([chunk async for chunk in service.stream_events(job, last_event_id)]))
+
+        # El stream sigue abierto mientras el job corre y termina con él
+        reader = asyncio.create_task(read(0))
+        await asyncio.sleep(0.05)
+        assert not reader.done()
+        fake.release.set()
+        full = await reader
+
+        stages = [stage for _, stage, _ in full]
+        assert stages == ["started", "chunk_fetched", "chunk_fetched", "chunk_fetched", "models_loaded", "completed"]
+        assert [event_id for event_id, _, _ in full] == list(range(1, len(full) + 1))
+
+        resumed = await read(3)
+        assert resumed == full[3:]
+
+    asyncio.run(scenario())
+
+def test_events_endpoint_honours_last_event_id_header(monkeypatch):
+    async def scenario():
+        fake = FakeWeatherService()
+        monkeypatch.setattr(job_module, "get_weather_service", lambda: fake)
+        monkeypatch.setattr(weather_api, "job_service", JobService())
+
+        app = FastAPI()
+        app.include_router(weather_api.router, prefix="/api/weather")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            created = await client.post("/api/weather/jobs", json={"latitude": 40.7128, "longitude": -74.0060})
+            assert created.status_code == 202
+            job_id = created.json()["job_id"]
+            assert created.headers["Location"] == f"/api/weather/jobs/{job_id}"
+
+            again = await client.post("/api/weather/jobs", json={"latitude": 40.7128, "longitude": -74.0060})
+            assert again.json()["job_id"] == job_id
+
+            fake.release.set()
+            full = await client.get(f"/api/weather/jobs/{job_id}/events")
+            assert full.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse(full.text)
+
+            resumed = await client.get(f"/api/weather/jobs/{job_id}/events", headers={"Last-Event-ID": "4"})
+            assert parse_sse(resumed.text) == events[4:]
+
+            missing = await client.get("/api/weather/jobs/unknown")
+            assert missing.status_code == 404
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import io
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+from app.config.weather_apis import COMPACTION_MAX_SCORE_DROP, COMPACTION_MIN_DEPTH, COMPACTION_MIN_TREES
+from app.core.config import settings
+from app.data.model_compaction import CompactForest, compact_forest, truncate_boosting
+from app.data.synthetic import synthetic_history
+from tests.conftest import quick_train
+
+NYC = (40.7128, -74.0060)
+
+@pytest.fixture(scope="module")
+def regression_split():
+    rng = np.random.RandomState(0)
+    X = rng.uniform(-2, 2, size=(3000, 6))
+    y = np.sin(2 * X[:, 0]) + X[:, 1] ** 2 - X[:, 2] * X[:, 3] + rng.normal(0, 0.3, len(X))
+    return train_test_split(X, y, test_size=0.25, random_state=42)
+
+@pytest.fixture(scope="module")
+def forest(regression_split):
+    X_train, _, y_train, _ = regression_split
+    return RandomForestRegressor(n_estimators=40, max_depth=14, random_state=0).fit(X_train, y_train)
+
+def test_compact_forest_predicts_like_sklearn(forest, regression_split):
+    _, X_test, _, _ = regression_split
+    compact = CompactForest.from_forest(forest)
+    np.testing.assert_allclose(compact.predict(X_test), forest.predict(X_test), rtol=1e-4, atol=1e-4)
+    # Recortar a su propia profundidad no cambia nada
+    np.testing.assert_allclose(compact.prune_depth(compact.depth()).predict(X_test), compact.predict(X_test))
+
+    buffer = io.BytesIO()
+    joblib.dump(compact, buffer)
+    buffer.seek(0)
+    np.testing.assert_array_equal(joblib.load(buffer).predict(X_test), compact.predict(X_test))
+
+def test_generous_budget_only_drops_trees_within_score_limit(forest, regression_split):
+    _, X_test, _, y_test = regression_split
+    compact, report = compact_forest(forest, X_test, y_test, 1 << 30, COMPACTION_MAX_SCORE_DROP, 5, COMPACTION_MIN_DEPTH)
+
+    assert report["trees_after"] <= report["trees_before"]
+    assert report["max_depth"] is None
+    assert report["score_delta"] >= -COMPACTION_MAX_SCORE_DROP
+    assert compact.score(X_test, y_test) == pytest.approx(report["score_after"], abs=1e-6)
+
+def test_tight_budget_respects_size_and_minimums(forest, regression_split):
+    _, X_test, _, y_test = regression_split
+    full_bytes = CompactForest.from_forest(forest).nbytes
+    budget = full_bytes // 20
+    compact, report = compact_forest(forest, X_test, y_test, budget, COMPACTION_MAX_SCORE_DROP,
+                                     COMPACTION_MIN_TREES, COMPACTION_MIN_DEPTH)
+
+    assert compact.nbytes <= budget
+    assert compact.n_estimators >= COMPACTION_MIN_TREES
+    assert compact.depth() >= COMPACTION_MIN_DEPTH
+    # Más pequeño, pero sigue siendo un modelo útil
+    assert report["score_after"] > 0.5
+
+    # Presupuesto imposible: se detiene en los mínimos en lugar de seguir recortando
+    floor, _ = compact_forest(forest, X_test, y_test, 1, COMPACTION_MAX_SCORE_DROP, COMPACTION_MIN_TREES, COMPACTION_MIN_DEPTH)
+    assert floor.n_estimators == COMPACTION_MIN_TREES
+    assert floor.max_depth == COMPACTION_MIN_DEPTH
+
+def test_truncate_boosting_keeps_accuracy_within_limit():
+    rng = np.random.RandomState(1)
+    X = rng.normal(size=(2000, 5))
+    y = (X[:, 0] + 0.5 * X[:, 1] > 0).astype(int) + (X[:, 2] > 1).astype(int)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
+    model = GradientBoostingClassifier(n_estimators=80, max_depth=3, random_state=0).fit(X_train, y_train)
+    best = max(np.mean(predicted == y_test) for predicted in model.staged_predict(X_test))
+
+    report = truncate_boosting(model, X_test, y_test, COMPACTION_MAX_SCORE_DROP)
+    assert report["trees_after"] == model.n_estimators_ == len(model.estimators_) <= 80
+    assert report["score_after"] >= best - COMPACTION_MAX_SCORE_DROP
+    assert np.mean(model.predict(X_test) == y_test) == pytest.approx(report["score_after"])
+
+    assert truncate_boosting(RandomForestRegressor(), X_test, y_test, COMPACTION_MAX_SCORE_DROP) is None
+
+def test_service_compaction_fits_location_budget(weather_data_service, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_SIZE_BUDGET_KB", 512)
+    rows = synthetic_history(NYC[0], years=3)
+    quick_train(weather_data_service, *NYC, rows, n_estimators=30, max_depth=20)
+    X = weather_data_service.scalers["features"].transform(weather_data_service.prepare_features(rows, *NYC))
+
+    weather_data_service._compact_models(X, weather_data_service._model_targets(rows))
+
+    reports = {name: metrics["compaction"] for name, metrics in weather_data_service.model_metrics.items()}
+    assert set(reports) == set(weather_data_service.models)
+    for name in ("precipitation_classifier", "condition_classifier"):
+        assert reports[name]["score_after"] >= reports[name]["score_before"] - COMPACTION_MAX_SCORE_DROP
+
+    # Los bosques se reparten lo que dejan los clasificadores
+    forests = ("temperature_predictor", "wind_predictor", "humidity_predictor")
+    share = (512 * 1024 - reports["precipitation_classifier"]["bytes_after"]
+             - reports["condition_classifier"]["bytes_after"]) // len(forests)
+    for name in forests:
+        compact = weather_data_service.models[name]
+        assert isinstance(compact, CompactForest)
+        assert reports[name]["bytes_before"] > share
+        assert compact.nbytes <= share
+        assert compact.n_estimators >= COMPACTION_MIN_TREES
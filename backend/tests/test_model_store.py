@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.api import weather as weather_api
+from app.data.model_index import ModelIndex
+from app.data.real_weather_data import GLOBAL_MODEL_KEY, MODEL_MANIFEST_NAME, MODEL_VERSION, RealWeatherDataService
+from app.data.synthetic import synthetic_history
+from tests.conftest import quick_train
+
+NYC = (40.7128, -74.0060)
+BUENOS_AIRES = (-34.6037, -58.3816)
+
+def test_manifest_records_training_and_models(weather_data_service):
+    rows = synthetic_history(NYC[0], years=3)
+    key = quick_train(weather_data_service, *NYC, rows)
+
+    manifest = weather_data_service.load_model_manifest(key)
+    assert manifest["location_key"] == key
+    assert manifest["model_version"] == MODEL_VERSION
+    assert manifest["training_samples"] == len(rows)
+    assert set(manifest["models"]) == set(weather_data_service.models)
+    assert weather_data_service.load_model_manifest("0.0_0.0") is None
+
+def test_loading_a_location_does_not_keep_models_of_another(weather_data_service):
+    nyc = quick_train(weather_data_service, *NYC, synthetic_history(NYC[0], years=3))
+    # Buenos Aires sin condition_classifier
+    buenos_aires = quick_train(weather_data_service, *BUENOS_AIRES, synthetic_history(BUENOS_AIRES[0], years=3, seed=7),
+                               skip=("condition_classifier",))
+
+    service = RealWeatherDataService()
+    assert service.load_trained_models(nyc)
+    assert service.models["condition_classifier"] is not None
+    nyc_latitude_mean = service.scalers["features"].mean_[0]
+
+    assert service.load_trained_models(buenos_aires)
+    assert service.loaded_location_key == buenos_aires
+    assert service.models["condition_classifier"] is None
+    assert service.scalers["features"].mean_[0] != nyc_latitude_mean
+    assert service.model_metrics["condition_classifier"] == {}
+
+    # Una ubicación sin modelos deja el estado vacío
+    assert not service.load_trained_models("0.0_0.0")
+    assert service.loaded_location_key == buenos_aires
+
+def test_models_from_a_newer_version_are_not_loaded(weather_data_service):
+    key = quick_train(weather_data_service, *NYC, synthetic_history(NYC[0], years=3))
+    manifest_path = weather_data_service.models_dir / key / MODEL_MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "model_version": MODEL_VERSION + 1}))
+
+    service = RealWeatherDataService()
+    assert not service.load_trained_models(key)
+    assert service.loaded_location_key is None
+
+def test_index_tracks_saved_locations_across_instances(weather_data_service):
+    nyc = quick_train(weather_data_service, *NYC, synthetic_history(NYC[0], years=3))
+    # Otro proceso con su propio índice en memoria
+    other = ModelIndex(weather_data_service.models_dir)
+    assert other.keys() == [nyc]
+
+    buenos_aires = quick_train(weather_data_service, *BUENOS_AIRES, synthetic_history(BUENOS_AIRES[0], years=3))
+    assert sorted(other.keys()) == sorted([nyc, buenos_aires])
+
+    entry = other.get(nyc)
+    assert entry["latitude"] == round(NYC[0], 3)
+    assert entry["model_version"] == MODEL_VERSION
+    assert entry["total_bytes"] == sum(entry["artifacts"].values()) > 0
+    assert "scalers.pkl" in entry["artifacts"]
+
+def test_index_excludes_global_model_and_rebuilds_when_missing(weather_data_service):
+    rows = synthetic_history(NYC[0], years=3)
+    nyc = quick_train(weather_data_service, *NYC, rows)
+    weather_data_service.save_trained_models(GLOBAL_MODEL_KEY, {"trained_at": "2026-01-01T00:00:00"})
+    assert GLOBAL_MODEL_KEY not in weather_data_service.model_index
+
+    index_path = weather_data_service.models_dir / ModelIndex.FILENAME
+    index_path.unlink()
+    rebuilt = ModelIndex(weather_data_service.models_dir)
+    assert rebuilt.keys() == [nyc]
+    assert index_path.exists()
+
+def test_saved_models_predict_like_the_trained_ones(weather_data_service):
+    rows = synthetic_history(NYC[0], years=3)
+    key = quick_train(weather_data_service, *NYC, rows)
+    X = weather_data_service.scalers["features"].transform(weather_data_service.prepare_features(rows[:50], *NYC))
+    expected = weather_data_service.models["temperature_predictor"].predict(X)
+
+    service = RealWeatherDataService()
+    assert service.load_trained_models(key)
+    np.testing.assert_allclose(service.models["temperature_predictor"].predict(X), expected, rtol=1e-5)
+
+def test_model_metrics_describe_models_without_manifest(weather_data_service):
+    key = quick_train(weather_data_service, *NYC, synthetic_history(NYC[0], years=3), skip=("condition_classifier",))
+    # Modelos guardados antes de que existiera el manifiesto
+    (weather_data_service.models_dir / key / MODEL_MANIFEST_NAME).unlink()
+
+    response = asyncio.run(weather_api.get_model_metrics(*NYC))
+    assert response["location"]["location_key"] == key
+    assert response["training"]["training_mode"] == "legacy"
+    assert response["training"]["trained_at"]
+    assert set(response["summary"]["models_available"]) == set(weather_data_service.models) - {"condition_classifier"}
+    assert response["interpretation"]["classification_models"] == ["precipitation_classifier"]
+    assert not (weather_data_service.models_dir / key / MODEL_MANIFEST_NAME).exists()
+
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(weather_api.get_model_metrics(0.0, 0.0))
+    assert missing.value.status_code == 404
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+from app.models.weather import WeatherQuery
+from app.data.synthetic import synthetic_history
+
+NEIGHBOUR = (40.7128, -74.0060)
+COLD = (40.75, -74.0)  # ~4 km
+
+def warm_up(weather_service, latitude, longitude, rows):
+    key = weather_service._get_location_key(latitude, longitude)
+    weather_service.historical_data_cache[key] = [{**row, "date_of_year": row["date"].strftime("%m-%d")} for row in rows]
+    weather_service.models_cache[key] = True
+    weather_service._index_if_warm(latitude, longitude)
+    return key
+
+def test_nearest_lookup_runs_off_the_event_loop(weather_service, monkeypatch):
+    neighbour = warm_up(weather_service, *NEIGHBOUR, synthetic_history(NEIGHBOUR[0], years=3, start_year=2020))
+    threads = []
+    original = weather_service.nearest_index.within
+
+    def recording_within(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(weather_service.nearest_index, "within", recording_within)
+    served_from = asyncio.run(weather_service.find_nearest_warm_location(*COLD))
+
+    assert served_from["location_key"] == neighbour
+    assert (served_from["latitude"], served_from["longitude"]) == NEIGHBOUR
+    assert 0 < served_from["distance_km"] < 25
+    assert threads and threading.main_thread() not in threads
+
+def test_fallback_answer_uses_the_neighbour_everywhere(weather_service):
+    rows = synthetic_history(NEIGHBOUR[0], years=3, start_year=2020)
+    neighbour = warm_up(weather_service, *NEIGHBOUR, rows)
+
+    async def scenario():
+        served_from = await weather_service.find_nearest_warm_location(*COLD)
+        query = WeatherQuery(latitude=COLD[0], longitude=COLD[1], date_of_year="07-15", future_days=3)
+        return await weather_service.get_weather_probabilities(query, served_from=served_from)
+
+    response = asyncio.run(scenario())
+    assert response.served_from["location_key"] == neighbour
+    assert (response.served_from["latitude"], response.served_from["longitude"]) == NEIGHBOUR
+    assert "nearest trained location" in response.data_source
+    assert response.location == f"{COLD[0]}, {COLD[1]}"
+    assert response.sample_size == len(rows)
+    # Predicciones futuras con el histórico de la vecina, no estimaciones sin datos
+    assert len(response.future_predictions) == 3
+    for prediction in response.future_predictions:
+        assert prediction.confidence_level == 0.95
+        assert {probability.probability for probability in prediction.probabilities} != {0.10}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Entrenamiento del modelo global multi-ubicación (models/global/)
+
+Toma una muestra de días de cada histórico descargado en data_cache/ (los
+archivos que generan el servidor y precompute_locations.py) y entrena los cinco
+modelos una sola vez con las features geográficas y estacionales. Con
+``MODEL_MODE=global`` el servidor lo usa para cualquier coordenada sin modelos
+propios, en lugar de entrenar por ubicación.
+
+Uso (desde backend/):
+    python train_global_model.py --rows-per-location 150 --max-locations 500
+"""
+
+import argparse
+import json
+import pickle
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.data.real_weather_data import GLOBAL_MODEL_KEY, RealWeatherDataService
+
+def discover_histories(data_dir: Path) -> Dict[str, Tuple[float, float, Path]]:
+    """Un archivo weather_data_<lat>_<lon>_<inicio>_<fin>.pkl por ubicación (el de más años)"""
+    histories = {}
+    for path in data_dir.glob("weather_data_*.pkl"):
+        try:
+            latitude, longitude, start_year, end_year = path.stem[len("weather_data_"):].split("_")
+            latitude, longitude, span = float(latitude), float(longitude), int(end_year) - int(start_year)
+        except ValueError:
+            continue
+        location_key = f"{round(latitude, 3)}_{round(longitude, 3)}"
+        if location_key not in histories or span > histories[location_key][3]:
+            histories[location_key] = (latitude, longitude, path, span)
+    return {key: value[:3] for key, value in histories.items()}
+
+def sample_corpus(histories: Dict[str, Tuple[float, float, Path]], rows_per_location: int,
+                  max_locations: int, seed: int) -> List[Tuple[float, float, List[Dict]]]:
+    rng = random.Random(seed)
+    keys = sorted(histories)
+    if max_locations and len(keys) > max_locations:
+        keys = rng.sample(keys, max_locations)
+
+    corpus = []
+    for location_key in keys:
+        latitude, longitude, path = histories[location_key]
+        with open(path, "rb") as history_file:
+            rows = pickle.load(history_file)
+        if len(rows) > rows_per_location:
+            rows = rng.sample(rows, rows_per_location)
+        corpus.append((latitude, longitude, rows))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=Path("data_cache"))
+    parser.add_argument("--rows-per-location", type=int, default=150, help="Días muestreados por ubicación")
+    parser.add_argument("--max-locations", type=int, default=0, help="Máximo de ubicaciones (0 = todas)")
+    parser.add_argument("--min-locations", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    histories = discover_histories(args.data_dir)
+    if len(histories) < args.min_locations:
+        print(f"❌ Only {len(histories)} location histories in {args.data_dir} (need {args.min_locations})", file=sys.stderr)
+        return 1
+
+    corpus = sample_corpus(histories, args.rows_per_location, args.max_locations, args.seed)
+    service = RealWeatherDataService()
+    started = time.perf_counter()
+    service.train_global_models(corpus)
+    manifest = service.load_model_manifest(GLOBAL_MODEL_KEY)
+    if manifest is None:
+        print("❌ Global models were not saved", file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        "locations": len(corpus),
+        "training_samples": manifest.get("training_samples"),
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "models": manifest.get("models"),
+        "test_metrics": {name: metrics.get("test_metrics") for name, metrics in manifest.get("metrics", {}).items() if metrics},
+    }, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
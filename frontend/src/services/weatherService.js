@@ -1,10 +1,35 @@
 import api from "./api";
 
+const JOB_POLL_INTERVAL_MS = 2000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Esperar a que termine el job que prepara una ubicación nueva (respuesta 202)
+async function waitForJob(job, onProgress) {
+  let current = job;
+  while (current.status === "pending" || current.status === "running") {
+    if (onProgress) onProgress(current);
+    await sleep(JOB_POLL_INTERVAL_MS);
+    const response = await api.get(current.links.self);
+    current = response.data;
+  }
+  if (current.status === "failed") {
+    throw new Error(current.error || "No se pudieron preparar los datos de la ubicación");
+  }
+  if (onProgress) onProgress(current);
+  return current;
+}
+
 export const weatherService = {
   // Obtener probabilidades climáticas con personalización completa
-  async getWeatherProbabilities(query) {
+  async getWeatherProbabilities(query, onProgress) {
     try {
-      const response = await api.post("/api/weather/probability", query);
+      let response = await api.post("/api/weather/probability", query);
+      if (response.status === 202) {
+        // Ubicación nueva: el backend descarga datos y entrena modelos en segundo plano
+        await waitForJob(response.data, onProgress);
+        response = await api.post("/api/weather/probability", query);
+      }
       return response.data;
     } catch (error) {
       // Manejo más específico de errores